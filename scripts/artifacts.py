@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import sys
+from smart_contract_swarm.artifacts import ArtifactStore, DEFAULT_ARTIFACT_DIR
+
+def list_runs(store, args):
+    validated = None if args.validated is None else args.validated == "yes"
+    for run in store.runs(requirements=args.requirements, validated=validated, limit=args.limit):
+        print(f"{run['run_id']}  validated={run['validated']}  repairs={run['repairs']}  "
+              f"total_time={run['total_time']}  requirements={run['requirements_hash'][:12]}")
+
+def show(store, args):
+    run = store.get_run(args.run_id)
+    if run is None:
+        sys.exit(f"No run '{args.run_id}'")
+    print(json.dumps(run, indent=4))
+
+def cat(store, args):
+    text = store.read(args.run_id, args.name)
+    if text is None:
+        sys.exit(f"Run '{args.run_id}' has no artifact '{args.name}'")
+    print(text, end="")
+
+def diff(store, args):
+    names = [args.name] if args.name else store.changed(args.run_a, args.run_b)
+    for name in names:
+        print(store.diff(args.run_a, args.run_b, name), end="")
+
+def stats(store, args):
+    print(json.dumps(store.stats(), indent=4))
+
+def main():
+    parser = argparse.ArgumentParser(description="Browse and diff archived pipeline runs")
+    parser.add_argument("--root", default=None, help=f"Artifact store directory (default: {DEFAULT_ARTIFACT_DIR})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="List runs, newest first")
+    list_parser.add_argument("--requirements", help="Only runs with exactly these requirements")
+    list_parser.add_argument("--validated", choices=["yes", "no"])
+    list_parser.add_argument("--limit", type=int, default=20)
+    list_parser.set_defaults(func=list_runs)
+
+    show_parser = commands.add_parser("show", help="Print a run's index entry, timings and artifacts")
+    show_parser.add_argument("run_id")
+    show_parser.set_defaults(func=show)
+
+    cat_parser = commands.add_parser("cat", help="Print one artifact of a run")
+    cat_parser.add_argument("run_id")
+    cat_parser.add_argument("name", help="e.g. lib.rs, architecture.md, security_audit.md")
+    cat_parser.set_defaults(func=cat)
+
+    diff_parser = commands.add_parser("diff", help="Diff two runs (every changed artifact, or just one)")
+    diff_parser.add_argument("run_a")
+    diff_parser.add_argument("run_b")
+    diff_parser.add_argument("name", nargs="?")
+    diff_parser.set_defaults(func=diff)
+
+    stats_parser = commands.add_parser("stats", help="Print the number of runs and blobs and their size")
+    stats_parser.set_defaults(func=stats)
+
+    args = parser.parse_args()
+    args.func(ArtifactStore(args.root or DEFAULT_ARTIFACT_DIR), args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import contextlib
+import io
+import resource
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from smart_contract_swarm import AnchorTemplate, BuildCache, CheckpointStore, ContractGenerator, ContractSwarm
+from smart_contract_swarm.testing import FakeAnchorToolchain, FakeLLM, ReplayLLM
+
+def make_swarm(llm, work_dir, use_build_cache):
+    swarm = ContractSwarm(
+        llm=llm,
+        checkpoints=CheckpointStore(work_dir / "runs"),
+        build_cache=BuildCache(work_dir / ("builds" if use_build_cache else f"builds-{time.time_ns()}"))
+    )
+    swarm.contract_generator = ContractGenerator(work_dir / "program", template=AnchorTemplate(work_dir / "template"))
+    for agent in swarm.agents.values():
+        agent.cache = None
+    return swarm
+
+def run_sequential(swarm, requirements, concurrency):
+    return [swarm.process_contract_request(text) for text in requirements]
+
+def run_concurrent(swarm, requirements, concurrency):
+    async def run_all():
+        return await asyncio.gather(*(swarm.aprocess_contract_request(text) for text in requirements))
+    return asyncio.run(run_all())
+
+def run_batch(swarm, requirements, concurrency):
+    return swarm.process_batch(requirements, max_concurrency=concurrency)
+
+MODES = {
+    "sequential": run_sequential,
+    "concurrent": run_concurrent,
+    "batch": run_batch,
+}
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+def benchmark(mode, args, work_dir):
+    if args.cassette:
+        llm = ReplayLLM(args.cassette, speed=args.replay_speed)
+    else:
+        llm = FakeLLM(latency=args.latency, tokens_per_second=args.tokens_per_second)
+    swarm = make_swarm(llm, work_dir / mode, args.build_cache)
+    requirements = [f"Create a token vesting contract with a {i % 12 + 1} month cliff" for i in range(args.requests)]
+
+    # Warm up once so template creation and lazy imports are not measured
+    with contextlib.redirect_stdout(io.StringIO()):
+        swarm.process_contract_request("Warm-up request")
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    # The pipeline reports progress with print; keep the benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = MODES[mode](swarm, requirements, args.concurrency)
+    elapsed = time.perf_counter() - started
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = [result["metrics"]["total_time"] for result in results]
+    return {
+        "mode": mode,
+        "requests_per_second": len(results) / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": percentile(latencies, 0.99),
+        "peak_memory_mb": peak_memory / (1024 * 1024),
+        "failed": sum(1 for result in results if result["test_cases"] is None)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmark with a fake LLM and Anchor toolchain")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per mode")
+    parser.add_argument("--modes", default="sequential,concurrent,batch", help="Comma-separated modes to run")
+    parser.add_argument("--concurrency", type=int, default=4, help="max_concurrency for batch mode")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake LLM time to first token in seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="Fake LLM token rate")
+    parser.add_argument("--build-seconds", type=float, default=0.1, help="Fake anchor build duration")
+    parser.add_argument("--test-seconds", type=float, default=0.1, help="Fake anchor test duration")
+    parser.add_argument("--build-cache", action="store_true", help="Reuse build results across requests")
+    parser.add_argument("--cassette", help="Replay LLM responses recorded with RecordingLLM instead of faking them")
+    parser.add_argument("--replay-speed", type=float, default=1.0,
+                        help="Multiplier for recorded latencies when replaying a cassette")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            FakeAnchorToolchain(build_seconds=args.build_seconds, test_seconds=args.test_seconds):
+        reports = [benchmark(mode, args, Path(tmp)) for mode in args.modes.split(",")]
+
+    print(f"{'mode':<12}{'req/s':>10}{'p50 (s)':>10}{'p99 (s)':>10}{'peak MB':>10}{'failed':>8}")
+    for report in reports:
+        print(f"{report['mode']:<12}{report['requests_per_second']:>10.2f}{report['p50']:>10.2f}"
+              f"{report['p99']:>10.2f}{report['peak_memory_mb']:>10.1f}{report['failed']:>8}")
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"\nProcess max RSS: {max_rss:.1f} MB")
+
+if __name__ == "__main__":
+    main()
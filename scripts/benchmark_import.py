@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Modules that importing the package used to pull in eagerly
+EAGER_IMPORTS = (
+    "import dotenv, langchain_community.chat_models, langchain.agents, langchain.memory, "
+    "langchain.schema, solana.rpc.api, solders.keypair, anchorpy"
+)
+
+SCENARIOS = {
+    "package import": "import smart_contract_swarm",
+    "package import + ContractSwarm()": "import smart_contract_swarm; smart_contract_swarm.ContractSwarm()",
+    "previous eager imports": EAGER_IMPORTS,
+}
+
+def time_cold_start(statement, runs, cwd):
+    """Time a fresh interpreter executing statement, returning seconds per run"""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], cwd=cwd, check=True)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of smart_contract_swarm")
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters to start per scenario")
+    args = parser.parse_args()
+
+    project_root = Path(__file__).parent.parent
+    baseline = time_cold_start("pass", args.runs, project_root)
+    interpreter = statistics.median(baseline)
+    print(f"Bare interpreter startup: {interpreter * 1000:.0f} ms (median of {args.runs})")
+
+    medians = {}
+    for name, statement in SCENARIOS.items():
+        medians[name] = statistics.median(time_cold_start(statement, args.runs, project_root))
+        print(f"{name}: {medians[name] * 1000:.0f} ms ({(medians[name] - interpreter) * 1000:.0f} ms over startup)")
+
+    lazy = medians["package import"] - interpreter
+    eager = medians["previous eager imports"] - interpreter
+    if lazy > 0:
+        print(f"\nLazy import is {eager / lazy:.1f}x faster than the previous eager imports")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import json
+import signal
+import time
+from smart_contract_swarm.jobs import JobWorker, open_queue
+
+def read_records(input_path, priority, deadline_seconds):
+    """Stream job records from a JSONL file, filling in defaults from the command line"""
+    with open(input_path, "r") as f:
+        for line_number, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            record.setdefault("request_id", str(line_number))
+            record.setdefault("priority", priority)
+            if deadline_seconds and "deadline" not in record:
+                record["deadline"] = time.time() + deadline_seconds
+            yield record
+
+def enqueue(args):
+    queue = open_queue(args.queue)
+    ids = queue.enqueue_many(read_records(args.input, args.priority, args.deadline))
+    print(f"Queued {len(ids)} jobs")
+
+def work(args):
+    queue = open_queue(args.queue)
+    worker = JobWorker(queue, concurrency=args.concurrency)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        # Finish the jobs in hand before exiting so their leases are not left to expire
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, worker.stop)
+        await worker.run(drain=args.drain)
+
+    asyncio.run(run())
+
+def stats(args):
+    print(json.dumps(open_queue(args.queue).stats(), indent=4))
+
+def export(args):
+    queue = open_queue(args.queue)
+    with open(args.output, "w") as out:
+        for job in queue.jobs(status="done", limit=args.limit):
+            out.write(json.dumps({"request_id": job["request_id"], "result": job["result"]}) + "\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue smart contract requests and run workers")
+    parser.add_argument("--queue", help="SQLite path or postgresql:// URL (default: SWARM_JOB_QUEUE)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = commands.add_parser("enqueue", help="Queue every request in a JSONL file")
+    enqueue_parser.add_argument("input", help="JSONL file with a 'requirements' or 'body' field per line")
+    enqueue_parser.add_argument("--priority", type=int, default=0, help="Priority for lines without one")
+    enqueue_parser.add_argument("--deadline", type=float, help="Seconds from now after which jobs are dropped")
+    enqueue_parser.set_defaults(func=enqueue)
+
+    worker_parser = commands.add_parser("worker", help="Run queued jobs")
+    worker_parser.add_argument("--concurrency", type=int, help="Jobs run at once (default: SWARM_WORKER_CONCURRENCY)")
+    worker_parser.add_argument("--drain", action="store_true", help="Exit once the queue is empty")
+    worker_parser.set_defaults(func=work)
+
+    stats_parser = commands.add_parser("stats", help="Print queue depth and job latency")
+    stats_parser.set_defaults(func=stats)
+
+    export_parser = commands.add_parser("export", help="Write finished results to a JSONL file")
+    export_parser.add_argument("output")
+    export_parser.add_argument("--limit", type=int, default=1_000_000)
+    export_parser.set_defaults(func=export)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
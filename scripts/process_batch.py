@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import json
+from smart_contract_swarm import ContractSwarm
+
+def read_requests(input_path, request_ids):
+    """Stream requirements from a JSONL file, remembering each line's request id"""
+    with open(input_path, "r") as f:
+        for line_number, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            request_ids.append(record.get("request_id", str(line_number)))
+            yield record.get("requirements") or record.get("body", "")
+
+async def run(input_path, output_path, max_concurrency):
+    swarm = ContractSwarm()
+    request_ids = []
+
+    with open(output_path, "w") as out:
+        requests = read_requests(input_path, request_ids)
+        async for index, contract_spec in swarm.aprocess_batch(requests, max_concurrency):
+            out.write(json.dumps({"request_id": request_ids[index], "result": contract_spec}) + "\n")
+            out.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description="Process a JSONL file of smart contract requests")
+    parser.add_argument("input", help="JSONL file with a 'requirements' or 'body' field per line")
+    parser.add_argument("output", help="JSONL file that results are written to as they complete")
+    parser.add_argument("--max-concurrency", type=int, default=4,
+                        help="Maximum number of concurrent LLM calls across all requests")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.input, args.output, args.max_concurrency))
+
+if __name__ == "__main__":
+    main()
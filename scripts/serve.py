@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import signal
+from smart_contract_swarm.service import SwarmService
+
+async def run(args):
+    service = await SwarmService(host=args.host, port=args.port, path=args.socket,
+                                 max_concurrency=args.max_concurrency).start()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    await stop.wait()
+    print("Shutting down...")
+    await service.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the contract swarm over HTTP")
+    parser.add_argument("--host", help="Interface to listen on (default: SWARM_SERVICE_HOST or 127.0.0.1)")
+    parser.add_argument("--port", type=int, help="TCP port (default: SWARM_SERVICE_PORT or 8765)")
+    parser.add_argument("--socket", help="Listen on this Unix socket instead of a TCP port")
+    parser.add_argument("--max-concurrency", type=int,
+                        help="Requests processed at once (default: SWARM_SERVICE_CONCURRENCY or 4)")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -24,6 +24,15 @@ def main():
     (project_root / "wallet").mkdir(exist_ok=True)
     (project_root / "program").mkdir(exist_ok=True)
     
+    # Initialize the Anchor template and compile its dependencies once, so
+    # new workspaces only compile the generated crate
+    print("\nWarming Anchor template cache...")
+    from smart_contract_swarm.workspace import AnchorTemplate
+    try:
+        AnchorTemplate().warm()
+    except (RuntimeError, subprocess.CalledProcessError) as e:
+        print(f"Skipping template warm-up: {e}")
+    
     print("\nDevelopment environment setup complete!")
 
 if __name__ == "__main__":
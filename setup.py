@@ -15,7 +15,8 @@ setup(
         "construct-typing>=0.5.2,<0.6.0",
         "pytest>=7.0.0",
         "pytest-asyncio>=0.21.0",
-        "base58>=2.1.1"
+        "base58>=2.1.1",
+        "httpx>=0.24.0"
     ],
     python_requires=">=3.8",
     include_package_data=True,
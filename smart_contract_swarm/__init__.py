@@ -1,3 +1,13 @@
 from .swarm import ContractSwarm, SmartContractAgent, ContractGenerator
+from .cache import ResponseCache
+from .checkpoint import CheckpointStore
+from .workspace import AnchorTemplate
+from .build_cache import BuildCache
+from .build_farm import BuildFarm
+from .validators import ValidatorPool
+from .jobs import JobQueue, JobWorker
+from .artifacts import ArtifactStore
 
-__all__ = ['ContractSwarm', 'SmartContractAgent', 'ContractGenerator'] 
\ No newline at end of file
+__all__ = ['ContractSwarm', 'SmartContractAgent', 'ContractGenerator', 'ResponseCache', 'CheckpointStore',
+           'AnchorTemplate', 'BuildCache', 'BuildFarm', 'ValidatorPool',
+           'JobQueue', 'JobWorker', 'ArtifactStore']
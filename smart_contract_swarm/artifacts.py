@@ -0,0 +1,333 @@
+from pathlib import Path
+import difflib
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from .clients import load_environment
+from .validation import extract_rust_source
+
+DEFAULT_ARTIFACT_DIR = ".swarm_artifacts"
+COMPRESSION_LEVEL = 6
+
+# Artifact names for the contract_spec fields that hold stage output
+STAGE_ARTIFACTS = {
+    "requirements": "requirements.md",
+    "technical_specs": "technical_specs.md",
+    "architecture": "architecture.md",
+    "contract_code": "contract_code.md",
+    "security_audit": "security_audit.md",
+    "test_cases": "test_cases.md"
+}
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+def _encode(content):
+    return content.encode("utf-8") if isinstance(content, str) else bytes(content)
+
+def requirements_hash(requirements):
+    return hashlib.sha256(str(requirements).strip().encode("utf-8")).hexdigest()
+
+class ArtifactStore:
+    """Every pipeline run's outputs as compressed, deduplicated blobs plus a SQLite index
+
+    Blobs are zlib-compressed and named by the SHA-256 of their content, so
+    output shared between runs (repeated requirements, reused analysis,
+    cached code) is stored once. The index records each run's requirement
+    hash, build status, repairs and per-stage timings, and which blob holds
+    each of its artifacts, so runs can be listed, fetched one artifact at a
+    time and diffed without decompressing anything else.
+    """
+    def __init__(self, root=DEFAULT_ARTIFACT_DIR):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.root / "index.sqlite3"), timeout=30.0,
+                                         check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "run_id TEXT PRIMARY KEY, requirements_hash TEXT NOT NULL, created REAL NOT NULL, "
+                "validated INTEGER, repairs INTEGER, total_time REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS runs_requirements ON runs (requirements_hash)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS runs_created ON runs (created)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                "run_id TEXT NOT NULL, name TEXT NOT NULL, blob TEXT NOT NULL, "
+                "PRIMARY KEY (run_id, name)) WITHOUT ROWID"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS artifacts_blob ON artifacts (blob)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                "hash TEXT PRIMARY KEY, size INTEGER NOT NULL, stored_size INTEGER NOT NULL) WITHOUT ROWID"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS timings ("
+                "run_id TEXT NOT NULL, stage TEXT NOT NULL, kind TEXT, wall_time REAL NOT NULL, "
+                "calls INTEGER NOT NULL, PRIMARY KEY (run_id, stage)) WITHOUT ROWID"
+            )
+        return self._conn
+
+    def _blob_path(self, digest):
+        # Two levels of fan-out keep directories small at hundreds of thousands of blobs
+        return self.root / "blobs" / digest[:2] / digest[2:4] / digest
+
+    def put(self, content):
+        """Store content (str or bytes) and return its hash; content already stored is not rewritten"""
+        data = _encode(content)
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._store_blob(digest, data)
+        return digest
+
+    def _store_blob(self, digest, data):
+        # Called with _lock held, so delete_run cannot remove the blob between
+        # the existence check and the row that refers to it
+        path = self._blob_path(digest)
+        if path.exists():
+            stored_size = path.stat().st_size
+        else:
+            compressed = zlib.compress(data, COMPRESSION_LEVEL)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=f".{digest}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(compressed)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            stored_size = len(compressed)
+        self._connect().execute(
+            "INSERT OR IGNORE INTO blobs (hash, size, stored_size) VALUES (?, ?, ?)",
+            (digest, len(data), stored_size)
+        )
+
+    def get_blob(self, digest):
+        """Return the bytes stored under digest"""
+        try:
+            with open(self._blob_path(digest), "rb") as f:
+                return zlib.decompress(f.read())
+        except FileNotFoundError:
+            raise RuntimeError(f"No blob stored under {digest}")
+
+    def save_run(self, contract_spec):
+        """Store a run's stage outputs, generated lib.rs and metrics, and index it
+
+        Saving a run again (after a resume, for example) replaces its entry.
+        """
+        contents = {}
+        for field, name in STAGE_ARTIFACTS.items():
+            if contract_spec.get(field) is not None:
+                contents[name] = str(contract_spec[field])
+        if contract_spec.get("contract_code") is not None:
+            contents["lib.rs"] = extract_rust_source(contract_spec["contract_code"])
+        metrics = contract_spec.get("metrics") or {}
+        if metrics:
+            contents["metrics.json"] = json.dumps(metrics, indent=4)
+        # Everything else in the spec (run options, similarity match, ...)
+        rest = {key: value for key, value in contract_spec.items() if key not in STAGE_ARTIFACTS and key != "metrics"}
+        contents["spec.json"] = json.dumps(rest, indent=4, sort_keys=True)
+        contents = {name: _encode(content) for name, content in contents.items()}
+        artifacts = {name: hashlib.sha256(data).hexdigest() for name, data in contents.items()}
+
+        timings = {}
+        for span in metrics.get("spans", []):
+            timing = timings.setdefault(span["name"], {"kind": span.get("kind"), "wall_time": 0.0, "calls": 0})
+            timing["wall_time"] += span.get("wall_time") or 0.0
+            timing["calls"] += 1
+
+        validated = contract_spec.get("validated")
+        run_id = contract_spec["run_id"]
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            try:
+                # Blobs are written under the same lock as the rows referring to
+                # them, so a concurrent delete_run never unlinks one in use
+                for name, data in contents.items():
+                    self._store_blob(artifacts[name], data)
+                conn.execute(
+                    "INSERT OR REPLACE INTO runs (run_id, requirements_hash, created, validated, repairs, total_time) "
+                    "VALUES (?, ?, COALESCE((SELECT created FROM runs WHERE run_id = ?), ?), ?, ?, ?)",
+                    (run_id, requirements_hash(contract_spec.get("requirements", "")), run_id, time.time(),
+                     None if validated is None else int(validated), contract_spec.get("repairs"),
+                     metrics.get("total_time"))
+                )
+                conn.execute("DELETE FROM artifacts WHERE run_id = ?", (run_id,))
+                conn.executemany(
+                    "INSERT INTO artifacts (run_id, name, blob) VALUES (?, ?, ?)",
+                    ((run_id, name, digest) for name, digest in artifacts.items())
+                )
+                conn.execute("DELETE FROM timings WHERE run_id = ?", (run_id,))
+                conn.executemany(
+                    "INSERT INTO timings (run_id, stage, kind, wall_time, calls) VALUES (?, ?, ?, ?, ?)",
+                    ((run_id, stage, timing["kind"], timing["wall_time"], timing["calls"])
+                     for stage, timing in timings.items())
+                )
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return run_id
+
+    def _run_row(self, conn, row):
+        run = dict(zip(("run_id", "requirements_hash", "created", "validated", "repairs", "total_time"), row))
+        if run["validated"] is not None:
+            run["validated"] = bool(run["validated"])
+        return run
+
+    def get_run(self, run_id):
+        """Return a run's index entry with its stage timings and artifact names, or None"""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT run_id, requirements_hash, created, validated, repairs, total_time FROM runs WHERE run_id = ?",
+                (run_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            run = self._run_row(conn, row)
+            run["timings"] = {
+                stage: {"kind": kind, "wall_time": wall_time, "calls": calls}
+                for stage, kind, wall_time, calls in conn.execute(
+                    "SELECT stage, kind, wall_time, calls FROM timings WHERE run_id = ?", (run_id,)
+                )
+            }
+            run["artifacts"] = dict(conn.execute(
+                "SELECT name, blob FROM artifacts WHERE run_id = ? ORDER BY name", (run_id,)
+            ).fetchall())
+        return run
+
+    def runs(self, requirements=None, validated=None, since=None, limit=100):
+        """Index entries of stored runs, newest first, optionally filtered"""
+        query = "SELECT run_id, requirements_hash, created, validated, repairs, total_time FROM runs"
+        conditions, params = [], []
+        if requirements is not None:
+            conditions.append("requirements_hash = ?")
+            params.append(requirements_hash(requirements))
+        if validated is not None:
+            conditions.append("validated = ?")
+            params.append(int(validated))
+        if since is not None:
+            conditions.append("created >= ?")
+            params.append(since)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            conn = self._connect()
+            return [self._run_row(conn, row) for row in conn.execute(query, params).fetchall()]
+
+    def _blob_for(self, run_id, name):
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT blob FROM artifacts WHERE run_id = ? AND name = ?", (run_id, name)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def read(self, run_id, name):
+        """Return one artifact of a run as text, or None if the run does not have it"""
+        digest = self._blob_for(run_id, name)
+        return None if digest is None else self.get_blob(digest).decode("utf-8")
+
+    def load(self, run_id):
+        """Rebuild a run's contract_spec from its artifacts"""
+        run = self.get_run(run_id)
+        if run is None:
+            raise RuntimeError(f"No artifacts stored for run '{run_id}'")
+        contract_spec = json.loads(self.get_blob(run["artifacts"]["spec.json"]))
+        for field, name in STAGE_ARTIFACTS.items():
+            digest = run["artifacts"].get(name)
+            contract_spec[field] = None if digest is None else self.get_blob(digest).decode("utf-8")
+        if "metrics.json" in run["artifacts"]:
+            contract_spec["metrics"] = json.loads(self.get_blob(run["artifacts"]["metrics.json"]))
+        return contract_spec
+
+    def diff(self, run_a, run_b, name="lib.rs", context=3):
+        """Unified diff of one artifact between two runs; identical blobs are not read"""
+        first, second = self._blob_for(run_a, name), self._blob_for(run_b, name)
+        if first == second:
+            return ""
+        lines_a = [] if first is None else self.get_blob(first).decode("utf-8").splitlines(keepends=True)
+        lines_b = [] if second is None else self.get_blob(second).decode("utf-8").splitlines(keepends=True)
+        return "".join(difflib.unified_diff(lines_a, lines_b, f"{run_a}/{name}", f"{run_b}/{name}", n=context))
+
+    def changed(self, run_a, run_b):
+        """Names of the artifacts that differ between two runs"""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT name FROM artifacts WHERE run_id IN (?, ?) GROUP BY name "
+                "HAVING COUNT(DISTINCT blob) > 1 OR COUNT(*) = 1",
+                (run_a, run_b)
+            ).fetchall()
+        return sorted(row[0] for row in rows)
+
+    def delete_run(self, run_id):
+        """Remove a run from the index, and the blobs no other run refers to"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            try:
+                digests = [row[0] for row in conn.execute("SELECT blob FROM artifacts WHERE run_id = ?", (run_id,))]
+                for table in ("runs", "artifacts", "timings"):
+                    conn.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+                orphans = [digest for digest in set(digests)
+                           if conn.execute("SELECT 1 FROM artifacts WHERE blob = ? LIMIT 1", (digest,)).fetchone() is None]
+                conn.executemany("DELETE FROM blobs WHERE hash = ?", ((digest,) for digest in orphans))
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            # Still under the lock, so save_run cannot start referring to an
+            # orphan between the check above and its removal
+            for digest in orphans:
+                path = self._blob_path(digest)
+                if path.exists():
+                    path.unlink()
+
+    def stats(self):
+        """Number of runs and blobs, and the raw and compressed size of the blobs"""
+        with self._lock:
+            conn = self._connect()
+            runs = conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+            blobs, size, stored = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM blobs"
+            ).fetchone()
+            referenced = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM artifacts JOIN blobs ON artifacts.blob = blobs.hash"
+            ).fetchone()[0]
+        return {"runs": runs, "blobs": blobs, "bytes": size, "stored_bytes": stored, "referenced_bytes": referenced}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+def get_default_store():
+    """Return the process-wide artifact store, or None if it is disabled
+
+    Enabled with SWARM_ARTIFACTS=1; stored at SWARM_ARTIFACT_DIR.
+    """
+    global _default_store
+    load_environment()
+    if os.getenv("SWARM_ARTIFACTS", "0").lower() not in ("1", "true", "yes"):
+        return None
+
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ArtifactStore(os.getenv("SWARM_ARTIFACT_DIR", DEFAULT_ARTIFACT_DIR))
+        return _default_store
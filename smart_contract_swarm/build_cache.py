@@ -0,0 +1,90 @@
+from functools import lru_cache
+from pathlib import Path
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+
+DEFAULT_BUILD_CACHE_DIR = ".swarm_cache/builds"
+
+# Inputs that determine the outcome of `anchor build` and `anchor test`
+SOURCE_FILES = [
+    Path("programs") / "program" / "src" / "lib.rs",
+    Path("programs") / "program" / "Cargo.toml",
+    Path("Anchor.toml")
+]
+
+# Build outputs replayed into target/ on a cache hit
+ARTIFACT_DIRS = [Path("deploy"), Path("idl"), Path("types")]
+
+@lru_cache(maxsize=None)
+def toolchain_version():
+    """Return the versions of the Anchor and Rust toolchains, probed once per process
+
+    Raises FileNotFoundError if Anchor is not installed.
+    """
+    versions = []
+    for command in (["anchor", "--version"], ["rustc", "--version"]):
+        try:
+            result = subprocess.run(command, check=True, capture_output=True, text=True)
+            versions.append(result.stdout.strip())
+        except FileNotFoundError:
+            if command[0] == "anchor":
+                raise
+            versions.append(f"{command[0]} unavailable")
+    return "\n".join(versions)
+
+class BuildCache:
+    """Build and test results keyed by a hash of the generated sources and toolchain
+
+    Each entry is a directory holding result.json (outcome, compiler output
+    and test output) and a copy of the built artifacts.
+    """
+    def __init__(self, root=None):
+        self.root = Path(root or os.getenv("SWARM_BUILD_CACHE_DIR", DEFAULT_BUILD_CACHE_DIR))
+
+    @staticmethod
+    def make_key(workspace, toolchain):
+        """Hash the workspace sources together with the toolchain version"""
+        digest = hashlib.sha256(toolchain.encode("utf-8"))
+        for relative_path in SOURCE_FILES:
+            path = Path(workspace) / relative_path
+            digest.update(str(relative_path).encode("utf-8"))
+            digest.update(path.read_bytes() if path.exists() else b"\0missing")
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the stored result for key, or None if it has not been built"""
+        try:
+            with open(self.root / key / "result.json", "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def store(self, key, result, workspace):
+        """Save a result and the workspace's build artifacts"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=str(self.root), prefix=f".{key}."))
+        try:
+            target = Path(workspace) / "target"
+            for artifact_dir in ARTIFACT_DIRS:
+                if (target / artifact_dir).is_dir():
+                    shutil.copytree(target / artifact_dir, staging / "artifacts" / artifact_dir)
+            with open(staging / "result.json", "w") as f:
+                json.dump(result, f, indent=4)
+
+            try:
+                os.replace(staging, self.root / key)
+            except OSError:
+                # An identical result was stored concurrently
+                pass
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def restore_artifacts(self, key, workspace):
+        """Copy the stored artifacts back into the workspace's target dir"""
+        artifacts = self.root / key / "artifacts"
+        if artifacts.is_dir():
+            shutil.copytree(artifacts, Path(workspace) / "target", dirs_exist_ok=True)
@@ -0,0 +1,308 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+import asyncio
+import multiprocessing
+import multiprocessing.util
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from .build_cache import BuildCache, toolchain_version
+from .clients import env_int
+from .metrics import annotate, track
+from .validation import cargo_check, check_source, extract_rust_source
+from .validators import DEFAULT_BASE_PORT, PORT_BLOCK, ValidatorPool, write_keypair
+from .workspace import AnchorTemplate, ANCHOR_NOT_FOUND, set_localnet_program
+
+DECLARE_ID = re.compile(r'declare_id!\(\s*"[^"]*"\s*\)')
+
+def empty_result(**fields):
+    result = {"success": False, "precheck": [], "check": None, "build": None, "test": None}
+    result.update(fields)
+    return result
+
+def run_anchor(command, program_dir, env):
+    with track(f"anchor {command}", kind="build"):
+        completed = subprocess.run(["anchor", command], cwd=program_dir, env=env, capture_output=True, text=True)
+    return {"returncode": completed.returncode, "stdout": completed.stdout, "stderr": completed.stderr}
+
+@contextmanager
+def fresh_program_id(program_dir):
+    """Build the workspace's program under a new program id for the duration of the block
+
+    The new keypair is written to target/deploy, where anchor deploys from,
+    and its id into declare_id! and Anchor.toml. Both files are put back
+    afterwards, so the workspace and its build cache key keep the original.
+    """
+    program_dir = Path(program_dir)
+    source_path = program_dir / "programs" / "program" / "src" / "lib.rs"
+    config_path = program_dir / "Anchor.toml"
+    originals = {path: path.read_text() for path in (source_path, config_path) if path.exists()}
+    deploy_dir = program_dir / "target" / "deploy"
+    deploy_dir.mkdir(parents=True, exist_ok=True)
+    program_id = write_keypair(deploy_dir / "program-keypair.json")
+    try:
+        source_path.write_text(DECLARE_ID.sub(f'declare_id!("{program_id}")', originals[source_path]))
+        if config_path in originals:
+            config_path.write_text(set_localnet_program(originals[config_path], "program", program_id))
+        yield program_id
+    finally:
+        for path, text in originals.items():
+            path.write_text(text)
+
+def run_pooled_test(program_dir, env, validators):
+    """Run `anchor test` against a validator from the pool instead of starting one
+
+    Each run pays with a wallet of its own, funded on the validator. A
+    failure on a validator that already ran other contracts may still come
+    from their leftover accounts, so it is retried once on a freshly started
+    one.
+    """
+    with track("anchor test", kind="build"), tempfile.TemporaryDirectory(prefix="swarm-wallet-") as wallet_dir:
+        wallet = Path(wallet_dir) / "wallet.json"
+        while True:
+            validator = validators.acquire()
+            reused = validator.runs > 0
+            try:
+                validator.fund_wallet(wallet)
+                completed = subprocess.run(
+                    ["anchor", "test", "--skip-local-validator", "--skip-build",
+                     "--provider.cluster", validator.url, "--provider.wallet", str(wallet)],
+                    cwd=program_dir, env=env, capture_output=True, text=True
+                )
+            except BaseException:
+                validators.release(validator, failed=True)
+                raise
+            failed = completed.returncode != 0
+            validators.release(validator, failed)
+            if not (failed and reused):
+                break
+        annotate(validator=validator.url)
+    return {"returncode": completed.returncode, "stdout": completed.stdout, "stderr": completed.stderr}
+
+def run_build(program_dir, env, build_cache, validators=None):
+    """Pre-check, type-check, build and test a workspace, returning the full result
+
+    The source is first checked for balanced brackets, a #[program] module
+    and declare_id!, then type-checked with `cargo check`; anchor build and
+    test only run once both pass. Results are cached by a hash of the
+    generated sources, Anchor.toml and the toolchain version; a hit replays
+    the stored output and artifacts instead of compiling again and is marked
+    with "cached". With a ValidatorPool, the program is built under a fresh
+    id and tested against a pooled validator (see fresh_program_id and
+    run_pooled_test). Nothing is printed, see print_build_result.
+    """
+    program_dir = Path(program_dir)
+    source_path = program_dir / "programs" / "program" / "src" / "lib.rs"
+
+    # Reject structurally broken output without starting a compiler
+    with track("precheck", kind="build"):
+        problems = check_source(source_path.read_text()) if source_path.exists() else ["lib.rs was not generated"]
+    if problems:
+        return empty_result(precheck=problems)
+
+    try:
+        # Check if Anchor is installed
+        toolchain = toolchain_version()
+
+        key = build_cache.make_key(program_dir, toolchain)
+        cached = build_cache.get(key)
+        if cached is not None:
+            build_cache.restore_artifacts(key, program_dir)
+            cached["cached"] = True
+            return cached
+
+        result = empty_result()
+
+        # Type-check first; it fails much faster than a full SBF build
+        with track("cargo check", kind="build"):
+            result["check"] = cargo_check(program_dir, env)
+
+        if result["check"] is None or result["check"]["returncode"] == 0:
+            # A pooled validator still holds the programs and accounts of
+            # earlier runs, so each build deployed there gets an id of its own
+            with fresh_program_id(program_dir) if validators is not None else nullcontext():
+                # Build the contract
+                result["build"] = run_anchor("build", program_dir, env)
+
+                # Run tests
+                if result["build"]["returncode"] == 0:
+                    if validators is None:
+                        result["test"] = run_anchor("test", program_dir, env)
+                    else:
+                        result["test"] = run_pooled_test(program_dir, env, validators)
+                    result["success"] = result["test"]["returncode"] == 0
+
+        # Test failures can come from the local validator rather than the
+        # code, so only deterministic outcomes are cached
+        if result["success"] or result["test"] is None:
+            build_cache.store(key, result, program_dir)
+        return result
+    except FileNotFoundError:
+        return empty_result(error=ANCHOR_NOT_FOUND)
+
+def print_build_result(result):
+    if result.get("error"):
+        print(result["error"])
+    if result.get("cached"):
+        print("\nReplaying cached build and test results...")
+
+    for problem in result.get("precheck") or []:
+        print(f"Pre-check failed: {problem}")
+
+    check = result.get("check")
+    if check is not None:
+        for diagnostic in check["diagnostics"]:
+            if diagnostic["level"] == "error":
+                print(diagnostic["rendered"], end="")
+        if check["returncode"] != 0:
+            print(f"Error during build/test: 'cargo check' returned non-zero exit status {check['returncode']}.")
+
+    for phase in ("build", "test"):
+        outcome = result[phase]
+        if outcome is None:
+            continue
+        print(outcome["stdout"], end="")
+        print(outcome["stderr"], end="")
+        if outcome["returncode"] != 0:
+            print(f"Error during build/test: 'anchor {phase}' returned non-zero exit status {outcome['returncode']}.")
+
+# State of the current worker process, set up by _init_worker
+_worker = {}
+
+def _init_worker(root, template_dir, build_cache_root, validators, worker_counter):
+    with worker_counter.get_lock():
+        index = worker_counter.value
+        worker_counter.value += 1
+    worker_dir = Path(root) / f"worker-{os.getpid()}"
+    template = AnchorTemplate(template_dir)
+    target_dir = worker_dir / "target"
+    # cargo locks a target dir for the whole build, so each worker needs its
+    # own; seeding it from the template's compiled dependencies means they
+    # are not rebuilt per worker
+    if not target_dir.exists() and template.target_dir.is_dir():
+        shutil.copytree(template.target_dir, target_dir, symlinks=True)
+    pool = None
+    if validators:
+        # Each worker gets its own validators on a separate block of ports
+        pool = ValidatorPool(validators, base_port=DEFAULT_BASE_PORT + index * validators * PORT_BLOCK,
+                             root=worker_dir / "validators")
+        # Worker processes exit without running atexit hooks, but they do run
+        # multiprocessing finalizers
+        multiprocessing.util.Finalize(None, pool.close, exitpriority=10)
+    _worker.update(
+        workspace=worker_dir / "program",
+        target_dir=target_dir,
+        template=template,
+        build_cache=BuildCache(build_cache_root),
+        validators=pool
+    )
+
+def _build_job(source):
+    workspace = _worker["workspace"]
+    template = _worker["template"]
+    try:
+        if not (workspace / "Anchor.toml").exists():
+            template.clone(workspace, _worker["target_dir"])
+    except RuntimeError as e:
+        return empty_result(error=str(e), worker=os.getpid())
+
+    (workspace / "programs" / "program" / "src" / "lib.rs").write_text(source)
+    env = template.build_env(_worker["target_dir"])
+    if "RUSTC_WRAPPER" not in env and shutil.which("sccache"):
+        # Share compiled crates between worker target dirs
+        env["RUSTC_WRAPPER"] = "sccache"
+
+    result = run_build(workspace, env, _worker["build_cache"], _worker["validators"])
+    result["worker"] = os.getpid()
+    return result
+
+class BuildFarm:
+    """Builds and tests contracts in a pool of worker processes
+
+    Each worker owns a workspace and a cargo target dir under root, so any
+    number of pipeline runs can build at once without touching each other's
+    lib.rs. Workers take jobs from the pool's queue, share the on-disk
+    BuildCache, and start from the template's compiled dependencies (plus
+    sccache when it is installed). With validators, each worker keeps that
+    many local validators warm for `anchor test` (see ValidatorPool). The
+    pool is capped at the core count and started on first use.
+    """
+    def __init__(self, workers=None, root=None, template=None, build_cache=None, validators=None):
+        cores = os.cpu_count() or 1
+        workers = workers or env_int("SWARM_BUILD_WORKERS", 0) or cores
+        self.workers = max(1, min(workers, cores))
+        self.template = template or AnchorTemplate()
+        self.build_cache = build_cache or BuildCache()
+        self.validators = env_int("SWARM_VALIDATORS", 0) if validators is None else validators
+        self.root = Path(root) if root else None
+        self._owns_root = root is None
+        self._pool = None
+        self._lock = threading.Lock()
+        # Submitted builds not finished yet; a separate lock, since done
+        # callbacks run on the pool's thread while close() holds _lock
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                if self.root is None:
+                    self.root = Path(tempfile.mkdtemp(prefix="swarm-farm-"))
+                self.root.mkdir(parents=True, exist_ok=True)
+                # Workers are spawned rather than forked; the parent runs
+                # threads and event loops that must not be copied mid-flight
+                context = multiprocessing.get_context("spawn")
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(str(self.root.resolve()), str(self.template.cache_dir.resolve()),
+                              str(self.build_cache.root.resolve()), self.validators, context.Value("i", 0))
+                )
+            return self._pool
+
+    def submit(self, source):
+        """Queue a build of source (a Rust program or a reply containing one), returning a Future"""
+        future = self._executor().submit(_build_job, extract_rust_source(source))
+        with self._pending_lock:
+            self._pending.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def _forget(self, future):
+        with self._pending_lock:
+            self._pending.discard(future)
+
+    def build(self, source):
+        """Build and test source in a worker, returning the structured result"""
+        return self.submit(source).result()
+
+    async def abuild(self, source):
+        """Async version of build"""
+        return await asyncio.wrap_future(self.submit(source))
+
+    def close(self):
+        """Stop the workers and remove their workspaces"""
+        # Builds that have not started are dropped; shutdown's cancel_futures
+        # would do this but needs Python 3.9
+        with self._pending_lock:
+            pending = list(self._pending)
+        for future in pending:
+            future.cancel()
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+            if self._owns_root and self.root is not None:
+                shutil.rmtree(self.root, ignore_errors=True)
+                self.root = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
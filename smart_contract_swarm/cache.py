@@ -0,0 +1,122 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from .clients import env_int, load_environment
+
+DEFAULT_CACHE_PATH = ".swarm_cache/responses.sqlite3"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+class ResponseCache:
+    """On-disk cache of LLM responses with size-bounded LRU eviction
+
+    Entries are stored in SQLite and keyed by a hash of everything that
+    determines the completion: model name, temperature, system prompt and input.
+    """
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @staticmethod
+    def make_key(model, temperature, system_prompt, input_data):
+        """Hash the parameters that determine an LLM response"""
+        payload = json.dumps([model, temperature, system_prompt, str(input_data)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _connect(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        return self._conn
+
+    def get(self, key):
+        """Return the cached response for key, or None on a miss"""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, response):
+        """Store a response, evicting the least recently used entries past max_bytes"""
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, response, size, time.time())
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        stale = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_used ASC"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def stats(self):
+        """Return hit/miss counters and the current size of the cache"""
+        with self._lock:
+            entries, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+    def clear(self):
+        """Remove every cached response"""
+        with self._lock:
+            self._connect().execute("DELETE FROM responses")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+def get_default_cache():
+    """Return the process-wide response cache, or None if it is disabled
+
+    Configured through SWARM_RESPONSE_CACHE (set to 0 to disable),
+    SWARM_CACHE_PATH and SWARM_CACHE_MAX_MB.
+    """
+    global _default_cache
+    load_environment()
+    if os.getenv("SWARM_RESPONSE_CACHE", "1").lower() in ("0", "false", "no"):
+        return None
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache(
+                os.getenv("SWARM_CACHE_PATH", DEFAULT_CACHE_PATH),
+                env_int("SWARM_CACHE_MAX_MB", DEFAULT_MAX_BYTES // (1024 * 1024)) * 1024 * 1024
+            )
+        return _default_cache
@@ -0,0 +1,45 @@
+from pathlib import Path
+import json
+import os
+import tempfile
+
+DEFAULT_CHECKPOINT_DIR = ".swarm_runs"
+
+class CheckpointStore:
+    """Per-run checkpoint files holding the completed stages of a contract spec"""
+    def __init__(self, root=DEFAULT_CHECKPOINT_DIR):
+        self.root = Path(root)
+
+    def path(self, run_id):
+        return self.root / f"{run_id}.json"
+
+    def save(self, run_id, contract_spec):
+        """Atomically write the current state of a run"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.root), prefix=f".{run_id}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(contract_spec, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            # The rename is atomic, so readers see either the old or the new checkpoint
+            os.replace(tmp_path, self.path(run_id))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def load(self, run_id):
+        """Load the contract spec saved for a run"""
+        try:
+            with open(self.path(run_id), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise RuntimeError(f"No checkpoint found for run '{run_id}'")
+
+    def exists(self, run_id):
+        return self.path(run_id).exists()
+
+    def delete(self, run_id):
+        if self.exists(run_id):
+            os.remove(self.path(run_id))
@@ -0,0 +1,64 @@
+import os
+import threading
+
+DEFAULT_RPC_URL = "https://api.devnet.solana.com"
+DEFAULT_MODEL = "gpt-4"
+
+# Shared clients, created on first use so importing the package stays cheap
+_llms = {}
+_rpc = None
+_env_loaded = False
+_lock = threading.Lock()
+
+def load_environment():
+    """Load environment variables from .env once per process"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+def env_int(name, default):
+    """Integer setting from the environment; unset or empty means default"""
+    value = os.getenv(name, "").strip()
+    return int(value) if value else default
+
+def env_float(name, default):
+    """Float setting from the environment; unset or empty means default"""
+    value = os.getenv(name, "").strip()
+    return float(value) if value else default
+
+def get_llm(model=None):
+    """Return the shared language model for model (gpt-4 by default), creating it on first use"""
+    model = model or DEFAULT_MODEL
+    with _lock:
+        if model not in _llms:
+            load_environment()
+            from langchain_community.chat_models import ChatOpenAI
+            # Retries are handled by the shared LLMScheduler, which also
+            # adapts concurrency to throttling, so the client must not retry
+            _llms[model] = ChatOpenAI(
+                model=model,
+                temperature=0.7,
+                openai_api_key=os.getenv("OPENAI_API_KEY"),
+                max_retries=0
+            )
+        return _llms[model]
+
+def get_rpc():
+    """Return the shared async JSON-RPC client, creating it on first use
+
+    Configured through SOLANA_RPC_URL, SWARM_RPC_MAX_CONCURRENCY and
+    SWARM_RPC_BATCH_SIZE.
+    """
+    global _rpc
+    with _lock:
+        if _rpc is None:
+            load_environment()
+            from .rpc import AsyncRpcClient
+            _rpc = AsyncRpcClient(
+                os.getenv("SOLANA_RPC_URL", DEFAULT_RPC_URL),
+                max_batch_size=env_int("SWARM_RPC_BATCH_SIZE", 100),
+                max_concurrency=env_int("SWARM_RPC_MAX_CONCURRENCY", 8)
+            )
+        return _rpc
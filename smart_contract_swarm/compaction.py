@@ -0,0 +1,71 @@
+import re
+from .scheduler import estimate_tokens
+
+FENCED_BLOCK = re.compile(r"```[ \t]*([\w+-]*)[^\n]*\n(.*?)```", re.DOTALL)
+STRUCTURE_LINE = re.compile(r"^\s*(#{1,6}\s|[-*+]\s|\d+[.)]\s|\|)")
+TRUNCATION_MARKER = "\n... [truncated]"
+
+_encoding = None
+
+def count_tokens(text):
+    """Count tokens with tiktoken when it is installed, otherwise estimate them"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.encoding_for_model("gpt-4")
+        except ImportError:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return estimate_tokens(text)
+
+def extract_code_blocks(text, languages=None):
+    """Return the contents of fenced code blocks, optionally filtered by language"""
+    blocks = []
+    for language, body in FENCED_BLOCK.findall(text):
+        if languages is None or language.lower() in languages:
+            blocks.append(body.strip("\n"))
+    return blocks
+
+def extract_structure(text):
+    """Keep headings, list items and table rows, dropping free-running prose"""
+    lines = [line for line in FENCED_BLOCK.sub("", text).splitlines() if STRUCTURE_LINE.match(line)]
+    return "\n".join(lines)
+
+def truncate_to_tokens(text, budget):
+    """Trim text to at most budget tokens, keeping the beginning"""
+    if count_tokens(text) <= budget:
+        return text
+
+    # Binary search on characters; token counts are monotonic in prefix length
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(text[:middle]) + count_tokens(TRUNCATION_MARKER) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low] + TRUNCATION_MARKER
+
+def compact(text, budget=None, mode="full"):
+    """Reduce an agent's output to what the next agent needs
+
+    mode "code" keeps only fenced code blocks, "structured" keeps code blocks
+    plus headings and lists, and "full" keeps everything. If nothing matches
+    the mode the full text is used. The result is trimmed to budget tokens.
+    """
+    text = str(text)
+    compacted = text
+    if mode == "code":
+        compacted = "\n\n".join(extract_code_blocks(text))
+    elif mode == "structured":
+        parts = [extract_structure(text)]
+        parts.extend(f"```\n{block}\n```" for block in extract_code_blocks(text))
+        compacted = "\n\n".join(part for part in parts if part)
+
+    if not compacted.strip():
+        compacted = text
+    if budget is not None:
+        compacted = truncate_to_tokens(compacted, budget)
+    return compacted
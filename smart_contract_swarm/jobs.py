@@ -0,0 +1,446 @@
+from contextlib import contextmanager
+from pathlib import Path
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from .clients import env_float, env_int, load_environment
+
+DEFAULT_QUEUE_PATH = ".swarm_jobs/queue.sqlite3"
+DEFAULT_LEASE_SECONDS = 60.0
+DEFAULT_MAX_ATTEMPTS = 3
+# Delay before the first retry of a failed job; doubled on every attempt
+RETRY_DELAY_SECONDS = 5.0
+# Finished jobs considered when computing latency percentiles
+LATENCY_WINDOW = 1000
+# Stage outputs a job must produce (when its swarm's workflow has the stage)
+# to count as done; without them the attempt is failed and retried
+REQUIRED_OUTPUTS = ("technical_specs", "architecture", "contract_code", "security_audit", "test_cases")
+
+JOB_COLUMNS = (
+    "id", "request_id", "requirements", "priority", "status", "attempts", "max_attempts",
+    "deadline", "available_at", "worker", "lease_expires", "created", "started", "finished",
+    "result", "error"
+)
+
+def _percentile(values, percentile):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(percentile * (len(values) - 1))))]
+
+class JobQueue:
+    """Persistent queue of contract requests in SQLite
+
+    Jobs are claimed highest priority first and held under a lease that the
+    worker renews while it runs them. A job whose lease runs out, because its
+    worker crashed or was killed, is handed to the next worker that asks,
+    until it has been attempted max_attempts times. Jobs still waiting when
+    their deadline passes are failed without running. Any number of worker
+    processes on the host can share one queue file; see PostgresJobQueue for
+    workers spread across machines.
+    """
+    placeholder = "?"
+    lock_clause = ""
+    id_column = "id INTEGER PRIMARY KEY AUTOINCREMENT"
+
+    def __init__(self, path=DEFAULT_QUEUE_PATH, lease_seconds=None, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 retry_delay=RETRY_DELAY_SECONDS):
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds or env_float("SWARM_JOB_LEASE_SECONDS", DEFAULT_LEASE_SECONDS)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = self._open()
+            self._query(
+                self._conn,
+                f"CREATE TABLE IF NOT EXISTS jobs ({self.id_column}, request_id TEXT, "
+                "requirements TEXT NOT NULL, priority INTEGER NOT NULL, status TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL, max_attempts INTEGER NOT NULL, deadline DOUBLE PRECISION, "
+                "available_at DOUBLE PRECISION NOT NULL, worker TEXT, lease_expires DOUBLE PRECISION, "
+                "created DOUBLE PRECISION NOT NULL, started DOUBLE PRECISION, finished DOUBLE PRECISION, "
+                "result TEXT, error TEXT)"
+            )
+            self._query(self._conn, "CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority, id)")
+            self._query(self._conn, "CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (status, finished)")
+        return self._conn
+
+    def _query(self, conn, sql, params=()):
+        return conn.execute(sql.replace("?", self.placeholder), params)
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two processes
+        # can never claim the same job
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def enqueue(self, requirements, priority=0, deadline=None, max_attempts=None, request_id=None):
+        """Add a request to the queue and return its job id
+
+        Higher priorities run first; deadline is a Unix timestamp after which
+        the job is no longer worth running.
+        """
+        return self.enqueue_many([{
+            "requirements": requirements, "priority": priority, "deadline": deadline,
+            "max_attempts": max_attempts, "request_id": request_id
+        }])[0]
+
+    def enqueue_many(self, records):
+        """Add many requests in one transaction, returning their job ids
+
+        Each record is a dict with "requirements" (or "body") and optionally
+        "priority", "deadline", "max_attempts" and "request_id".
+        """
+        now = time.time()
+        ids = []
+        with self._transaction() as conn:
+            for record in records:
+                ids.append(self._insert(
+                    conn,
+                    "INSERT INTO jobs (request_id, requirements, priority, status, attempts, max_attempts, "
+                    "deadline, available_at, created) VALUES (?, ?, ?, 'queued', 0, ?, ?, ?, ?)",
+                    (record.get("request_id"), record.get("requirements") or record.get("body", ""),
+                     record.get("priority") or 0, record.get("max_attempts") or self.max_attempts,
+                     record.get("deadline"), now, now)
+                ))
+        return ids
+
+    def _insert(self, conn, sql, params):
+        # RETURNING needs SQLite 3.35, so the new id is read from the cursor
+        return self._query(conn, sql, params).lastrowid
+
+    def claim(self, worker):
+        """Lease the next runnable job to worker, returning it as a dict or None"""
+        now = time.time()
+        with self._transaction() as conn:
+            self._query(
+                conn,
+                "UPDATE jobs SET status = 'failed', finished = ?, error = 'deadline passed before the job ran' "
+                "WHERE status = 'queued' AND deadline IS NOT NULL AND deadline < ?",
+                (now, now)
+            )
+            # A job whose worker died on its last attempt is not handed out again
+            self._query(
+                conn,
+                "UPDATE jobs SET status = 'failed', finished = ?, worker = NULL, lease_expires = NULL, "
+                "error = 'lease expired on the last attempt' "
+                "WHERE status = 'running' AND lease_expires < ? AND attempts >= max_attempts",
+                (now, now)
+            )
+            row = self._query(
+                conn,
+                "SELECT id FROM jobs WHERE (status = 'queued' AND available_at <= ?) "
+                "OR (status = 'running' AND lease_expires < ?) "
+                "ORDER BY priority DESC, id LIMIT 1" + self.lock_clause,
+                (now, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._query(
+                conn,
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, lease_expires = ?, "
+                "started = COALESCE(started, ?) WHERE id = ?",
+                (worker, now + self.lease_seconds, now, row[0])
+            )
+            return self._get(conn, row[0])
+
+    def heartbeat(self, job_id, worker):
+        """Extend worker's lease on a job; False means the lease was lost"""
+        with self._transaction() as conn:
+            cursor = self._query(
+                conn,
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time() + self.lease_seconds, job_id, worker)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id, worker, result):
+        """Store a job's result; False means another worker took the job over"""
+        with self._transaction() as conn:
+            cursor = self._query(
+                conn,
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, finished = ?, lease_expires = NULL "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (json.dumps(result), time.time(), job_id, worker)
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, job_id, worker, error, retry=True):
+        """Record a failed attempt, requeueing the job with backoff while attempts remain"""
+        now = time.time()
+        with self._transaction() as conn:
+            job = self._get(conn, job_id)
+            if job is None or job["worker"] != worker or job["status"] != "running":
+                return False
+            if retry and job["attempts"] < job["max_attempts"]:
+                self._query(
+                    conn,
+                    "UPDATE jobs SET status = 'queued', available_at = ?, worker = NULL, lease_expires = NULL, "
+                    "error = ? WHERE id = ?",
+                    (now + self.retry_delay * 2 ** (job["attempts"] - 1), str(error), job_id)
+                )
+            else:
+                self._query(
+                    conn,
+                    "UPDATE jobs SET status = 'failed', finished = ?, lease_expires = NULL, error = ? WHERE id = ?",
+                    (now, str(error), job_id)
+                )
+            return True
+
+    def _get(self, conn, job_id):
+        row = self._query(conn, f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(JOB_COLUMNS, row))
+        if job["result"] is not None:
+            job["result"] = json.loads(job["result"])
+        return job
+
+    def get(self, job_id):
+        """Return a job as a dict, or None if there is no such job"""
+        with self._lock:
+            return self._get(self._connect(), job_id)
+
+    def jobs(self, status=None, limit=100):
+        """Jobs with the given status (or all), oldest first"""
+        with self._lock:
+            conn = self._connect()
+            if status is None:
+                rows = self._query(conn, "SELECT id FROM jobs ORDER BY id LIMIT ?", (limit,)).fetchall()
+            else:
+                rows = self._query(
+                    conn, "SELECT id FROM jobs WHERE status = ? ORDER BY id LIMIT ?", (status, limit)
+                ).fetchall()
+            return [self._get(conn, row[0]) for row in rows]
+
+    def depth(self):
+        """Number of jobs in each status"""
+        with self._lock:
+            rows = self._query(self._connect(), "SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    def stats(self):
+        """Queue depth, age of the oldest waiting job and latency percentiles of recent jobs
+
+        Latency runs from enqueue to finish, wait from enqueue to the first
+        claim and run time from the first claim to finish, in seconds.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            oldest = self._query(conn, "SELECT MIN(created) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            rows = self._query(
+                conn,
+                "SELECT created, started, finished FROM jobs WHERE status = 'done' "
+                "ORDER BY finished DESC LIMIT ?",
+                (LATENCY_WINDOW,)
+            ).fetchall()
+        latency = [finished - created for created, _, finished in rows]
+        wait = [started - created for created, started, _ in rows]
+        run_time = [finished - started for _, started, finished in rows]
+        return {
+            "depth": self.depth(),
+            "oldest_queued_seconds": None if oldest is None else now - oldest,
+            "latency": {"p50": _percentile(latency, 0.5), "p95": _percentile(latency, 0.95)},
+            "wait": {"p50": _percentile(wait, 0.5), "p95": _percentile(wait, 0.95)},
+            "run_time": {"p50": _percentile(run_time, 0.5), "p95": _percentile(run_time, 0.95)}
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+class PostgresJobQueue(JobQueue):
+    """JobQueue stored in PostgreSQL, for workers on several machines
+
+    Claims lock the chosen row with FOR UPDATE SKIP LOCKED, so concurrent
+    workers never wait on each other or take the same job. Needs psycopg.
+    """
+    placeholder = "%s"
+    lock_clause = " FOR UPDATE SKIP LOCKED"
+    id_column = "id BIGSERIAL PRIMARY KEY"
+
+    def __init__(self, url, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+
+    def _open(self):
+        import psycopg
+        return psycopg.connect(self.url, autocommit=True)
+
+    def _insert(self, conn, sql, params):
+        return self._query(conn, sql + " RETURNING id", params).fetchone()[0]
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            conn = self._connect()
+            with conn.transaction():
+                yield conn
+
+def open_queue(location=None, **kwargs):
+    """Open the job queue at location, a SQLite path or a postgresql:// URL
+
+    Defaults to SWARM_JOB_QUEUE, then .swarm_jobs/queue.sqlite3.
+    """
+    load_environment()
+    location = location or os.getenv("SWARM_JOB_QUEUE") or DEFAULT_QUEUE_PATH
+    if location.startswith(("postgres://", "postgresql://")):
+        return PostgresJobQueue(location, **kwargs)
+    if location.startswith("sqlite:///"):
+        location = location[len("sqlite:///"):]
+    return JobQueue(location, **kwargs)
+
+class JobWorker:
+    """Runs queued contract requests through a ContractSwarm
+
+    Up to concurrency jobs run at once in one event loop, and their leases
+    are renewed while they run. Each job's pipeline is checkpointed as run
+    "job-<id>", so a job retried after a crash or failed attempt resumes
+    from its last completed stage. Start as many workers as needed, on this
+    host or others, against the same queue. A swarm the worker creates
+    builds in a BuildFarm with private workspaces, since worker processes
+    on one host would otherwise share the program/ workspace.
+    """
+    def __init__(self, queue, swarm=None, concurrency=None, poll_interval=1.0, worker_id=None):
+        self.queue = queue
+        self._swarm = swarm
+        # A swarm the worker creates is closed when run() returns
+        self._owns_swarm = swarm is None
+        self._build_farm = None
+        self.concurrency = concurrency or env_int("SWARM_WORKER_CONCURRENCY", 4)
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.completed = 0
+        self.failed = 0
+        self._stopping = None
+
+    @property
+    def swarm(self):
+        if self._swarm is None:
+            from .build_farm import BuildFarm
+            from .swarm import ContractSwarm
+            build_farm = None
+            if env_int("SWARM_BUILD_WORKERS", 0) <= 0:
+                # The swarm's build lock only serializes builds within this
+                # process, so the shared workspace is not used at all
+                build_farm = self._build_farm = BuildFarm(workers=self.concurrency)
+            self._swarm = ContractSwarm(build_farm=build_farm)
+        return self._swarm
+
+    def _call(self, func, *args):
+        return asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def stop(self):
+        """Stop claiming jobs; jobs already running are finished first"""
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def run(self, drain=False):
+        """Process jobs until stop() is called, or until the queue is empty if drain is set"""
+        self._stopping = asyncio.Event()
+        running = set()
+        for problem in await self._call(self.swarm.warm):
+            print(f"Warm-up: {problem}")
+        print(f"Worker {self.worker_id} started with concurrency {self.concurrency}")
+        try:
+            while not self._stopping.is_set():
+                while len(running) < self.concurrency:
+                    job = await self._call(self.queue.claim, self.worker_id)
+                    if job is None:
+                        break
+                    running.add(asyncio.ensure_future(self._process(job)))
+
+                if drain and not running and (await self._call(self.queue.depth))["queued"] == 0:
+                    break
+                stopping = asyncio.ensure_future(self._stopping.wait())
+                await asyncio.wait(running | {stopping}, timeout=self.poll_interval,
+                                   return_when=asyncio.FIRST_COMPLETED)
+                stopping.cancel()
+                running = {task for task in running if not task.done()}
+            if running:
+                await asyncio.wait(running)
+        finally:
+            for task in running:
+                task.cancel()
+            if self._owns_swarm and self._swarm is not None:
+                await self._call(self._swarm.close)
+                self._swarm = None
+            if self._build_farm is not None:
+                await self._call(self._build_farm.close)
+                self._build_farm = None
+        print(f"Worker {self.worker_id} stopped: {self.completed} completed, {self.failed} failed")
+
+    async def _process(self, job):
+        run_id = f"job-{job['id']}"
+        print(f"\nStarting job {job['id']} (attempt {job['attempts']}/{job['max_attempts']})")
+        if job["attempts"] > 1 and self.swarm.checkpoints.exists(run_id):
+            pipeline = self.swarm.aresume(run_id)
+        else:
+            pipeline = self.swarm.aprocess_contract_request(job["requirements"], run_id=run_id)
+        task = asyncio.ensure_future(pipeline)
+        heartbeat = asyncio.ensure_future(self._keep_lease(job["id"], task))
+        try:
+            timeout = None if job["deadline"] is None else max(0.0, job["deadline"] - time.time())
+            contract_spec = await asyncio.wait_for(task, timeout)
+        except asyncio.TimeoutError:
+            await self._call(self.queue.fail, job["id"], self.worker_id, "deadline exceeded", False)
+            self.failed += 1
+            return
+        except asyncio.CancelledError:
+            # The heartbeat only finishes once it has lost the lease and
+            # cancelled the pipeline; any other cancellation is the worker's
+            if not heartbeat.done():
+                raise
+            # The job now belongs to another worker
+            print(f"\nLost the lease on job {job['id']}")
+            return
+        except Exception as e:
+            await self._call(self.queue.fail, job["id"], self.worker_id, str(e))
+            self.failed += 1
+            return
+        finally:
+            heartbeat.cancel()
+
+        # The pipeline records a failed stage in the spec instead of raising
+        missing = [name for name in REQUIRED_OUTPUTS
+                   if name in self.swarm.workflow and contract_spec.get(name) is None]
+        if contract_spec.get("error") or missing:
+            error = contract_spec.get("error") or f"pipeline did not produce {', '.join(missing)}"
+            await self._call(self.queue.fail, job["id"], self.worker_id, error)
+            self.failed += 1
+        elif await self._call(self.queue.complete, job["id"], self.worker_id, contract_spec):
+            self.completed += 1
+
+    async def _keep_lease(self, job_id, task):
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            if not await self._call(self.queue.heartbeat, job_id, self.worker_id):
+                task.cancel()
+                return
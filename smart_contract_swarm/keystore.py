@@ -0,0 +1,75 @@
+from pathlib import Path
+import sqlite3
+import threading
+import time
+
+DEFAULT_KEYSTORE_PATH = "wallet/keystore.sqlite3"
+
+class Keystore:
+    """Many wallets in one SQLite file, indexed by public key
+
+    Each row holds the base58 public key and the 32-byte secret seed, so a
+    wallet can be looked up without loading the rest of the store.
+    """
+    def __init__(self, path=DEFAULT_KEYSTORE_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS wallets ("
+                "public_key TEXT PRIMARY KEY, seed BLOB NOT NULL, created REAL NOT NULL) WITHOUT ROWID"
+            )
+        return self._conn
+
+    def add_many(self, wallets):
+        """Insert (public_key, seed) pairs in a single transaction"""
+        created = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO wallets (public_key, seed, created) VALUES (?, ?, ?)",
+                    ((public_key, seed, created) for public_key, seed in wallets)
+                )
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def get(self, public_key):
+        """Return the secret seed for public_key, or None if it is not stored"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT seed FROM wallets WHERE public_key = ?", (str(public_key),)
+            ).fetchone()
+        return None if row is None else bytes(row[0])
+
+    def public_keys(self, limit=None):
+        """Stored public keys, oldest first"""
+        query = "SELECT public_key FROM wallets ORDER BY created, public_key"
+        with self._lock:
+            if limit is None:
+                rows = self._connect().execute(query).fetchall()
+            else:
+                rows = self._connect().execute(query + " LIMIT ?", (limit,)).fetchall()
+        return [row[0] for row in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM wallets").fetchone()[0]
+
+    def __contains__(self, public_key):
+        return self.get(public_key) is not None
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,171 @@
+from contextlib import contextmanager
+import asyncio
+import contextvars
+import threading
+import time
+
+# The run and span currently being recorded. Context variables follow asyncio
+# tasks, and executor calls made through copy_context().run, so concurrent
+# runs never record into each other's metrics.
+_current_run = contextvars.ContextVar("swarm_current_run", default=None)
+_current_span = contextvars.ContextVar("swarm_current_span", default=None)
+
+class PipelineMetrics:
+    """Timings, token usage and retries recorded for one pipeline run
+
+    Every span records wall time, queue wait (time spent waiting for an LLM
+    slot or the build workspace), prompt and completion tokens and retries.
+    """
+    def __init__(self, run_id):
+        self.run_id = run_id
+        self.started = time.time()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, kind="stage", **attributes):
+        record = {
+            "name": name,
+            "kind": kind,
+            "start": time.time(),
+            "end": None,
+            "wall_time": None,
+            "queue_wait": 0.0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "retries": 0,
+            "status": "ok"
+        }
+        record.update(attributes)
+        token = _current_span.set(record)
+        started = time.perf_counter()
+        try:
+            yield record
+        except asyncio.CancelledError:
+            record["status"] = "cancelled"
+            raise
+        except BaseException:
+            record["status"] = "error"
+            raise
+        finally:
+            record["wall_time"] = time.perf_counter() - started
+            record["end"] = record["start"] + record["wall_time"]
+            _current_span.reset(token)
+            with self._lock:
+                self.spans.append(record)
+
+    def to_dict(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["start"])
+        return {
+            "run_id": self.run_id,
+            "total_time": time.time() - self.started,
+            "spans": spans
+        }
+
+@contextmanager
+def activate(metrics):
+    """Record spans from the current task into metrics"""
+    token = _current_run.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_run.reset(token)
+
+@contextmanager
+def track(name, kind="stage", **attributes):
+    """Record a span in the active run; does nothing outside a run"""
+    metrics = _current_run.get()
+    if metrics is None:
+        yield None
+        return
+    with metrics.span(name, kind, **attributes) as record:
+        yield record
+
+def record_usage(prompt_tokens=0, completion_tokens=0):
+    span = _current_span.get()
+    if span is not None:
+        span["prompt_tokens"] += prompt_tokens or 0
+        span["completion_tokens"] += completion_tokens or 0
+
+def record_queue_wait(seconds):
+    span = _current_span.get()
+    if span is not None:
+        span["queue_wait"] += seconds
+
+def record_retry():
+    span = _current_span.get()
+    if span is not None:
+        span["retries"] += 1
+
+def annotate(**attributes):
+    """Attach extra attributes to the current span"""
+    span = _current_span.get()
+    if span is not None:
+        span.update(attributes)
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def to_prometheus(runs):
+    """Render the metrics of one or more runs in the Prometheus text format
+
+    runs is a metrics dict (contract_spec["metrics"]) or a list of them.
+    """
+    if isinstance(runs, dict):
+        runs = [runs]
+
+    series = [
+        ("swarm_stage_wall_seconds", "Wall time of a pipeline stage", "wall_time"),
+        ("swarm_stage_queue_wait_seconds", "Time a stage waited for an LLM slot or the build workspace", "queue_wait"),
+        ("swarm_stage_prompt_tokens", "Prompt tokens sent by a stage", "prompt_tokens"),
+        ("swarm_stage_completion_tokens", "Completion tokens received by a stage", "completion_tokens"),
+        ("swarm_stage_retries", "Retries made by a stage", "retries")
+    ]
+    lines = []
+    for metric, description, field in series:
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} gauge")
+        for run in runs:
+            for span in run["spans"]:
+                labels = (
+                    f"run_id=\"{_escape_label(run['run_id'])}\","
+                    f"stage=\"{_escape_label(span['name'])}\","
+                    f"kind=\"{_escape_label(span['kind'])}\""
+                )
+                lines.append(f"{metric}{{{labels}}} {span[field]}")
+    return "\n".join(lines) + "\n"
+
+def to_spans(metrics):
+    """Convert a run's metrics into OpenTelemetry-style span dicts"""
+    trace_id = str(metrics["run_id"]).replace("-", "").ljust(32, "0")[:32]
+    spans = []
+    for index, span in enumerate(metrics["spans"]):
+        attributes = {
+            f"swarm.{key}": value for key, value in span.items()
+            if key not in ("name", "start", "end", "status")
+        }
+        spans.append({
+            "trace_id": trace_id,
+            "span_id": f"{index + 1:016x}",
+            "name": span["name"],
+            "start_time_unix_nano": int(span["start"] * 1e9),
+            "end_time_unix_nano": int(span["end"] * 1e9),
+            "attributes": attributes,
+            "status": {"code": "OK" if span["status"] == "ok" else "ERROR"}
+        })
+    return spans
+
+def stage_percentile(runs, percentile=0.95):
+    """Return the given wall-time percentile for every stage across runs"""
+    durations = {}
+    for run in runs:
+        for span in run["spans"]:
+            durations.setdefault(span["name"], []).append(span["wall_time"])
+
+    result = {}
+    for name, values in durations.items():
+        values.sort()
+        index = min(len(values) - 1, int(round(percentile * (len(values) - 1))))
+        result[name] = values[index]
+    return result
@@ -0,0 +1,94 @@
+import re
+from .validation import extract_rust_source
+
+# Lines of surrounding code sent with each failing span
+CONTEXT_LINES = 3
+
+REGION_BLOCK = re.compile(r"```[ \t]*(?:rust|rs)?[ \t]+lines[ \t]+(\d+)-(\d+)[^\n]*\n(.*?)```", re.DOTALL)
+PROBLEM_LINE = re.compile(r"^line (\d+):")
+
+SOURCE_FILE = "src/lib.rs"
+
+def needs_repair(result):
+    """Whether a build result failed in a way the generator can be asked to fix"""
+    check = result.get("check")
+    return bool(result.get("precheck")) or (check is not None and check["returncode"] != 0)
+
+def failing_lines(result):
+    """Line numbers in lib.rs reported by the pre-check or by cargo check errors"""
+    lines = set()
+    for problem in result.get("precheck") or []:
+        match = PROBLEM_LINE.match(problem)
+        if match:
+            lines.add(int(match.group(1)))
+
+    for diagnostic in (result.get("check") or {}).get("diagnostics", []):
+        if diagnostic["level"] != "error":
+            continue
+        for span in diagnostic["spans"]:
+            if (span["file_name"] or "").endswith(SOURCE_FILE) and span["line_start"]:
+                lines.update(range(span["line_start"], (span["line_end"] or span["line_start"]) + 1))
+    return lines
+
+def failing_regions(source, result, context=CONTEXT_LINES):
+    """Merge the failing lines and their context into (start, end) line ranges
+
+    Problems without a location, such as a missing #[program] module, need
+    the whole file, so a single region covering every line is returned.
+    """
+    total = len(source.splitlines())
+    lines = failing_lines(result)
+    unlocated = [problem for problem in result.get("precheck") or [] if not PROBLEM_LINE.match(problem)]
+    if not lines or unlocated:
+        return [(1, total)]
+
+    regions = []
+    for line in sorted(lines):
+        start, end = max(1, line - context), min(total, line + context)
+        if regions and start <= regions[-1][1] + 1:
+            regions[-1] = (regions[-1][0], max(regions[-1][1], end))
+        else:
+            regions.append((start, end))
+    return regions
+
+def _errors(result):
+    errors = list(result.get("precheck") or [])
+    for diagnostic in (result.get("check") or {}).get("diagnostics", []):
+        if diagnostic["level"] == "error":
+            errors.append(diagnostic["rendered"].strip())
+    return errors
+
+def repair_prompt(source, result, context=CONTEXT_LINES):
+    """Build the generator input for one repair round: the errors and only the failing code"""
+    lines = source.splitlines()
+    excerpts = []
+    for start, end in failing_regions(source, result, context):
+        body = "\n".join(lines[start - 1:end])
+        excerpts.append(f"```rust lines {start}-{end}\n{body}\n```")
+
+    return (
+        "The Anchor program in programs/program/src/lib.rs does not compile.\n\n"
+        "Errors:\n" + "\n\n".join(_errors(result)) + "\n\n"
+        "Failing code from lib.rs:\n\n" + "\n\n".join(excerpts) + "\n\n"
+        "Reply with a corrected replacement for each excerpt, using the same "
+        "```rust lines START-END header. Only change what is needed to fix the errors."
+    )
+
+def apply_repair(source, reply):
+    """Patch source with the line-range blocks from a repair reply
+
+    A reply without line-range blocks that contains a complete program
+    replaces the whole file. Returns None if the reply could not be applied.
+    """
+    patches = [(int(start), int(end), body) for start, end, body in REGION_BLOCK.findall(reply)]
+    if not patches:
+        program = extract_rust_source(reply)
+        return program if "#[program]" in program else None
+
+    lines = source.splitlines()
+    # Apply from the bottom up so earlier line numbers stay valid
+    for start, end, body in sorted(patches, reverse=True):
+        if start < 1 or end < start or end > len(lines):
+            return None
+        lines[start - 1:end] = body.strip("\n").splitlines()
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,148 @@
+from collections import deque
+import os
+import threading
+from .clients import env_float
+
+DEFAULT_FAST_MODEL = "gpt-3.5-turbo"
+DEFAULT_STRONG_MODEL = "gpt-4"
+# Which agents need the strong model, and each agent's latency budget in seconds
+AGENT_TIERS = {
+    "analyzer": ("fast", 60.0),
+    "architect": ("strong", 120.0),
+    "generator": ("strong", 180.0),
+    "auditor": ("strong", 120.0),
+    "tester": ("fast", 90.0)
+}
+# Recent call latencies kept per (agent, model), and how many are needed
+# before they are trusted to predict the next call
+LATENCY_WINDOW = 50
+MIN_SAMPLES = 3
+# Every PROBE_EVERY-th call goes to the primary model even when it is
+# predicted to be over budget, so a model that got faster is noticed
+PROBE_EVERY = 10
+
+def _percentile(values, percentile):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(percentile * (len(values) - 1))))]
+
+class ModelRoute:
+    """The model an agent uses, the faster model it falls back to and its latency budget"""
+    def __init__(self, model, fallback=None, latency_budget=None):
+        self.model = model
+        self.fallback = fallback if fallback != model else None
+        self.latency_budget = latency_budget
+
+def default_routes():
+    """Routes for the swarm's agents from AGENT_TIERS and the environment
+
+    SWARM_FAST_MODEL and SWARM_STRONG_MODEL name the two tiers; an agent can
+    be pinned with SWARM_MODEL_<AGENT> and given its own budget with
+    SWARM_LATENCY_BUDGET_<AGENT> (seconds, 0 for none), e.g.
+    SWARM_MODEL_GENERATOR=gpt-4-turbo.
+    """
+    fast = os.getenv("SWARM_FAST_MODEL", DEFAULT_FAST_MODEL)
+    strong = os.getenv("SWARM_STRONG_MODEL", DEFAULT_STRONG_MODEL)
+    routes = {}
+    for agent_key, (tier, budget) in AGENT_TIERS.items():
+        model = os.getenv(f"SWARM_MODEL_{agent_key.upper()}") or (strong if tier == "strong" else fast)
+        budget = env_float(f"SWARM_LATENCY_BUDGET_{agent_key.upper()}", budget) or None
+        routes[agent_key] = ModelRoute(model, fallback=fast, latency_budget=budget)
+    return routes
+
+class ModelRouter:
+    """Picks each agent call's model and keeps per-model latency and quality stats
+
+    An agent's primary model is skipped in favour of its fallback when the
+    median of its recent latencies for that agent is over the agent's budget,
+    and a call to the primary that runs past the budget is abandoned and
+    retried on the fallback. Quality is recorded per model from the outcome
+    of the runs it took part in: whether the contract validated and how many
+    repair rounds it needed.
+    """
+    def __init__(self, routes=None):
+        self.routes = default_routes()
+        self.routes.update(routes or {})
+        self._latencies = {}
+        self._models = {}
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def route(self, agent_key):
+        return self.routes.get(agent_key)
+
+    def choose(self, agent_key):
+        """Return (model, budget) for the next call; budget is None when there is nothing to fall back to"""
+        route = self.routes.get(agent_key)
+        if route is None:
+            return None, None
+        if route.fallback is None or route.latency_budget is None:
+            return route.model, None
+        with self._lock:
+            calls = self._calls[agent_key] = self._calls.get(agent_key, 0) + 1
+            samples = list(self._latencies.get((agent_key, route.model), ()))
+        if len(samples) >= MIN_SAMPLES and _percentile(samples, 0.5) > route.latency_budget and calls % PROBE_EVERY:
+            self.record_fallback(route.fallback)
+            return route.fallback, None
+        return route.model, route.latency_budget
+
+    def _model(self, model):
+        return self._models.setdefault(model, {
+            "calls": 0, "errors": 0, "budget_exceeded": 0, "fallbacks": 0,
+            "outcomes": 0, "validated": 0, "repairs": 0, "agents": set()
+        })
+
+    def record_call(self, agent_key, model, latency, ok=True):
+        with self._lock:
+            stats = self._model(model)
+            stats["calls"] += 1
+            stats["agents"].add(agent_key)
+            if not ok:
+                stats["errors"] += 1
+                return
+            window = self._latencies.setdefault((agent_key, model), deque(maxlen=LATENCY_WINDOW))
+            window.append(latency)
+
+    def record_budget_exceeded(self, agent_key, model, budget):
+        with self._lock:
+            self._model(model)["budget_exceeded"] += 1
+            # Count the abandoned call at the budget so predictions see it
+            self._latencies.setdefault((agent_key, model), deque(maxlen=LATENCY_WINDOW)).append(budget)
+
+    def record_fallback(self, model):
+        with self._lock:
+            self._model(model)["fallbacks"] += 1
+
+    def record_outcome(self, spans, validated, repairs=0):
+        """Credit a finished run's outcome to every model its agent spans used"""
+        models = {span["model"] for span in spans if span.get("kind") == "agent" and span.get("model")}
+        with self._lock:
+            for model in models:
+                stats = self._model(model)
+                stats["outcomes"] += 1
+                stats["validated"] += int(bool(validated))
+                stats["repairs"] += repairs or 0
+
+    def stats(self):
+        """Per-model call counts, latency percentiles by agent and quality of the runs it served"""
+        with self._lock:
+            result = {}
+            for model, stats in self._models.items():
+                latency = {
+                    agent_key: {"p50": _percentile(list(window), 0.5), "p95": _percentile(list(window), 0.95)}
+                    for (agent_key, window_model), window in self._latencies.items() if window_model == model
+                }
+                outcomes = stats["outcomes"]
+                result[model] = {
+                    "calls": stats["calls"],
+                    "errors": stats["errors"],
+                    "budget_exceeded": stats["budget_exceeded"],
+                    "fallbacks": stats["fallbacks"],
+                    "agents": sorted(stats["agents"]),
+                    "latency": latency,
+                    "runs": outcomes,
+                    "validated_rate": stats["validated"] / outcomes if outcomes else None,
+                    "repairs_per_run": stats["repairs"] / outcomes if outcomes else None
+                }
+        return result
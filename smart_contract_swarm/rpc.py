@@ -0,0 +1,151 @@
+import asyncio
+import itertools
+import time
+
+# JSON-RPC requests per HTTP request, and accounts per getMultipleAccounts call
+MAX_BATCH_SIZE = 100
+MAX_ACCOUNTS_PER_CALL = 100
+
+async def _quiet_aclose(http):
+    try:
+        await http.aclose()
+    except Exception:
+        # Its connections may belong to a loop that is already closed
+        pass
+
+def _close_abandoned(http, loop):
+    if loop is not None and loop.is_running():
+        asyncio.run_coroutine_threadsafe(_quiet_aclose(http), loop)
+    else:
+        asyncio.ensure_future(_quiet_aclose(http))
+
+class AsyncRpcClient:
+    """Async Solana JSON-RPC client with pooled keep-alive connections
+
+    Calls made with call() within batch_window seconds of each other are
+    sent together as JSON-RPC batch requests of up to max_batch_size calls,
+    and at most max_concurrency HTTP requests are in flight at once. The
+    client follows the running event loop, so one instance can be shared
+    by code that calls asyncio.run more than once.
+    """
+    def __init__(self, url, max_batch_size=MAX_BATCH_SIZE, max_concurrency=8, timeout=30.0, batch_window=0.002):
+        self.url = url
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.batch_window = batch_window
+        self.http_requests = 0
+        self.calls = 0
+        self._ids = itertools.count(1)
+        self._loop = None
+        self._http = None
+        self._slots = None
+        self._pending = []
+        self._flush_handle = None
+
+    def _bind(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            import httpx
+            # Connections belong to the loop that opened them, so each loop
+            # gets its own client and the previous one is closed
+            if self._http is not None:
+                _close_abandoned(self._http, self._loop)
+            self._http = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency)
+            )
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._pending = []
+            self._flush_handle = None
+            self._loop = loop
+        return loop
+
+    async def call(self, method, params=None):
+        """Make one JSON-RPC call, batched with any others made at the same time"""
+        loop = self._bind()
+        future = loop.create_future()
+        payload = {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params or []}
+        self._pending.append((payload, future))
+        self.calls += 1
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+        return await future
+
+    async def batch(self, calls):
+        """Make several (method, params) calls, returning their results in order"""
+        return await asyncio.gather(*(self.call(method, params) for method, params in calls))
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        for start in range(0, len(pending), self.max_batch_size):
+            asyncio.ensure_future(self._send(pending[start:start + self.max_batch_size]))
+
+    async def _send(self, batch):
+        try:
+            async with self._slots:
+                self.http_requests += 1
+                response = await self._http.post(self.url, json=[payload for payload, _ in batch])
+                response.raise_for_status()
+                body = response.json()
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        responses = {reply.get("id"): reply for reply in (body if isinstance(body, list) else [body])}
+        for payload, future in batch:
+            if future.done():
+                continue
+            reply = responses.get(payload["id"])
+            if reply is None:
+                future.set_exception(RuntimeError(f"No response to {payload['method']}"))
+            elif "error" in reply:
+                future.set_exception(RuntimeError(f"{payload['method']} failed: {reply['error']}"))
+            else:
+                future.set_result(reply["result"])
+
+    async def get_balances(self, public_keys):
+        """Lamports held by each account (0 if it does not exist), via getMultipleAccounts"""
+        public_keys = [str(key) for key in public_keys]
+        chunks = [public_keys[start:start + MAX_ACCOUNTS_PER_CALL]
+                  for start in range(0, len(public_keys), MAX_ACCOUNTS_PER_CALL)]
+        # Only lamports are needed, so ask for an empty slice of account data
+        options = {"encoding": "base64", "dataSlice": {"offset": 0, "length": 0}}
+        results = await asyncio.gather(*(self.call("getMultipleAccounts", [chunk, options]) for chunk in chunks))
+        return [account["lamports"] if account else 0 for result in results for account in result["value"]]
+
+    async def request_airdrops(self, public_keys, lamports):
+        """Request an airdrop to each account, returning signatures or the exception raised"""
+        return await asyncio.gather(
+            *(self.call("requestAirdrop", [str(key), lamports]) for key in public_keys),
+            return_exceptions=True
+        )
+
+    async def wait_for_balances(self, public_keys, min_lamports, timeout=60.0, interval=0.5):
+        """Poll until every account holds min_lamports, returning those that did not in time"""
+        deadline = time.monotonic() + timeout
+        remaining = [str(key) for key in public_keys]
+        while remaining:
+            balances = await self.get_balances(remaining)
+            remaining = [key for key, balance in zip(remaining, balances) if balance < min_lamports]
+            if not remaining or time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(interval)
+        return remaining
+
+    def stats(self):
+        return {"calls": self.calls, "http_requests": self.http_requests}
+
+    async def aclose(self):
+        if self._http is not None and self._loop is asyncio.get_running_loop():
+            await self._http.aclose()
+        self._http = None
+        self._loop = None
@@ -0,0 +1,379 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from .clients import env_float, env_int, load_environment
+from .metrics import annotate, record_retry
+
+# Exceptions worth retrying, matched by class name so the OpenAI client does
+# not have to be imported to recognise them
+RETRYABLE_ERRORS = {
+    "RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError",
+    "ServiceUnavailableError", "Timeout", "TimeoutError", "ConnectionError"
+}
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+# Completion tokens reserved per call until the real usage is known
+COMPLETION_TOKEN_ESTIMATE = 1000
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+def _status_code(error):
+    status = getattr(error, "status_code", None) or getattr(error, "http_status", None)
+    response = getattr(error, "response", None)
+    return status or getattr(response, "status_code", None)
+
+def is_rate_limit(error):
+    return _status_code(error) == 429 or type(error).__name__ == "RateLimitError"
+
+def is_retryable(error):
+    return type(error).__name__ in RETRYABLE_ERRORS or _status_code(error) in RETRYABLE_STATUS
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+class BudgetExceeded(RuntimeError):
+    """A call ran past its latency budget and was abandoned"""
+
+def _deadline(timeout):
+    return None if timeout is None else time.monotonic() + timeout
+
+def _remaining(deadline):
+    return max(0.0, deadline - time.monotonic())
+
+async def _await_within(awaitable, deadline):
+    if deadline is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, _remaining(deadline))
+    except asyncio.TimeoutError:
+        if time.monotonic() < deadline:
+            # Raised by the call itself
+            raise
+        raise BudgetExceeded("No response within the latency budget")
+
+def _call_within(call, deadline, abandon=None):
+    """Blocking version of _await_within
+
+    A blocking call cannot be interrupted, so with a deadline it runs in its
+    own thread; when the deadline passes it is left to finish there and
+    abandon(future) is called once it does.
+    """
+    if deadline is None:
+        return call()
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(contextvars.copy_context().run, call)
+    executor.shutdown(wait=False)
+    try:
+        return future.result(timeout=_remaining(deadline))
+    except FutureTimeoutError:
+        if future.done():
+            raise
+        if abandon is not None:
+            future.add_done_callback(abandon)
+        raise BudgetExceeded("No response within the latency budget")
+
+def _close_stream(chunks):
+    close = getattr(chunks, "close", None)
+    if close is not None:
+        close()
+
+_END = object()
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token) for budgeting"""
+    return max(1, len(text) // 4)
+
+class TokenBucket:
+    """Token bucket refilled continuously at rate_per_minute
+
+    Callers reserve tokens up front and are told how long to wait before
+    using them, so the same bucket serves threads and event loops alike.
+    """
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        """Take amount tokens, returning the seconds to wait before they are available"""
+        with self._lock:
+            self._refill()
+            # A request larger than the bucket could never fit; let it through
+            # once the bucket is full instead of waiting forever
+            self.tokens -= min(amount, self.capacity)
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def adjust(self, amount):
+        """Correct an earlier reservation once the real cost is known"""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+class LLMScheduler:
+    """Shared gate for LLM calls from every agent
+
+    Enforces requests-per-minute and tokens-per-minute budgets with token
+    buckets, retries throttled and transient failures with jittered
+    exponential backoff (honouring Retry-After), and adapts the number of
+    concurrent calls: it halves on every 429 and grows by one after a run of
+    successful calls, up to max_concurrency.
+    """
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, max_retries=5,
+                 base_delay=1.0, max_delay=60.0, max_concurrency=16, min_concurrency=1):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = max_concurrency
+        self.throttled = 0
+        self.retries = 0
+        self._active = 0
+        self._successes = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def _budget_delay(self, estimated_tokens):
+        delay = 0.0
+        if self.requests is not None:
+            delay = max(delay, self.requests.reserve(1))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.reserve(estimated_tokens))
+        return delay
+
+    def _try_acquire(self, wake):
+        with self._lock:
+            if self._active < self.limit:
+                self._active += 1
+                return True
+            self._waiters.append(wake)
+            return False
+
+    def _release(self):
+        with self._lock:
+            self._active -= 1
+            waiters, self._waiters = self._waiters, deque()
+        # Wake everyone waiting; each re-checks the (possibly changed) limit
+        for wake in waiters:
+            wake()
+
+    async def _acquire_async(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            waiter = loop.create_future()
+            wake = lambda: loop.call_soon_threadsafe(lambda: waiter.done() or waiter.set_result(None))
+            if self._try_acquire(wake):
+                return
+            await waiter
+
+    def _acquire_sync(self):
+        while True:
+            event = threading.Event()
+            if self._try_acquire(event.set):
+                return
+            event.wait()
+
+    def _on_success(self, result, estimated_tokens):
+        usage = (getattr(result, "llm_output", None) or {}).get("token_usage") or {}
+        if self.tokens is not None and usage.get("total_tokens"):
+            self.tokens.adjust(usage["total_tokens"] - estimated_tokens)
+        with self._lock:
+            self._successes += 1
+            if self.limit < self.max_concurrency and self._successes >= self.limit:
+                self.limit += 1
+                self._successes = 0
+
+    def _on_failure(self, error, attempt):
+        """Return the backoff delay before retrying, or raise if the error is final"""
+        if attempt >= self.max_retries or not is_retryable(error):
+            raise error
+
+        if is_rate_limit(error):
+            with self._lock:
+                self.throttled += 1
+                self.limit = max(self.min_concurrency, self.limit // 2)
+                self._successes = 0
+        with self._lock:
+            self.retries += 1
+        record_retry()
+
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = _retry_after(error)
+        return max(delay, retry_after) if retry_after else delay
+
+    async def run(self, call, estimated_tokens=0, timeout=None):
+        """Await call() under the budgets, retrying throttled or transient failures
+
+        With a timeout, BudgetExceeded is raised once that many seconds have
+        passed without a result; the attempt in flight is cancelled and its
+        slot given back.
+        """
+        deadline = _deadline(timeout)
+        attempt = 0
+        while True:
+            await self._acquire_async()
+            try:
+                delay = self._budget_delay(estimated_tokens)
+                if delay:
+                    annotate(rate_limited=True)
+                    await asyncio.sleep(delay)
+                result = await _await_within(call(), deadline)
+            except Exception as error:
+                backoff = self._on_failure(error, attempt)
+            else:
+                self._on_success(result, estimated_tokens)
+                return result
+            finally:
+                self._release()
+            attempt += 1
+            await asyncio.sleep(backoff)
+
+    def run_sync(self, call, estimated_tokens=0, timeout=None):
+        """Blocking version of run
+
+        A call that runs past the timeout keeps running in a worker thread,
+        but no longer holds a slot.
+        """
+        deadline = _deadline(timeout)
+        attempt = 0
+        while True:
+            self._acquire_sync()
+            try:
+                delay = self._budget_delay(estimated_tokens)
+                if delay:
+                    annotate(rate_limited=True)
+                    time.sleep(delay)
+                result = _call_within(call, deadline)
+            except Exception as error:
+                backoff = self._on_failure(error, attempt)
+            else:
+                self._on_success(result, estimated_tokens)
+                return result
+            finally:
+                self._release()
+            attempt += 1
+            time.sleep(backoff)
+
+    async def astream(self, open_stream, estimated_tokens=0, timeout=None):
+        """Yield from open_stream() under the budgets
+
+        Failures before the first chunk are retried like run(); once output
+        has been yielded an error is raised to the caller. A timeout applies
+        to the first chunk only: output already passed on is not cut off.
+        """
+        deadline = _deadline(timeout)
+        attempt = 0
+        while True:
+            await self._acquire_async()
+            started = False
+            try:
+                delay = self._budget_delay(estimated_tokens)
+                if delay:
+                    await asyncio.sleep(delay)
+                chunks = open_stream().__aiter__()
+                try:
+                    first = await _await_within(chunks.__anext__(), deadline)
+                except StopAsyncIteration:
+                    first = _END
+                except BudgetExceeded:
+                    if hasattr(chunks, "aclose"):
+                        await chunks.aclose()
+                    raise
+                if first is not _END:
+                    started = True
+                    yield first
+                    async for chunk in chunks:
+                        yield chunk
+            except Exception as error:
+                if started:
+                    raise
+                backoff = self._on_failure(error, attempt)
+            else:
+                self._on_success(None, estimated_tokens)
+                return
+            finally:
+                self._release()
+            attempt += 1
+            await asyncio.sleep(backoff)
+
+    def stream(self, open_stream, estimated_tokens=0, timeout=None):
+        """Blocking version of astream
+
+        A stream whose first chunk misses the timeout gives back its slot at
+        once and is closed as soon as the pending read returns.
+        """
+        deadline = _deadline(timeout)
+        attempt = 0
+        while True:
+            self._acquire_sync()
+            started = False
+            try:
+                delay = self._budget_delay(estimated_tokens)
+                if delay:
+                    time.sleep(delay)
+                chunks = iter(open_stream())
+                first = _call_within(lambda: next(chunks, _END), deadline,
+                                     abandon=lambda _, chunks=chunks: _close_stream(chunks))
+                if first is not _END:
+                    started = True
+                    yield first
+                    for chunk in chunks:
+                        yield chunk
+            except Exception as error:
+                if started:
+                    raise
+                backoff = self._on_failure(error, attempt)
+            else:
+                self._on_success(None, estimated_tokens)
+                return
+            finally:
+                self._release()
+            attempt += 1
+            time.sleep(backoff)
+
+    def stats(self):
+        return {
+            "concurrency_limit": self.limit,
+            "active": self._active,
+            "throttled": self.throttled,
+            "retries": self.retries
+        }
+
+def get_default_scheduler():
+    """Return the process-wide scheduler shared by every agent
+
+    Configured through SWARM_LLM_RPM, SWARM_LLM_TPM, SWARM_LLM_MAX_RETRIES
+    and SWARM_LLM_MAX_CONCURRENCY; budgets are unlimited when unset.
+    """
+    global _default_scheduler
+    load_environment()
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = LLMScheduler(
+                requests_per_minute=env_float("SWARM_LLM_RPM", None),
+                tokens_per_minute=env_float("SWARM_LLM_TPM", None),
+                max_retries=env_int("SWARM_LLM_MAX_RETRIES", 5),
+                max_concurrency=env_int("SWARM_LLM_MAX_CONCURRENCY", 16)
+            )
+        return _default_scheduler
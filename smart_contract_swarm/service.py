@@ -0,0 +1,293 @@
+from collections import OrderedDict
+from urllib.parse import urlsplit
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+from .clients import env_int, load_environment
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Finished requests kept for GET /requests/<run_id>
+KEEP_RESULTS = 1000
+# Largest request body and total header size accepted
+MAX_BODY_BYTES = 1024 * 1024
+MAX_HEADER_BYTES = 16 * 1024
+# Client-chosen run ids name checkpoint files, so they are kept to safe characters
+RUN_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 431: "Request Header Fields Too Large", 500: "Internal Server Error"}
+
+class SwarmService:
+    """A resident ContractSwarm served over HTTP on a TCP port or a Unix socket
+
+    The swarm, its LLM and RPC clients, response cache, toolchain probe and
+    Anchor workspace are created once at startup and shared by every
+    request, so a submission only pays for its own pipeline. Endpoints:
+
+    - POST /requests: {"requirements", "run_id"?, "candidates"?, "stream"?, "wait"?}.
+      Returns the finished contract_spec, or with "stream" the progress
+      events as JSON lines, or with "wait": false just the run_id.
+    - GET /requests/<run_id>: status, and the contract_spec once done
+    - GET /requests/<run_id>/events: progress events so far, then live
+    - GET /health and GET /stats
+
+    At most max_concurrency requests run at once (SWARM_SERVICE_CONCURRENCY);
+    the rest wait in order of arrival.
+    """
+    def __init__(self, swarm=None, host=None, port=None, path=None, max_concurrency=None):
+        load_environment()
+        self.swarm = swarm
+        # A swarm the service creates is closed with it
+        self._owns_swarm = swarm is None
+        self.host = host or os.getenv("SWARM_SERVICE_HOST", DEFAULT_HOST)
+        self.port = int(port) if port is not None else env_int("SWARM_SERVICE_PORT", DEFAULT_PORT)
+        self.path = path
+        self.max_concurrency = max_concurrency or env_int("SWARM_SERVICE_CONCURRENCY", 4)
+        self.runs = OrderedDict()
+        self.warm_problems = []
+        self.started = None
+        self._server = None
+        self._slots = None
+        self._tasks = set()
+
+    async def start(self):
+        """Create and warm the swarm, then start listening"""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        if self.swarm is None:
+            from .swarm import ContractSwarm
+            self.swarm = await loop.run_in_executor(None, ContractSwarm)
+        self.warm_problems = await loop.run_in_executor(None, self.swarm.warm)
+        for problem in self.warm_problems:
+            print(f"Warm-up: {problem}")
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        if self.path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path=str(self.path))
+            where = str(self.path)
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+            where = f"http://{self.host}:{self.port}"
+        self.started = time.time()
+        print(f"Serving on {where} (ready in {time.perf_counter() - started:.2f}s)")
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Stop accepting connections, cancel the requests still running and close the swarm"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.wait(self._tasks)
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+        if self._owns_swarm and self.swarm is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.swarm.close)
+
+    def submit(self, requirements, run_id=None, candidates=None):
+        """Start processing a request in the background and return its run record"""
+        run = {
+            "run_id": run_id or uuid.uuid4().hex,
+            "status": "queued",
+            "requirements": requirements,
+            "candidates": candidates,
+            "submitted": time.time(),
+            "started": None,
+            "finished": None,
+            "contract_spec": None,
+            "error": None,
+            "events": [],
+            "listeners": set()
+        }
+        self.runs[run["run_id"]] = run
+        self._forget_old_runs()
+        task = run["task"] = asyncio.ensure_future(self._run(run))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return run
+
+    def _forget_old_runs(self):
+        finished = [run_id for run_id, run in self.runs.items() if run["finished"] is not None]
+        for run_id in finished[:max(0, len(self.runs) - KEEP_RESULTS)]:
+            del self.runs[run_id]
+
+    def _publish(self, run, event):
+        run["events"].append(event)
+        for listener in run["listeners"]:
+            listener.put_nowait(event)
+
+    async def _run(self, run):
+        try:
+            async with self._slots:
+                run["status"] = "running"
+                run["started"] = time.time()
+                contract_spec = await self.swarm.aprocess_contract_request(
+                    run["requirements"], run["run_id"],
+                    on_event=lambda event: self._publish(run, event),
+                    candidates=run["candidates"]
+                )
+            run["contract_spec"] = contract_spec
+            run["status"] = "done"
+            self._publish(run, {"event": "completed", "contract_spec": contract_spec})
+        except asyncio.CancelledError:
+            run["status"] = "cancelled"
+            raise
+        except Exception as e:
+            run["status"] = "failed"
+            run["error"] = str(e)
+            self._publish(run, {"event": "failed", "error": str(e)})
+        finally:
+            run["finished"] = time.time()
+            for listener in run["listeners"]:
+                listener.put_nowait(None)
+
+    def _summary(self, run):
+        summary = {key: run[key] for key in ("run_id", "status", "submitted", "started", "finished", "error")}
+        if run["status"] == "done":
+            summary["contract_spec"] = run["contract_spec"]
+        return summary
+
+    def stats(self):
+        statuses = {}
+        for run in self.runs.values():
+            statuses[run["status"]] = statuses.get(run["status"], 0) + 1
+        generator = self.swarm.agents["generator"]
+        return {
+            "uptime": time.time() - self.started if self.started else 0.0,
+            "requests": statuses,
+            "max_concurrency": self.max_concurrency,
+            "scheduler": generator.scheduler.stats(),
+            "response_cache": generator.cache.stats() if generator.cache is not None else None,
+            "models": self.swarm.router.stats(),
+            "candidates": self.swarm.candidate_stats()
+        }
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            header_bytes = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                header_bytes += len(line)
+                if header_bytes > MAX_HEADER_BYTES:
+                    await self._respond(writer, 431, {"error": f"Headers are larger than {MAX_HEADER_BYTES} bytes"})
+                    return
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length") or 0)
+            if length > MAX_BODY_BYTES:
+                await self._respond(writer, 413, {"error": f"Body is larger than {MAX_BODY_BYTES} bytes"})
+                return
+            body = await reader.readexactly(length)
+            await self._dispatch(method, urlsplit(target).path.rstrip("/"), body, writer)
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            await self._respond(writer, 400, {"error": f"Malformed request: {e}"})
+        except ConnectionError:
+            pass
+        except Exception as e:
+            await self._respond(writer, 500, {"error": str(e)})
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, body, writer):
+        parts = path.strip("/").split("/")
+        if path == "/health" and method == "GET":
+            await self._respond(writer, 200, {"status": "ok", "warm_problems": self.warm_problems})
+        elif path == "/stats" and method == "GET":
+            await self._respond(writer, 200, self.stats())
+        elif path == "/requests" and method == "POST":
+            await self._post_request(json.loads(body or b"{}"), writer)
+        elif parts[0] == "requests" and len(parts) in (2, 3) and method == "GET":
+            run = self.runs.get(parts[1])
+            if run is None:
+                await self._respond(writer, 404, {"error": f"No request '{parts[1]}'"})
+            elif len(parts) == 3 and parts[2] == "events":
+                await self._stream_events(run, writer)
+            elif len(parts) == 2:
+                await self._respond(writer, 200, self._summary(run))
+            else:
+                await self._respond(writer, 404, {"error": f"No such endpoint: {path}"})
+        elif path in ("/health", "/stats", "/requests"):
+            await self._respond(writer, 405, {"error": f"{method} is not supported on {path}"})
+        else:
+            await self._respond(writer, 404, {"error": f"No such endpoint: {path}"})
+
+    async def _post_request(self, payload, writer):
+        if not isinstance(payload, dict):
+            await self._respond(writer, 400, {"error": "Expected a JSON object"})
+            return
+        requirements = payload.get("requirements") or payload.get("body")
+        if not requirements:
+            await self._respond(writer, 400, {"error": "'requirements' is required"})
+            return
+        run_id = payload.get("run_id")
+        if run_id is not None and not (isinstance(run_id, str) and RUN_ID.fullmatch(run_id)):
+            await self._respond(writer, 400, {"error": "'run_id' must be 1 to 64 letters, digits, '-' or '_'"})
+            return
+        if payload.get("run_id") in self.runs:
+            await self._respond(writer, 400, {"error": f"Request '{payload['run_id']}' already exists"})
+            return
+        run = self.submit(requirements, payload.get("run_id"), payload.get("candidates"))
+        if payload.get("stream"):
+            await self._stream_events(run, writer)
+        elif payload.get("wait", True):
+            # Shielded so that the run outlives this connection
+            await asyncio.shield(run["task"])
+            await self._respond(writer, 200, self._summary(run))
+        else:
+            await self._respond(writer, 202, {"run_id": run["run_id"], "status": run["status"]})
+
+    async def _stream_events(self, run, writer):
+        writer.write(self._head(200, "application/x-ndjson"))
+        # Registering and taking the backlog happen without yielding to the
+        # loop, so no event is missed or sent twice
+        listener = asyncio.Queue()
+        run["listeners"].add(listener)
+        backlog = list(run["events"])
+        try:
+            for event in backlog:
+                writer.write(_json_line(event))
+            await writer.drain()
+            if run["finished"] is not None:
+                return
+            while True:
+                event = await listener.get()
+                if event is None:
+                    break
+                writer.write(_json_line(event))
+                await writer.drain()
+        finally:
+            run["listeners"].discard(listener)
+
+    def _head(self, status, content_type, length=None):
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}", "Connection: close"]
+        if length is not None:
+            lines.append(f"Content-Length: {length}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def _respond(self, writer, status, payload):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        writer.write(self._head(status, "application/json", len(body)) + body)
+        await writer.drain()
+
+def _json_line(event):
+    return (json.dumps(event, default=str) + "\n").encode("utf-8")
@@ -0,0 +1,173 @@
+from array import array
+from pathlib import Path
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from .clients import load_environment
+
+DEFAULT_INDEX_PATH = ".swarm_cache/similarity.sqlite3"
+# 32 bands of 4 rows: requirements with a Jaccard similarity of 0.5 share a
+# bucket 87% of the time, ones at 0.2 only 5% of the time
+NUM_PERM = 128
+BANDS = 32
+SHINGLE_SIZE = 3
+_PRIME = (1 << 61) - 1
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+def _words(text):
+    return re.findall(r"[a-z0-9]+", str(text).lower())
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Overlapping runs of size words, the units similarity is measured over"""
+    words = _words(text)
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[start:start + size]) for start in range(len(words) - size + 1)}
+
+def numbers(text):
+    """The numbers mentioned in text, such as durations, amounts and percentages"""
+    return sorted(word for word in set(_words(text)) if word.isdigit())
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+class MinHasher:
+    """MinHash signatures whose agreement estimates the Jaccard similarity of shingle sets"""
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.permutations = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+    def signature(self, text):
+        hashes = [_hash(shingle) for shingle in shingles(text)]
+        return [min((a * value + b) % _PRIME for value in hashes) for a, b in self.permutations]
+
+    @staticmethod
+    def similarity(first, second):
+        return sum(a == b for a, b in zip(first, second)) / len(first)
+
+class SimilarityIndex:
+    """Past requirements and their analysis and architecture, found by MinHash LSH
+
+    Each entry's signature is split into bands; requirements sharing any band
+    bucket are compared, so a lookup touches only likely matches however large
+    the index grows. Stored in SQLite next to the response cache.
+    """
+    def __init__(self, path=DEFAULT_INDEX_PATH, num_perm=NUM_PERM, bands=BANDS):
+        if num_perm % bands:
+            raise RuntimeError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.path = Path(path)
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "id INTEGER PRIMARY KEY, requirements TEXT NOT NULL, technical_specs TEXT, "
+                "architecture TEXT, signature BLOB NOT NULL, created REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "band INTEGER NOT NULL, bucket INTEGER NOT NULL, entry_id INTEGER NOT NULL, "
+                "PRIMARY KEY (band, bucket, entry_id)) WITHOUT ROWID"
+            )
+        return self._conn
+
+    def _buckets(self, signature):
+        for band in range(self.bands):
+            rows = array("Q", signature[band * self.rows:(band + 1) * self.rows]).tobytes()
+            bucket = int.from_bytes(hashlib.blake2b(rows, digest_size=8).digest(), "little", signed=True)
+            yield band, bucket
+
+    def add(self, requirements, technical_specs, architecture):
+        """Index a request's requirements with the outputs produced for them, returning the entry id"""
+        signature = self.hasher.signature(requirements)
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            try:
+                entry_id = conn.execute(
+                    "INSERT INTO entries (requirements, technical_specs, architecture, signature, created) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (requirements, technical_specs, architecture, array("Q", signature).tobytes(), time.time())
+                ).lastrowid
+                conn.executemany(
+                    "INSERT OR IGNORE INTO buckets (band, bucket, entry_id) VALUES (?, ?, ?)",
+                    ((band, bucket, entry_id) for band, bucket in self._buckets(signature))
+                )
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return entry_id
+
+    def nearest(self, requirements, min_similarity=0.0):
+        """Return the most similar indexed entry as a dict with its "similarity", or None"""
+        signature = self.hasher.signature(requirements)
+        with self._lock:
+            conn = self._connect()
+            candidates = set()
+            for band, bucket in self._buckets(signature):
+                candidates.update(row[0] for row in conn.execute(
+                    "SELECT entry_id FROM buckets WHERE band = ? AND bucket = ?", (band, bucket)
+                ))
+            best = None
+            for entry_id in candidates:
+                stored = array("Q")
+                stored.frombytes(conn.execute("SELECT signature FROM entries WHERE id = ?", (entry_id,)).fetchone()[0])
+                similarity = MinHasher.similarity(signature, stored)
+                if similarity >= min_similarity and (best is None or similarity > best[0]):
+                    best = (similarity, entry_id)
+        if best is None:
+            return None
+        entry = self.get(best[1])
+        entry["similarity"] = best[0]
+        return entry
+
+    def get(self, entry_id):
+        """Return an indexed entry by id, or None"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT id, requirements, technical_specs, architecture FROM entries WHERE id = ?", (entry_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("id", "requirements", "technical_specs", "architecture"), row))
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+def get_default_index():
+    """Return the process-wide similarity index, or None if it is disabled
+
+    Enabled with SWARM_SIMILARITY=1; stored at SWARM_SIMILARITY_PATH.
+    """
+    global _default_index
+    load_environment()
+    if os.getenv("SWARM_SIMILARITY", "0").lower() not in ("1", "true", "yes"):
+        return None
+
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = SimilarityIndex(os.getenv("SWARM_SIMILARITY_PATH", DEFAULT_INDEX_PATH))
+        return _default_index
@@ -1,126 +1,458 @@
-from langchain_community.chat_models import ChatOpenAI
-from langchain.agents import Tool, AgentExecutor
-from langchain.memory import ConversationBufferMemory
-from langchain.schema import HumanMessage, SystemMessage
-from solana.rpc.api import Client
-from solders.keypair import Keypair
-from anchorpy import Provider, Program
+from contextlib import contextmanager
 from pathlib import Path
-import json
-import subprocess
+import asyncio
+import contextvars
 import os
-from dotenv import load_dotenv
+import threading
+import time
+import uuid
+import weakref
+from .cache import ResponseCache, get_default_cache
+from .checkpoint import CheckpointStore
+from .clients import env_float, env_int, get_llm, get_rpc, load_environment
+from .workspace import AnchorTemplate, WorkspacePool, ANCHOR_NOT_FOUND, set_localnet_program
+from .build_cache import BuildCache, toolchain_version
+from .build_farm import BuildFarm, print_build_result, run_build
+from .validators import ValidatorPool
+from .workflow import Stage, Workflow
+from .metrics import PipelineMetrics, activate, annotate, record_queue_wait, record_usage, track
+from .scheduler import COMPLETION_TOKEN_ESTIMATE, BudgetExceeded, estimate_tokens, get_default_scheduler
+from .compaction import compact, count_tokens
+from .validation import cargo_check, check_source, extract_rust_source
+from .repair import apply_repair, needs_repair, repair_prompt
+from .similarity import get_default_index, numbers
+from .artifacts import get_default_store
+from .routing import ModelRouter
 
-# Load environment variables
-load_dotenv()
+# LangChain, the OpenAI client and the Solana client are imported and
+# constructed on first use (see clients.py), so importing this module is cheap
 
-# Initialize Solana client
-client = Client(os.getenv("SOLANA_RPC_URL", "https://api.devnet.solana.com"))
+# Progress messages for the agent stages, keyed by the contract_spec field they fill
+STAGE_MESSAGES = {
+    "technical_specs": "Analyzing requirements...",
+    "architecture": "Designing contract architecture...",
+    "contract_code": "Generating smart contract code...",
+    "security_audit": "Performing security audit...",
+    "test_cases": "Generating test cases..."
+}
 
-# Initialize the language model
-llm = ChatOpenAI(
-    model="gpt-4",
-    temperature=0.7,
-    openai_api_key=os.getenv("OPENAI_API_KEY")
-)
+# Stages whose output can be taken from a similar earlier request, and how
+# a previous output is presented when it is only a starting point
+SIMILARITY_STAGES = ("technical_specs", "architecture")
+# Stages that review the contract code, and their agents; they run alongside
+# the build, so they are run again when the build repaired the code
+REVIEW_STAGES = {"security_audit": "auditor", "test_cases": "tester"}
+PRIOR_OUTPUT_BUDGET = 1000
+PRIOR_OUTPUT_PROMPT = """{input_data}
+
+An earlier request with {similarity:.0%} similar requirements produced the output below. \
+Use it as a starting point and change only what the requirements above call for.
+
+{prior}"""
+
+def _close_all(resources):
+    for resource in resources:
+        resource.close()
+
+# LLM slots of the batch the current request belongs to (see aprocess_batch);
+# a context variable so that concurrent batches each keep their own limit
+_llm_slots = contextvars.ContextVar("swarm_llm_slots", default=None)
+
+def _record_token_usage(response):
+    usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+    record_usage(usage.get("prompt_tokens"), usage.get("completion_tokens"))
+
+# How each agent's input is compacted before it is sent: (mode, token budget).
+# The previous stage's full output is still stored in contract_spec; only the
+# prompt is reduced. See compaction.compact for the modes.
+CONTEXT_BUDGETS = {
+    "analyzer": ("full", None),
+    "architect": ("structured", 2000),
+    "generator": ("structured", 3000),
+    "auditor": ("code", 4000),
+    "tester": ("code", 4000)
+}
 
 class SmartContractAgent:
-    def __init__(self, name, system_prompt, tools=None):
+    def __init__(self, name, system_prompt, tools=None, cache=None, use_cache=True, llm=None, scheduler=None,
+                 router=None, route_key=None):
         self.name = name
         self.system_prompt = system_prompt
-        self.llm = llm
+        self._llm = llm
+        # Without a fixed llm, each call's model is picked by the router from
+        # the route for route_key; calls are recorded in the router's stats
+        self.router = router
+        self.route_key = route_key
+        # Every agent shares one scheduler by default, so rate limits, retries
+        # and throttling feedback apply across the whole swarm
+        self.scheduler = scheduler or get_default_scheduler()
         self.tools = tools or []
-        self.memory = ConversationBufferMemory(memory_key="chat_history")
+        # Identical prompts are served from the response cache unless the
+        # agent opts out with use_cache=False
+        self.cache = (cache or get_default_cache()) if use_cache else None
     
-    def execute(self, input_data):
-        """Execute the agent's task"""
-        messages = [
+    @property
+    def llm(self):
+        """The agent's language model: the one it was given, or its route's primary model"""
+        if self._llm is not None:
+            return self._llm
+        route = self.router.route(self.route_key) if self.router is not None else None
+        return get_llm(route.model if route is not None else None)
+    
+    @llm.setter
+    def llm(self, value):
+        self._llm = value
+    
+    def _build_messages(self, input_data):
+        from langchain.schema import HumanMessage, SystemMessage
+        return [
             SystemMessage(content=self.system_prompt),
             HumanMessage(content=str(input_data))
         ]
-        response = self.llm.generate([messages])
-        return response.generations[0][0].text
+    
+    def _estimated_tokens(self, input_data):
+        return estimate_tokens(self.system_prompt + str(input_data)) + COMPLETION_TOKEN_ESTIMATE
+    
+    def _cache_key(self, llm, input_data):
+        if self.cache is None:
+            return None
+        return ResponseCache.make_key(
+            getattr(llm, "model_name", None),
+            getattr(llm, "temperature", None),
+            self.system_prompt,
+            input_data
+        )
+    
+    def _choose_llm(self):
+        """Return the model for the next call and its latency budget (None if it has no fallback)"""
+        if self._llm is not None or self.router is None:
+            return self.llm, None
+        model, budget = self.router.choose(self.route_key)
+        return get_llm(model), budget
+    
+    @contextmanager
+    def _recording(self, llm):
+        model = getattr(llm, "model_name", None)
+        annotate(model=model)
+        started = time.perf_counter()
+        try:
+            yield
+        except BudgetExceeded:
+            # Not an error of the model: _fall_back records it as budget_exceeded
+            raise
+        except Exception:
+            if self.router is not None:
+                self.router.record_call(self.route_key, model, time.perf_counter() - started, ok=False)
+            raise
+        if self.router is not None:
+            self.router.record_call(self.route_key, model, time.perf_counter() - started)
+    
+    def _fall_back(self, llm, budget):
+        """Record that llm ran past the latency budget and return the route's faster fallback model"""
+        fallback = self.router.route(self.route_key).fallback
+        self.router.record_budget_exceeded(self.route_key, getattr(llm, "model_name", None), budget)
+        self.router.record_fallback(fallback)
+        annotate(budget_exceeded=True)
+        return get_llm(fallback)
+    
+    def execute(self, input_data):
+        """Execute the agent's task"""
+        llm, budget = self._choose_llm()
+        key = self._cache_key(llm, input_data)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                annotate(cache_hit=True)
+                return cached
+        
+        messages = self._build_messages(input_data)
+        tokens = self._estimated_tokens(input_data)
+        try:
+            with self._recording(llm):
+                response = self.scheduler.run_sync(lambda: llm.generate([messages]), tokens, timeout=budget)
+        except BudgetExceeded:
+            fallback_llm = self._fall_back(llm, budget)
+            with self._recording(fallback_llm):
+                response = self.scheduler.run_sync(lambda: fallback_llm.generate([messages]), tokens)
+            key = self._cache_key(fallback_llm, input_data)
+        _record_token_usage(response)
+        text = response.generations[0][0].text
+        if key is not None:
+            self.cache.set(key, text)
+        return text
+    
+    async def aexecute(self, input_data, use_cache=True):
+        """Execute the agent's task through the LLM's async API; use_cache=False always samples the model"""
+        llm, budget = self._choose_llm()
+        key = self._cache_key(llm, input_data) if use_cache else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                annotate(cache_hit=True)
+                return cached
+        
+        messages = self._build_messages(input_data)
+        tokens = self._estimated_tokens(input_data)
+        try:
+            with self._recording(llm):
+                response = await self.scheduler.run(lambda: llm.agenerate([messages]), tokens, timeout=budget)
+        except BudgetExceeded:
+            # The call ran past the agent's latency budget: abandon it and
+            # answer with the faster fallback model instead
+            fallback_llm = self._fall_back(llm, budget)
+            with self._recording(fallback_llm):
+                response = await self.scheduler.run(lambda: fallback_llm.agenerate([messages]), tokens)
+            key = self._cache_key(fallback_llm, input_data) if use_cache else None
+        _record_token_usage(response)
+        text = response.generations[0][0].text
+        if key is not None:
+            self.cache.set(key, text)
+        return text
+    
+    def execute_stream(self, input_data):
+        """Execute the agent's task, yielding the response in chunks as they arrive"""
+        llm, budget = self._choose_llm()
+        key = self._cache_key(llm, input_data)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                annotate(cache_hit=True)
+                yield cached
+                return
+        
+        messages = self._build_messages(input_data)
+        tokens = self._estimated_tokens(input_data)
+        chunks = []
+        try:
+            with self._recording(llm):
+                for chunk in self.scheduler.stream(lambda: llm.stream(messages), tokens, timeout=budget):
+                    chunks.append(chunk.content)
+                    yield chunk.content
+        except BudgetExceeded:
+            fallback_llm = self._fall_back(llm, budget)
+            with self._recording(fallback_llm):
+                for chunk in self.scheduler.stream(lambda: fallback_llm.stream(messages), tokens):
+                    chunks.append(chunk.content)
+                    yield chunk.content
+            key = self._cache_key(fallback_llm, input_data)
+        if key is not None:
+            self.cache.set(key, "".join(chunks))
+    
+    async def aexecute_stream(self, input_data):
+        """Async version of execute_stream"""
+        llm, budget = self._choose_llm()
+        key = self._cache_key(llm, input_data)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                annotate(cache_hit=True)
+                yield cached
+                return
+        
+        messages = self._build_messages(input_data)
+        tokens = self._estimated_tokens(input_data)
+        chunks = []
+        try:
+            with self._recording(llm):
+                async for chunk in self.scheduler.astream(lambda: llm.astream(messages), tokens, timeout=budget):
+                    chunks.append(chunk.content)
+                    yield chunk.content
+        except BudgetExceeded:
+            fallback_llm = self._fall_back(llm, budget)
+            with self._recording(fallback_llm):
+                async for chunk in self.scheduler.astream(lambda: fallback_llm.astream(messages), tokens):
+                    chunks.append(chunk.content)
+                    yield chunk.content
+            key = self._cache_key(fallback_llm, input_data)
+        if key is not None:
+            self.cache.set(key, "".join(chunks))
 
 class ContractGenerator:
-    def __init__(self):
-        self.program_dir = Path("program")
+    def __init__(self, program_dir="program", template=None):
+        self.program_dir = Path(program_dir)
+        self.template = template or AnchorTemplate()
     
     def create_anchor_project(self, contract_name):
         """Initialize a new Anchor project"""
-        if not self.program_dir.exists():
-            try:
-                subprocess.run(["anchor", "--version"], check=True, capture_output=True)
-            except subprocess.CalledProcessError:
-                raise RuntimeError("Anchor framework not found. Please install it with 'cargo install --git https://github.com/project-serum/anchor anchor-cli'")
-            
-            subprocess.run(["anchor", "init", str(self.program_dir)], check=True)
+        if not (self.program_dir / "Anchor.toml").exists():
+            # Clone the cached `anchor init` skeleton instead of initializing
+            # and compiling a fresh project every time; the directory may
+            # already exist with just a lib.rs in it
+            self.template.clone(self.program_dir)
         
         # Update Anchor.toml with project configuration
         self.update_anchor_config(contract_name)
     
     def update_anchor_config(self, contract_name):
+        """Set the program's entry under [programs.localnet], rewriting Anchor.toml only if it changes"""
         config_path = self.program_dir / "Anchor.toml"
-        if config_path.exists():
-            with open(config_path, "r") as f:
-                config = f.read()
-            
-            # Update program name
-            config = config.replace("[programs.localnet]", f"[programs.localnet]\n{contract_name} = \"path/to/program\"")
-            
+        if not config_path.exists():
+            return
+        with open(config_path, "r") as f:
+            config = f.read()
+        
+        updated = set_localnet_program(config, contract_name, "path/to/program")
+        if updated != config:
             with open(config_path, "w") as f:
-                f.write(config)
+                f.write(updated)
     
     def generate_contract_code(self, specs):
         """Generate the smart contract code based on specifications"""
         contract_path = self.program_dir / "programs" / "program" / "src" / "lib.rs"
         os.makedirs(contract_path.parent, exist_ok=True)
+        # The generator replies in markdown; only the Rust program goes into lib.rs
         with open(contract_path, "w") as f:
-            f.write(specs["contract_code"])
+            f.write(extract_rust_source(specs["contract_code"]))
 
 class ContractSwarm:
-    def __init__(self):
+    def __init__(self, checkpoints=None, build_cache=None, llm=None, client=None, context_budgets=None,
+                 max_repairs=None, candidates=None, build_farm=None, validators=None, workflow=None,
+                 stage_timeouts=None, similarity=None, artifacts=None, router=None):
+        # Clients are optional: agents fall back to the shared LLM and the swarm
+        # to the shared Solana client, both created on first use
+        self._client = client
         self.agents = {
             "analyzer": SmartContractAgent(
                 name="Requirement Analyzer",
                 system_prompt="""You are a Solana smart contract requirements analyzer. 
                 Analyze requirements and create detailed technical specifications for Solana blockchain.
                 Focus on Anchor framework, Rust programming language, and Solana-specific features.
-                Always include specific time periods (months, days) in the specifications."""
+                Always include specific time periods (months, days) in the specifications.""",
+                llm=llm
             ),
             "architect": SmartContractAgent(
                 name="Contract Architect",
                 system_prompt="""You are a Solana smart contract architect.
                 Design smart contract architecture using Anchor framework and Rust.
                 Include account structures, instructions, and state management following Solana best practices.
-                Use PDAs (Program Derived Addresses) where appropriate."""
+                Use PDAs (Program Derived Addresses) where appropriate.""",
+                llm=llm
             ),
             "generator": SmartContractAgent(
                 name="Code Generator",
                 system_prompt="""You are a Solana smart contract code generator.
                 Generate Rust code using the Anchor framework.
                 Follow Solana programming model and security best practices.
-                Include all necessary account validations and error handling."""
+                Include all necessary account validations and error handling.""",
+                llm=llm
             ),
             "auditor": SmartContractAgent(
                 name="Security Auditor",
                 system_prompt="""You are a Solana smart contract security auditor.
                 Audit code for vulnerabilities specific to Solana blockchain.
                 Check for proper account validation, signer verification, and PDA usage.
-                Verify compliance with Anchor framework best practices."""
+                Verify compliance with Anchor framework best practices.""",
+                llm=llm
             ),
             "tester": SmartContractAgent(
                 name="Test Generator",
                 system_prompt="""You are a Solana smart contract test generator.
                 Create comprehensive test cases using Anchor's testing framework.
                 Include tests for account validation, instruction execution, and error cases.
-                Test PDA derivation and token operations where applicable."""
+                Test PDA derivation and token operations where applicable.""",
+                llm=llm
             )
         }
+        # Each agent's model, latency budget and fallback; with an explicit llm
+        # every agent uses it and the router only records stats
+        self.router = router or ModelRouter()
+        for key, agent in self.agents.items():
+            agent.router = self.router
+            agent.route_key = key
         self.contract_generator = ContractGenerator()
+        # Without a build farm requests share one Anchor workspace, so project
+        # setup, writing lib.rs and building must not interleave between
+        # concurrent requests
+        self._build_lock = threading.Lock()
+        load_environment()
+        self.checkpoints = checkpoints or CheckpointStore()
+        self.context_budgets = dict(CONTEXT_BUDGETS, **(context_budgets or {}))
+        self.build_cache = build_cache or BuildCache()
+        # Rounds of compiler-feedback repair tried before a build is reported as failed
+        if max_repairs is None:
+            max_repairs = env_int("SWARM_MAX_REPAIRS", 3)
+        self.max_repairs = max_repairs
+        # Contract code samples generated in parallel per request; the first
+        # one that type-checks is used (see _run_candidates)
+        if candidates is None:
+            candidates = env_int("SWARM_CODE_CANDIDATES", 1)
+        self.candidates = candidates
+        self.candidate_wins = {}
+        self.candidate_runs = 0
+        # Workspaces the candidates are type-checked in, kept across requests
+        self.candidate_workspaces = WorkspacePool()
+        # Builds run in isolated per-worker workspaces when a farm is given or
+        # SWARM_BUILD_WORKERS is set
+        owned = [self.candidate_workspaces]
+        if build_farm is None and env_int("SWARM_BUILD_WORKERS", 0) > 0:
+            build_farm = BuildFarm(template=self.contract_generator.template, build_cache=self.build_cache)
+            owned.append(build_farm)
+        self.build_farm = build_farm
+        # Long-lived local validators for `anchor test` in the shared workspace;
+        # a build farm keeps its own per worker
+        if validators is None and build_farm is None and env_int("SWARM_VALIDATORS", 0) > 0:
+            validators = ValidatorPool()
+            owned.append(validators)
+        self.validators = validators
+        # A farm or pool created here is shut down by close(), or at exit if
+        # close() is never called, so no validator outlives the process
+        self._finalizer = weakref.finalize(self, _close_all, owned)
+        # Past requirements with their analysis and architecture; close matches
+        # are given to the agents as a starting point, near-identical ones reused
+        self.similarity = similarity if similarity is not None else get_default_index()
+        self.hint_threshold = env_float("SWARM_SIMILARITY_HINT", 0.5)
+        self.reuse_threshold = env_float("SWARM_SIMILARITY_REUSE", 0.9)
+        # Every finished run's outputs are archived here (see artifacts.py)
+        self.artifacts = artifacts if artifacts is not None else get_default_store()
+        # Stages and their dependencies; add or remove stages on swarm.workflow
+        self.workflow = workflow or self.default_workflow(stage_timeouts)
+    
+    def warm(self):
+        """Create the clients and Anchor workspace ahead of requests, returning what could not be prepared"""
+        problems = []
+        try:
+            for agent in self.agents.values():
+                agent.llm
+                route = self.router.route(agent.route_key)
+                if agent._llm is None and route is not None and route.fallback:
+                    get_llm(route.fallback)
+        except Exception as e:
+            problems.append(f"LLM clients unavailable: {e}")
+        try:
+            # The probe is memoized for the life of the process
+            toolchain_version()
+            if self.build_farm is None:
+                self._create_project("smart_contract")
+        except (FileNotFoundError, RuntimeError):
+            problems.append(ANCHOR_NOT_FOUND)
+        return problems
+    
+    def close(self):
+        """Stop the build farm, validator pool and workspaces the swarm created itself"""
+        self._finalizer()
     
-    def process_contract_request(self, user_requirements):
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    @property
+    def client(self):
+        """The swarm's Solana JSON-RPC client, an AsyncRpcClient"""
+        if self._client is None:
+            self._client = get_rpc()
+        return self._client
+    
+    def process_contract_request(self, user_requirements, run_id=None, candidates=None):
         """Process a smart contract request through the agent workflow"""
+        return asyncio.run(self.aprocess_contract_request(user_requirements, run_id, candidates=candidates))
+    
+    async def aprocess_contract_request(self, user_requirements, run_id=None, on_event=None, candidates=None):
+        """Process a smart contract request, checkpointing each stage and reporting progress to on_event"""
         contract_spec = {
+            "run_id": run_id or uuid.uuid4().hex,
+            "candidates": candidates or self.candidates,
             "requirements": user_requirements,
             "technical_specs": None,
             "architecture": None,
@@ -128,59 +460,442 @@ class ContractSwarm:
             "security_audit": None,
             "test_cases": None
         }
-        
+        self.checkpoints.save(contract_spec["run_id"], contract_spec)
+        return await self._run_pipeline(contract_spec, on_event)
+    
+    def stream_contract_request(self, user_requirements, run_id=None):
+        """Process a smart contract request, yielding progress events as they happen"""
+        loop = asyncio.new_event_loop()
+        events = self.astream_contract_request(user_requirements, run_id)
         try:
-            # 1. Analyze requirements
-            print("\nAnalyzing requirements...")
-            contract_spec["technical_specs"] = self.agents["analyzer"].execute(user_requirements)
-            
-            # 2. Design architecture
-            print("\nDesigning contract architecture...")
-            contract_spec["architecture"] = self.agents["architect"].execute(contract_spec["technical_specs"])
-            
-            # 3. Generate contract code
-            print("\nGenerating smart contract code...")
-            contract_spec["contract_code"] = self.agents["generator"].execute(contract_spec["architecture"])
-            
-            # 4. Security audit
-            print("\nPerforming security audit...")
-            contract_spec["security_audit"] = self.agents["auditor"].execute(contract_spec["contract_code"])
-            
-            # 5. Generate tests
-            print("\nGenerating test cases...")
-            contract_spec["test_cases"] = self.agents["tester"].execute(contract_spec["contract_code"])
+            while True:
+                try:
+                    yield loop.run_until_complete(events.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(events.aclose())
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+    
+    async def astream_contract_request(self, user_requirements, run_id=None):
+        """Process a smart contract request, yielding stage_started, chunk, stage_finished and completed events"""
+        events = asyncio.Queue()
+        run = asyncio.ensure_future(
+            self.aprocess_contract_request(user_requirements, run_id, on_event=events.put_nowait)
+        )
+        try:
+            while True:
+                next_event = asyncio.ensure_future(events.get())
+                done, _ = await asyncio.wait({next_event, run}, return_when=asyncio.FIRST_COMPLETED)
+                if next_event not in done:
+                    next_event.cancel()
+                    break
+                yield next_event.result()
             
-            # 6. Create and build contract
-            print("\nCreating Anchor project...")
-            self.contract_generator.create_anchor_project("smart_contract")
-            self.contract_generator.generate_contract_code(contract_spec)
+            while not events.empty():
+                yield events.get_nowait()
+            yield {"event": "completed", "contract_spec": run.result()}
+        finally:
+            if not run.done():
+                run.cancel()
+    
+    def resume(self, run_id):
+        """Resume a checkpointed run from its first incomplete stage"""
+        return asyncio.run(self.aresume(run_id))
+    
+    async def aresume(self, run_id, on_event=None):
+        """Resume a checkpointed run, skipping the stages it already completed"""
+        return await self._run_pipeline(self.checkpoints.load(run_id), on_event)
+    
+    async def _run_pipeline(self, contract_spec, on_event=None):
+        # Timings, token usage and retries for every stage are attached to the
+        # spec as contract_spec["metrics"] (see metrics.py for exporters)
+        metrics = PipelineMetrics(contract_spec["run_id"])
+        with activate(metrics):
+            try:
+                return await self._run_stages(contract_spec, on_event)
+            finally:
+                contract_spec["metrics"] = metrics.to_dict()
+                self.checkpoints.save(contract_spec["run_id"], contract_spec)
+                if contract_spec.get("validated") is not None:
+                    self.router.record_outcome(contract_spec["metrics"]["spans"], contract_spec["validated"],
+                                               contract_spec.get("repairs"))
+                if self.artifacts is not None:
+                    self.artifacts.save_run(contract_spec)
+    
+    def default_workflow(self, stage_timeouts=None):
+        """The standard pipeline as a Workflow, with independent stages running at the same time"""
+        timeouts = stage_timeouts or {}
+        
+        def agent_stage(stage, agent_key, source):
+            async def run(contract_spec, on_event):
+                input_data = self._with_prior(contract_spec, stage, contract_spec[source])
+                await self._run_stage(contract_spec, stage, agent_key, input_data, on_event)
+            return Stage(stage, run, inputs=[source] if source != "requirements" else ["similar"],
+                         timeout=timeouts.get(stage))
+        
+        return Workflow([
+            Stage("similar", self._similar_stage,
+                  skip_if=lambda contract_spec: self.similarity is None or "similar" in contract_spec),
+            # Optional: without Anchor only the build is skipped, the agent output is kept
+            Stage("project", self._project_stage, timeout=timeouts.get("project"), optional=True,
+                  skip_if=lambda contract_spec: self.build_farm is not None),
+            agent_stage("technical_specs", "analyzer", "requirements"),
+            agent_stage("architecture", "architect", "technical_specs"),
+            Stage("contract_code", self._code_stage, inputs=["architecture"], timeout=timeouts.get("contract_code")),
+            *(agent_stage(stage, agent_key, "contract_code") for stage, agent_key in REVIEW_STAGES.items()),
+            Stage("build", self._build_contract, inputs=["contract_code", "project"], timeout=timeouts.get("build"))
+        ])
+    
+    async def _run_stages(self, contract_spec, on_event):
+        # Left by an earlier attempt of a resumed run
+        contract_spec.pop("error", None)
+        try:
+            results = await self.workflow.run(contract_spec, on_event)
+            if contract_spec.get("reviews_stale"):
+                await self._review_repaired_code(contract_spec, on_event)
+            contract_spec["validated"] = bool(results.get("build"))
             
-            # 7. Build and test
-            if self.build_and_test():
+            if results.get("build"):
                 print("\nSmart contract successfully created and validated!")
+                self._index_result(contract_spec)
             else:
                 print("\nWarning: Contract validation failed. Please review the output.")
             
             return contract_spec
         except Exception as e:
+            contract_spec["validated"] = False
+            contract_spec["error"] = str(e)
             print(f"\nError during contract generation: {str(e)}")
             return contract_spec
     
-    def build_and_test(self):
-        """Build and test the generated smart contract"""
+    async def _review_repaired_code(self, contract_spec, on_event=None):
+        """Rerun the audit and test generation on the code as repaired by the build"""
+        print("\nReviewing the repaired contract code...")
+        stages = [stage for stage in REVIEW_STAGES if stage in self.workflow]
+        for stage in stages:
+            contract_spec[stage] = None
+        await asyncio.gather(*(
+            self._run_stage(contract_spec, stage, REVIEW_STAGES[stage],
+                            self._with_prior(contract_spec, stage, contract_spec["contract_code"]), on_event)
+            for stage in stages
+        ))
+        del contract_spec["reviews_stale"]
+        self.checkpoints.save(contract_spec["run_id"], contract_spec)
+    
+    def process_batch(self, requirements_iterable, max_concurrency=4):
+        """Process many smart contract requests, returning their specs in input order"""
+        async def collect():
+            results = {}
+            async for index, contract_spec in self.aprocess_batch(requirements_iterable, max_concurrency):
+                results[index] = contract_spec
+            return [results[index] for index in sorted(results)]
+        
+        return asyncio.run(collect())
+    
+    async def aprocess_batch(self, requirements_iterable, max_concurrency=4):
+        """Process many smart contract requests, yielding (index, contract_spec) as each completes"""
+        slots = asyncio.Semaphore(max_concurrency)
+        # Keep more requests in flight than LLM slots so that a request waiting
+        # on the build never leaves a slot idle
+        window = max_concurrency * 2
+        requirements = enumerate(requirements_iterable)
+        pending = set()
+        completed = 0
+        started = time.monotonic()
+        
+        async def process(index, user_requirements):
+            # Set inside the task, so it applies to this request's stages only
+            _llm_slots.set(slots)
+            return index, await self.aprocess_contract_request(user_requirements)
+        
         try:
-            # Check if Anchor is installed
-            subprocess.run(["anchor", "--version"], check=True, capture_output=True)
+            while True:
+                for index, user_requirements in requirements:
+                    pending.add(asyncio.ensure_future(process(index, user_requirements)))
+                    if len(pending) >= window:
+                        break
+                if not pending:
+                    break
+                
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    completed += 1
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+        
+        elapsed = time.monotonic() - started
+        rate = completed / elapsed * 60 if elapsed > 0 else 0.0
+        print(f"\nProcessed {completed} requests in {elapsed:.1f}s ({rate:.2f} requests/min)")
+    
+    async def _run_stage(self, contract_spec, stage, agent_key, input_data, on_event=None):
+        if contract_spec[stage] is not None:
+            reused = stage in SIMILARITY_STAGES and (contract_spec.get("similar") or {}).get("reused")
+            print(f"\nSkipping {stage}, {'reused from a similar request' if reused else 'restored from checkpoint'}")
+            return
+        
+        print(f"\n{STAGE_MESSAGES[stage]}")
+        with track(stage, kind="agent", agent=agent_key):
+            input_data = self._compact_input(agent_key, input_data)
+            slots = _llm_slots.get()
+            if slots is None:
+                contract_spec[stage] = await self._execute_agent(stage, agent_key, input_data, on_event)
+            else:
+                waiting = time.perf_counter()
+                async with slots:
+                    record_queue_wait(time.perf_counter() - waiting)
+                    contract_spec[stage] = await self._execute_agent(stage, agent_key, input_data, on_event)
+        self.checkpoints.save(contract_spec["run_id"], contract_spec)
+    
+    async def _run_candidates(self, contract_spec, count, on_event=None):
+        """Generate count contract candidates at once and keep the first that type-checks"""
+        if contract_spec["contract_code"] is not None:
+            print("\nSkipping contract_code, restored from checkpoint")
+            return
+        
+        print(f"\n{STAGE_MESSAGES['contract_code']} ({count} candidates)")
+        with track("contract_code", kind="agent", agent="generator"):
+            input_data = self._compact_input("generator", contract_spec["architecture"])
+            if on_event is not None:
+                on_event({"event": "stage_started", "stage": "contract_code"})
             
-            # Build the contract
-            subprocess.run(["anchor", "build"], cwd=self.contract_generator.program_dir, check=True)
+            tasks = [asyncio.ensure_future(self._generate_candidate(index, input_data)) for index in range(count)]
+            winner = fallback = error = None
+            try:
+                for finished in asyncio.as_completed(tasks):
+                    try:
+                        index, code, passed = await finished
+                    except Exception as e:
+                        error = e
+                        continue
+                    if fallback is None:
+                        fallback = (index, code)
+                    if passed:
+                        winner = (index, code)
+                        break
+            finally:
+                for task in tasks:
+                    task.cancel()
             
-            # Run tests
-            subprocess.run(["anchor", "test"], cwd=self.contract_generator.program_dir, check=True)
-            return True
-        except subprocess.CalledProcessError as e:
-            print(f"Error during build/test: {e}")
+            if fallback is None:
+                raise error
+            index, code = winner or fallback
+            annotate(candidates=count, winner=winner[0] if winner else None)
+            self.candidate_runs += 1
+            if winner is not None:
+                self.candidate_wins[index] = self.candidate_wins.get(index, 0) + 1
+            contract_spec["contract_code"] = code
+            contract_spec["candidate_winner"] = winner[0] if winner else None
+            if on_event is not None:
+                on_event({"event": "stage_finished", "stage": "contract_code", "output": code})
+        self.checkpoints.save(contract_spec["run_id"], contract_spec)
+    
+    async def _generate_candidate(self, index, input_data):
+        with track(f"candidate {index}", kind="agent", agent="generator"):
+            agent = self.agents["generator"]
+            slots = _llm_slots.get()
+            if slots is None:
+                code = await agent.aexecute(input_data, use_cache=False)
+            else:
+                waiting = time.perf_counter()
+                async with slots:
+                    record_queue_wait(time.perf_counter() - waiting)
+                    code = await agent.aexecute(input_data, use_cache=False)
+            passed = await self._in_executor(self._validate_candidate, code)
+            annotate(passed=passed)
+        return index, code, passed
+    
+    def _validate_candidate(self, code):
+        """Pre-check and type-check a candidate in a workspace of its own"""
+        source = extract_rust_source(code)
+        if check_source(source):
             return False
-        except FileNotFoundError:
-            print("Anchor framework not found. Please install it with 'cargo install --git https://github.com/project-serum/anchor anchor-cli'")
-            return False 
\ No newline at end of file
+        
+        try:
+            # cargo locks a target dir for the whole check, so candidates sharing
+            # the template's would run one at a time and hold up the main build;
+            # each borrows a pooled workspace with its own, warm from earlier checks
+            with self.candidate_workspaces.slot(self.contract_generator.template) as (workspace, target_dir):
+                (workspace / "programs" / "program" / "src" / "lib.rs").write_text(source)
+                with track("cargo check", kind="build"):
+                    check = cargo_check(workspace, self.contract_generator.template.build_env(target_dir))
+            return check is None or check["returncode"] == 0
+        except RuntimeError:
+            # Without Anchor only the pre-check can be applied
+            return True
+    
+    def candidate_stats(self):
+        """How often each candidate index won across hedged code generation runs"""
+        return {
+            "runs": self.candidate_runs,
+            "wins": dict(sorted(self.candidate_wins.items())),
+            "no_winner": self.candidate_runs - sum(self.candidate_wins.values())
+        }
+    
+    def _compact_input(self, agent_key, input_data):
+        mode, budget = self.context_budgets.get(agent_key, ("full", None))
+        if mode == "full" and budget is None:
+            return input_data
+        
+        compacted = compact(input_data, budget, mode)
+        annotate(input_tokens=count_tokens(str(input_data)), compacted_tokens=count_tokens(compacted))
+        return compacted
+    
+    async def _execute_agent(self, stage, agent_key, input_data, on_event):
+        agent = self.agents[agent_key]
+        if on_event is None:
+            return await agent.aexecute(input_data)
+        
+        on_event({"event": "stage_started", "stage": stage})
+        chunks = []
+        async for chunk in agent.aexecute_stream(input_data):
+            chunks.append(chunk)
+            on_event({"event": "chunk", "stage": stage, "text": chunk})
+        output = "".join(chunks)
+        on_event({"event": "stage_finished", "stage": stage, "output": output})
+        return output
+    
+    def _in_executor(self, func, *args):
+        # Run func in a worker thread with a copy of the current context, so
+        # spans it records are attributed to the calling run
+        context = contextvars.copy_context()
+        return asyncio.get_running_loop().run_in_executor(None, context.run, func, *args)
+    
+    def _create_project(self, contract_name):
+        with track("create_anchor_project", kind="build"):
+            waiting = time.perf_counter()
+            with self._build_lock:
+                record_queue_wait(time.perf_counter() - waiting)
+                self.contract_generator.create_anchor_project(contract_name)
+    
+    async def _project_stage(self, contract_spec, on_event=None):
+        print("\nCreating Anchor project...")
+        await self._in_executor(self._create_project, "smart_contract")
+    
+    async def _similar_stage(self, contract_spec, on_event=None):
+        with track("similarity_lookup"):
+            match = await self._in_executor(self.similarity.nearest, contract_spec["requirements"], self.hint_threshold)
+            annotate(similarity=match["similarity"] if match else None)
+        if match is None:
+            contract_spec["similar"] = None
+            return
+        
+        # Numbers such as durations and amounts are what usually differs between
+        # variants of a contract, so outputs are only reused when they match
+        reused = (match["similarity"] >= self.reuse_threshold
+                  and numbers(match["requirements"]) == numbers(contract_spec["requirements"]))
+        contract_spec["similar"] = {"id": match["id"], "similarity": match["similarity"], "reused": reused}
+        if reused:
+            print(f"\nReusing analysis and architecture from a {match['similarity']:.0%} similar earlier request")
+            for stage in SIMILARITY_STAGES:
+                if contract_spec[stage] is None:
+                    contract_spec[stage] = match[stage]
+        else:
+            print(f"\nFound a {match['similarity']:.0%} similar earlier request to start from")
+        self.checkpoints.save(contract_spec["run_id"], contract_spec)
+    
+    def _with_prior(self, contract_spec, stage, input_data):
+        """Append the similar request's output for stage to an agent's input"""
+        similar = contract_spec.get("similar")
+        if stage not in SIMILARITY_STAGES or not similar or similar["reused"] or contract_spec[stage] is not None:
+            return input_data
+        prior = self.similarity.get(similar["id"])
+        if prior is None or not prior[stage]:
+            return input_data
+        return PRIOR_OUTPUT_PROMPT.format(
+            input_data=input_data,
+            similarity=similar["similarity"],
+            prior=compact(prior[stage], PRIOR_OUTPUT_BUDGET, "structured")
+        )
+    
+    def _index_result(self, contract_spec):
+        similar = contract_spec.get("similar")
+        if self.similarity is None or (similar and similar["reused"]):
+            return
+        self.similarity.add(contract_spec["requirements"], contract_spec["technical_specs"], contract_spec["architecture"])
+    
+    async def _code_stage(self, contract_spec, on_event=None):
+        if contract_spec.get("candidates", 1) > 1:
+            await self._run_candidates(contract_spec, contract_spec["candidates"], on_event)
+        else:
+            await self._run_stage(contract_spec, "contract_code", "generator", contract_spec["architecture"], on_event)
+    
+    async def _build_contract(self, contract_spec, on_event=None):
+        if on_event is not None:
+            on_event({"event": "stage_started", "stage": "build"})
+        with track("build_and_test", kind="build"):
+            result, repaired, repairs = await self._repair_until_checked(
+                extract_rust_source(contract_spec["contract_code"])
+            )
+        # Applied on the loop thread, so a checkpoint being written never sees a half-updated spec
+        if repaired is not None:
+            contract_spec["contract_code"] = repaired
+            # The audit and tests were written for the code before the repair
+            contract_spec["reviews_stale"] = True
+        contract_spec["repairs"] = repairs
+        built = result["success"]
+        if on_event is not None:
+            on_event({"event": "stage_finished", "stage": "build", "output": built})
+        return built
+    
+    def _build_source(self, source):
+        if self.build_farm is not None:
+            return self._farm_build(source)
+        return self._write_and_build(source)
+    
+    def _write_and_build(self, source):
+        # The lock covers one write and build of the shared workspace; it is
+        # not held while the generator is asked for a repair
+        waiting = time.perf_counter()
+        with self._build_lock:
+            record_queue_wait(time.perf_counter() - waiting)
+            self.contract_generator.generate_contract_code({"contract_code": source})
+            return self.run_build_and_test()
+    
+    def _farm_build(self, source):
+        # Each build gets a worker's private workspace, so no lock is needed
+        result = self.build_farm.build(source)
+        annotate(worker=result.get("worker"))
+        if result.get("cached"):
+            annotate(build_cache_hit=True)
+        print_build_result(result)
+        return result
+    
+    async def _repair_until_checked(self, source):
+        """Build source, repairing compile errors up to max_repairs times; returns (result, repaired, repairs)"""
+        result = await self._in_executor(self._build_source, source)
+        repaired = None
+        repairs = 0
+        while not result["success"] and needs_repair(result) and repairs < self.max_repairs:
+            repairs += 1
+            print(f"\nRepairing compile errors (attempt {repairs}/{self.max_repairs})...")
+            with track("repair", kind="agent", agent=self.agents["generator"].name):
+                reply = await self.agents["generator"].aexecute(repair_prompt(source, result))
+            patched = apply_repair(source, reply)
+            if patched is None:
+                print("Repair reply could not be applied to lib.rs")
+                break
+            source = repaired = patched
+            result = await self._in_executor(self._build_source, patched)
+        return result, repaired, repairs
+    
+    def build_and_test(self):
+        """Build and test the generated smart contract"""
+        return self.run_build_and_test()["success"]
+    
+    def run_build_and_test(self):
+        """Build and test the generated smart contract, returning the full result (see build_farm.run_build)"""
+        result = run_build(
+            self.contract_generator.program_dir,
+            # Build against the shared target dir so dependencies are not recompiled
+            self.contract_generator.template.build_env(),
+            self.build_cache,
+            self.validators
+        )
+        if result.get("cached"):
+            annotate(build_cache_hit=True)
+        print_build_result(result)
+        return result
@@ -0,0 +1,460 @@
+from pathlib import Path
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import threading
+import time
+from .build_cache import toolchain_version
+
+FAKE_CONTRACT = '''Here is the Anchor program implementing the vesting schedule.
+
+```rust
+use anchor_lang::prelude::*;
+
+declare_id!("Fg6PaFpoGXkYsidMpWTK6W2BeZ7FEfcYkg476zPFsLnS");
+
+#[program]
+pub mod program {
+    use super::*;
+
+    pub fn initialize_vesting(ctx: Context<InitializeVesting>, cliff_months: u8) -> Result<()> {
+        let vesting = &mut ctx.accounts.vesting;
+        vesting.admin = ctx.accounts.admin.key();
+        vesting.cliff_months = cliff_months;
+        vesting.paused = false;
+        Ok(())
+    }
+}
+
+#[derive(Accounts)]
+pub struct InitializeVesting<'info> {
+    #[account(init, payer = admin, space = 8 + 32 + 1 + 1)]
+    pub vesting: Account<'info, VestingSchedule>,
+    #[account(mut)]
+    pub admin: Signer<'info>,
+    pub system_program: Program<'info, System>,
+}
+
+#[account]
+pub struct VestingSchedule {
+    pub admin: Pubkey,
+    pub cliff_months: u8,
+    pub paused: bool,
+}
+```
+
+The admin account is stored so later instructions can verify the signer.
+'''
+
+FAKE_RESPONSES = {
+    "requirements analyzer": "Technical specification: a Solana vesting program built with Anchor, "
+                             "linear vesting over 12 months with a 3 month cliff, an admin-controlled pause.",
+    "architect": "Architecture: a VestingSchedule account struct stored at a PDA derived from the admin "
+                 "pubkey, with initialize_vesting, claim_tokens and pause_vesting instructions.",
+    "code generator": FAKE_CONTRACT,
+    "security auditor": "Security audit: account validation and signer checks are present; "
+                        "no critical issues found.",
+    "test generator": "```rust\n#[test]\nfn test_initialize_vesting() {\n    assert!(true);\n}\n```"
+}
+
+class FakeGeneration:
+    def __init__(self, text):
+        self.text = text
+
+class FakeResult:
+    """The parts of LangChain's LLMResult that SmartContractAgent reads"""
+    def __init__(self, text, prompt_tokens, completion_tokens):
+        self.generations = [[FakeGeneration(text)]]
+        self.llm_output = {"token_usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }}
+
+class FakeChunk:
+    def __init__(self, content):
+        self.content = content
+
+def _count_tokens(text):
+    # Roughly one token per whitespace-separated word is enough for timing
+    return max(1, len(text.split()))
+
+class FakeLLM:
+    """Deterministic local stand-in for ChatOpenAI
+
+    Each call waits `latency` seconds before the first token and then emits
+    tokens at `tokens_per_second`. Responses are chosen by matching the
+    system prompt against `responses`, so each agent gets plausible output.
+    """
+    def __init__(self, latency=0.0, tokens_per_second=None, responses=None,
+                 model_name="fake-gpt-4", temperature=0.7):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.responses = responses or FAKE_RESPONSES
+        self.model_name = model_name
+        self.temperature = temperature
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _respond(self, messages):
+        with self._lock:
+            self.calls += 1
+        system_prompt = messages[0].content.lower()
+        for marker, text in self.responses.items():
+            if marker in system_prompt:
+                return text
+        return f"Response to: {messages[-1].content}"
+
+    def _duration(self, text):
+        if not self.tokens_per_second:
+            return self.latency
+        return self.latency + _count_tokens(text) / self.tokens_per_second
+
+    def _result(self, messages, text):
+        prompt = " ".join(str(message.content) for message in messages)
+        return FakeResult(text, _count_tokens(prompt), _count_tokens(text))
+
+    def generate(self, message_batches):
+        messages = message_batches[0]
+        text = self._respond(messages)
+        time.sleep(self._duration(text))
+        return self._result(messages, text)
+
+    async def agenerate(self, message_batches):
+        messages = message_batches[0]
+        text = self._respond(messages)
+        await asyncio.sleep(self._duration(text))
+        return self._result(messages, text)
+
+    def _chunks(self, text):
+        words = text.split(" ")
+        return [word + (" " if index < len(words) - 1 else "") for index, word in enumerate(words)]
+
+    def stream(self, messages):
+        text = self._respond(messages)
+        time.sleep(self.latency)
+        for chunk in self._chunks(text):
+            if self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+            yield FakeChunk(chunk)
+
+    async def astream(self, messages):
+        text = self._respond(messages)
+        await asyncio.sleep(self.latency)
+        for chunk in self._chunks(text):
+            if self.tokens_per_second:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            yield FakeChunk(chunk)
+
+def cassette_key(messages):
+    """Hash a message list for cassette lookups"""
+    payload = json.dumps([[getattr(message, "type", ""), str(message.content)] for message in messages])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class RecordingLLM:
+    """Wraps a real LLM and appends every response and its latency to a cassette file"""
+    def __init__(self, llm, path):
+        self.llm = llm
+        self.path = Path(path)
+        self.model_name = getattr(llm, "model_name", None)
+        self.temperature = getattr(llm, "temperature", None)
+        self._lock = threading.Lock()
+
+    def _record(self, messages, response, latency):
+        entry = {
+            "key": cassette_key(messages),
+            "text": response.generations[0][0].text,
+            "latency": latency,
+            "llm_output": getattr(response, "llm_output", None)
+        }
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def generate(self, message_batches):
+        started = time.perf_counter()
+        response = self.llm.generate(message_batches)
+        self._record(message_batches[0], response, time.perf_counter() - started)
+        return response
+
+    async def agenerate(self, message_batches):
+        started = time.perf_counter()
+        response = await self.llm.agenerate(message_batches)
+        self._record(message_batches[0], response, time.perf_counter() - started)
+        return response
+
+    def stream(self, messages):
+        started = time.perf_counter()
+        chunks = []
+        for chunk in self.llm.stream(messages):
+            chunks.append(chunk.content)
+            yield chunk
+        self._record(messages, FakeResult("".join(chunks), 0, 0), time.perf_counter() - started)
+
+    async def astream(self, messages):
+        started = time.perf_counter()
+        chunks = []
+        async for chunk in self.llm.astream(messages):
+            chunks.append(chunk.content)
+            yield chunk
+        self._record(messages, FakeResult("".join(chunks), 0, 0), time.perf_counter() - started)
+
+class ReplayLLM:
+    """Replays a cassette recorded by RecordingLLM
+
+    Responses are matched by message hash and delayed by their recorded
+    latency multiplied by `speed` (0 replays instantly).
+    """
+    def __init__(self, path, speed=1.0, model_name="replay", temperature=0.7):
+        self.speed = speed
+        self.model_name = model_name
+        self.temperature = temperature
+        self.entries = {}
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.entries[entry["key"]] = entry
+
+    def _lookup(self, messages):
+        try:
+            return self.entries[cassette_key(messages)]
+        except KeyError:
+            raise RuntimeError("Request not found in cassette; record it again with RecordingLLM")
+
+    def _result(self, entry):
+        result = FakeResult(entry["text"], 0, 0)
+        if entry.get("llm_output"):
+            result.llm_output = entry["llm_output"]
+        return result
+
+    def generate(self, message_batches):
+        entry = self._lookup(message_batches[0])
+        time.sleep(entry["latency"] * self.speed)
+        return self._result(entry)
+
+    async def agenerate(self, message_batches):
+        entry = self._lookup(message_batches[0])
+        await asyncio.sleep(entry["latency"] * self.speed)
+        return self._result(entry)
+
+    def stream(self, messages):
+        entry = self._lookup(messages)
+        time.sleep(entry["latency"] * self.speed)
+        yield FakeChunk(entry["text"])
+
+    async def astream(self, messages):
+        entry = self._lookup(messages)
+        await asyncio.sleep(entry["latency"] * self.speed)
+        yield FakeChunk(entry["text"])
+
+FAKE_ANCHOR = '''
+import json
+import os
+import re
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+args = sys.argv[1:]
+command = args[0] if args else ""
+
+if command == "--version":
+    print("anchor-cli 0.29.0 (fake)")
+elif command == "init":
+    root = Path(args[1])
+    (root / "programs" / "program" / "src").mkdir(parents=True)
+    (root / "programs" / "program" / "src" / "lib.rs").write_text("use anchor_lang::prelude::*;\\n")
+    (root / "programs" / "program" / "Cargo.toml").write_text("[package]\\nname = \\"program\\"\\n")
+    (root / "node_modules").mkdir()
+    (root / "Anchor.toml").write_text("[programs.localnet]\\nprogram = \\"Fg6PaFpoGXkYsidMpWTK6W2BeZ7FEfcYkg476zPFsLnS\\"\\n")
+elif command == "build":
+    time.sleep(float(os.environ.get("FAKE_ANCHOR_BUILD_SECONDS", "0")))
+    source = Path("programs/program/src/lib.rs").read_text()
+    if "#[program]" not in source or source.count("{") != source.count("}"):
+        print("error: could not compile `program`", file=sys.stderr)
+        sys.exit(1)
+    (Path("target") / "deploy").mkdir(parents=True, exist_ok=True)
+    (Path("target") / "idl").mkdir(parents=True, exist_ok=True)
+    (Path("target") / "deploy" / "program.so").write_bytes(b"\\x7fELF")
+    (Path("target") / "idl" / "program.json").write_text("{}")
+    print("Finished release [optimized] target(s)")
+elif command == "test":
+    if "--skip-local-validator" in args:
+        cluster = args[args.index("--provider.cluster") + 1]
+        from solders.keypair import Keypair
+        wallet = Path(args[args.index("--provider.wallet") + 1])
+        payer = str(Keypair.from_bytes(bytes(json.loads(wallet.read_text()))).pubkey())
+        source = Path("programs/program/src/lib.rs")
+        program_id = re.search(r'declare_id!\\("([^"]*)"\\)', source.read_text()).group(1) if source.exists() else None
+        config = Path("Anchor.toml")
+        if program_id and config.exists() and f'program = "{program_id}"' not in config.read_text():
+            print(f"Error: Anchor.toml does not declare program {program_id}", file=sys.stderr)
+            sys.exit(1)
+
+        def rpc(method, params=None):
+            request = json.dumps({"jsonrpc": "2.0", "id": 1, "method": method, "params": params or []}).encode()
+            with urllib.request.urlopen(urllib.request.Request(cluster, request), timeout=5) as response:
+                return json.loads(response.read())["result"]
+        try:
+            if rpc("getBalance", [payer])["value"] == 0:
+                print(f"Error: wallet {payer} has no SOL", file=sys.stderr)
+                sys.exit(1)
+            deployment = rpc("fakeDeploy")
+        except OSError:
+            print(f"Error: cluster {cluster} is unreachable", file=sys.stderr)
+            sys.exit(1)
+        print(f"Deployed {program_id} to {cluster} by {payer} (deployment {deployment})")
+    else:
+        # Starting and tearing down a local validator
+        time.sleep(float(os.environ.get("FAKE_VALIDATOR_STARTUP_SECONDS", "0")))
+    time.sleep(float(os.environ.get("FAKE_ANCHOR_TEST_SECONDS", "0")))
+    if not (Path("target") / "deploy" / "program.so").exists():
+        print("Error: program not built", file=sys.stderr)
+        sys.exit(1)
+    print("  1 passing")
+else:
+    print(f"fake anchor: unsupported command {command!r}", file=sys.stderr)
+    sys.exit(1)
+'''
+
+FAKE_CARGO = '''
+import json
+import sys
+from pathlib import Path
+
+args = sys.argv[1:]
+if args[:1] != ["check"]:
+    print(f"fake cargo: unsupported command {args!r}", file=sys.stderr)
+    sys.exit(1)
+
+path = "programs/program/src/lib.rs"
+source = Path(path).read_text()
+errors = []
+if "#[program]" not in source:
+    errors.append(("cannot find the #[program] module", 1))
+if "compile_error!" in source:
+    line = source[:source.index("compile_error!")].count("\\n") + 1
+    errors.append(("compile_error! invoked", line))
+
+for message, line in errors:
+    span = {"file_name": path, "line_start": line, "line_end": line, "column_start": 1, "column_end": 1}
+    print(json.dumps({"reason": "compiler-message", "message": {
+        "level": "error", "message": message, "rendered": f"error: {message}\\n --> {path}:{line}:1\\n",
+        "spans": [span]
+    }}))
+print(json.dumps({"reason": "build-finished", "success": not errors}))
+sys.exit(101 if errors else 0)
+'''
+
+FAKE_VALIDATOR = '''
+import json
+import os
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+args = sys.argv[1:]
+port = int(args[args.index("--rpc-port") + 1])
+time.sleep(float(os.environ.get("FAKE_VALIDATOR_STARTUP_SECONDS", "0")))
+deployments = [0]
+balances = {}
+stats = {"http_requests": 0}
+
+def handle(request):
+    method = request["method"]
+    params = request.get("params") or []
+    if method == "getHealth":
+        reply = {"result": "ok"}
+    elif method == "requestAirdrop":
+        balances[params[0]] = balances.get(params[0], 0) + params[1]
+        reply = {"result": f"fake-airdrop-signature-{params[0]}"}
+    elif method == "getBalance":
+        reply = {"result": {"context": {"slot": 1}, "value": balances.get(params[0], 0)}}
+    elif method == "getMultipleAccounts":
+        accounts = [{"lamports": balances[key], "owner": "11111111111111111111111111111111"} if key in balances else None
+                    for key in params[0]]
+        reply = {"result": {"context": {"slot": 1}, "value": accounts}}
+    elif method == "fakeDeploy":
+        deployments[0] += 1
+        reply = {"result": deployments[0]}
+    elif method == "fakeStats":
+        reply = {"result": stats}
+    else:
+        reply = {"error": {"code": -32601, "message": "Method not found"}}
+    reply.update(jsonrpc="2.0", id=request.get("id"))
+    return reply
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        stats["http_requests"] += 1
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        # JSON-RPC batches arrive as a list and are answered with a list
+        reply = [handle(item) for item in request] if isinstance(request, list) else handle(request)
+        body = json.dumps(reply).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+ThreadingHTTPServer(("127.0.0.1", port), Handler).serve_forever()
+'''
+
+class FakeAnchorToolchain:
+    """Puts fake `anchor`, `cargo` and `solana-test-validator` executables first on PATH while active
+
+    The anchor fake supports --version, init, build and test. Builds fail
+    when lib.rs has no #[program] module or unbalanced braces, and build/test
+    sleep for the configured number of seconds. The cargo fake supports
+    `check --message-format=json` and reports an error for every
+    compile_error! in lib.rs. A fake `solana-test-validator` answers the
+    JSON-RPC calls made by ValidatorPool and AsyncRpcClient, single or
+    batched, and credits airdrops immediately; `anchor test` spends
+    validator_startup_seconds starting a validator unless it is given
+    --skip-local-validator, in which case it deploys to the given cluster.
+    """
+    def __init__(self, build_seconds=0.0, test_seconds=0.0, validator_startup_seconds=0.0):
+        self.build_seconds = build_seconds
+        self.test_seconds = test_seconds
+        self.validator_startup_seconds = validator_startup_seconds
+        self.bin_dir = None
+        self._saved_env = None
+
+    def __enter__(self):
+        self.bin_dir = Path(tempfile.mkdtemp(prefix="fake-anchor-"))
+        for name, source in (("anchor", FAKE_ANCHOR), ("cargo", FAKE_CARGO), ("solana-test-validator", FAKE_VALIDATOR)):
+            script = self.bin_dir / name
+            script.write_text(f"#!{sys.executable}\n" + textwrap.dedent(source))
+            script.chmod(0o755)
+
+        self._saved_env = {key: os.environ.get(key) for key in
+                           ("PATH", "FAKE_ANCHOR_BUILD_SECONDS", "FAKE_ANCHOR_TEST_SECONDS",
+                            "FAKE_VALIDATOR_STARTUP_SECONDS")}
+        os.environ["PATH"] = f"{self.bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+        os.environ["FAKE_ANCHOR_BUILD_SECONDS"] = str(self.build_seconds)
+        os.environ["FAKE_ANCHOR_TEST_SECONDS"] = str(self.test_seconds)
+        os.environ["FAKE_VALIDATOR_STARTUP_SECONDS"] = str(self.validator_startup_seconds)
+        toolchain_version.cache_clear()
+        return self
+
+    def __exit__(self, *exc_info):
+        for key, value in self._saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        toolchain_version.cache_clear()
+        shutil.rmtree(self.bin_dir, ignore_errors=True)
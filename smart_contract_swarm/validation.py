@@ -0,0 +1,160 @@
+import json
+import subprocess
+from .compaction import extract_code_blocks
+
+BRACKETS = {")": "(", "]": "[", "}": "{"}
+
+def extract_rust_source(text):
+    """Pull the Rust program out of an agent reply that may contain prose and markdown
+
+    The largest fenced block containing a #[program] module wins, then the
+    largest Rust block; text without fences is returned as is.
+    """
+    blocks = extract_code_blocks(text, languages={"rust", "rs"}) or extract_code_blocks(text)
+    if not blocks:
+        return text.strip() + "\n"
+
+    programs = [block for block in blocks if "#[program]" in block]
+    return max(programs or blocks, key=len).strip() + "\n"
+
+def _skip_string(source, index):
+    # index points at the opening quote; returns the index after the closing one
+    index += 1
+    while index < len(source):
+        if source[index] == "\\":
+            index += 2
+            continue
+        if source[index] == "\"":
+            return index + 1
+        index += 1
+    return index
+
+def _skip_raw_string(source, index):
+    # index points at the `r`; handles r"..." and r#"..."#
+    hashes = 0
+    index += 1
+    while index < len(source) and source[index] == "#":
+        hashes += 1
+        index += 1
+    terminator = "\"" + "#" * hashes
+    end = source.find(terminator, index + 1)
+    return len(source) if end == -1 else end + len(terminator)
+
+def check_brackets(source):
+    """Return a list of unbalanced bracket problems, ignoring comments, strings and chars"""
+    problems = []
+    stack = []
+    line = 1
+    index = 0
+    length = len(source)
+    while index < length:
+        char = source[index]
+        following = source[index + 1] if index + 1 < length else ""
+        if char == "\n":
+            line += 1
+        elif char == "/" and following == "/":
+            end = source.find("\n", index)
+            index = length if end == -1 else end
+            continue
+        elif char == "/" and following == "*":
+            # Rust block comments nest
+            depth = 1
+            index += 2
+            while index < length and depth:
+                if source.startswith("/*", index):
+                    depth += 1
+                    index += 2
+                elif source.startswith("*/", index):
+                    depth -= 1
+                    index += 2
+                else:
+                    line += source[index] == "\n"
+                    index += 1
+            continue
+        elif char == "r" and (following == "\"" or following == "#") and not source[index - 1:index].isalnum():
+            end = _skip_raw_string(source, index)
+            line += source.count("\n", index, end)
+            index = end
+            continue
+        elif char == "\"":
+            end = _skip_string(source, index)
+            line += source.count("\n", index, end)
+            index = end
+            continue
+        elif char == "'":
+            # Char literals ('a', '\n') versus lifetimes ('info)
+            if following == "\\":
+                end = source.find("'", index + 2)
+                index = length if end == -1 else end + 1
+                continue
+            if index + 2 < length and source[index + 2] == "'":
+                index += 3
+                continue
+        elif char in "([{":
+            stack.append((char, line))
+        elif char in ")]}":
+            openings = [opening for opening, _ in stack]
+            if BRACKETS[char] not in openings:
+                problems.append(f"line {line}: unexpected '{char}'")
+            else:
+                # Anything opened after the matching bracket was left unclosed
+                while stack[-1][0] != BRACKETS[char]:
+                    opening, opened_at = stack.pop()
+                    problems.append(f"line {opened_at}: '{opening}' is never closed")
+                stack.pop()
+        index += 1
+
+    for opening, opened_at in stack:
+        problems.append(f"line {opened_at}: '{opening}' is never closed")
+    return problems
+
+def check_source(source):
+    """Fast structural checks that catch unusable generator output before compiling"""
+    problems = check_brackets(source)
+    if "#[program]" not in source:
+        problems.append("missing #[program] module")
+    if "declare_id!" not in source:
+        problems.append("missing declare_id! program id")
+    return problems
+
+def cargo_check(workspace, env=None):
+    """Type-check the workspace without code generation
+
+    Returns the exit code and the compiler diagnostics parsed from
+    `cargo check --message-format=json`, or None if cargo is not installed.
+    """
+    try:
+        completed = subprocess.run(
+            ["cargo", "check", "--message-format=json"],
+            cwd=workspace, env=env, capture_output=True, text=True
+        )
+    except FileNotFoundError:
+        return None
+
+    diagnostics = []
+    for line in completed.stdout.splitlines():
+        try:
+            message = json.loads(line)
+        except ValueError:
+            continue
+        if message.get("reason") != "compiler-message":
+            continue
+        diagnostic = message["message"]
+        if diagnostic.get("level") not in ("error", "warning"):
+            continue
+        diagnostics.append({
+            "level": diagnostic["level"],
+            "message": diagnostic.get("message", ""),
+            "rendered": diagnostic.get("rendered") or diagnostic.get("message", ""),
+            "spans": [
+                {
+                    "file_name": span.get("file_name"),
+                    "line_start": span.get("line_start"),
+                    "line_end": span.get("line_end"),
+                    "column_start": span.get("column_start"),
+                    "column_end": span.get("column_end")
+                }
+                for span in diagnostic.get("spans", [])
+            ]
+        })
+    return {"returncode": completed.returncode, "diagnostics": diagnostics, "stderr": completed.stderr}
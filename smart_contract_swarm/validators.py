@@ -0,0 +1,181 @@
+from pathlib import Path
+import json
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.request
+from .clients import env_int
+
+DEFAULT_BASE_PORT = 8899
+# Ports reserved per validator: RPC, websocket (RPC + 1), faucet, gossip and
+# a dynamic range, so several validators can run on one host
+PORT_BLOCK = 40
+LAMPORTS_PER_SOL = 1_000_000_000
+WALLET_AIRDROP_SOL = 1000
+
+def rpc_request(url, method, params=None, timeout=2.0):
+    """Send one JSON-RPC request and return its result"""
+    payload = json.dumps({"jsonrpc": "2.0", "id": 1, "method": method, "params": params or []})
+    request = urllib.request.Request(url, payload.encode("utf-8"), {"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        body = json.loads(response.read())
+    if "error" in body:
+        raise RuntimeError(f"{method} failed: {body['error']}")
+    return body["result"]
+
+def write_keypair(path):
+    """Write a new keypair to path in the Solana CLI's format, returning its public key"""
+    from solders.keypair import Keypair
+    keypair = Keypair()
+    with open(path, "w") as f:
+        json.dump(list(bytes(keypair)), f)
+    return str(keypair.pubkey())
+
+class LocalValidator:
+    """A solana-test-validator process with its own ledger and ports"""
+    def __init__(self, rpc_port, ledger_dir):
+        self.rpc_port = rpc_port
+        self.ledger_dir = Path(ledger_dir)
+        self.url = f"http://127.0.0.1:{rpc_port}"
+        self.runs = 0
+        self.process = None
+
+    def start(self, timeout=60.0):
+        """Start the validator and wait until it is healthy"""
+        shutil.rmtree(self.ledger_dir, ignore_errors=True)
+        self.ledger_dir.parent.mkdir(parents=True, exist_ok=True)
+        self.process = subprocess.Popen(
+            [
+                "solana-test-validator", "--reset", "--quiet",
+                "--ledger", str(self.ledger_dir),
+                "--rpc-port", str(self.rpc_port),
+                "--faucet-port", str(self.rpc_port + 2),
+                "--gossip-port", str(self.rpc_port + 3),
+                "--dynamic-port-range", f"{self.rpc_port + 10}-{self.rpc_port + PORT_BLOCK - 1}"
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        self.runs = 0
+        try:
+            self._wait_until_healthy(timeout)
+        except Exception:
+            self.stop()
+            raise
+
+    def _wait_until_healthy(self, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"solana-test-validator on port {self.rpc_port} exited with status {self.process.returncode}")
+            try:
+                if rpc_request(self.url, "getHealth") == "ok":
+                    return
+            except (OSError, RuntimeError, ValueError):
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"solana-test-validator on port {self.rpc_port} did not become healthy in {timeout}s")
+
+    def fund_wallet(self, path, timeout=60.0):
+        """Write a new wallet to path and airdrop SOL to it, returning its public key"""
+        pubkey = write_keypair(path)
+        rpc_request(self.url, "requestAirdrop", [pubkey, WALLET_AIRDROP_SOL * LAMPORTS_PER_SOL])
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if rpc_request(self.url, "getBalance", [pubkey])["value"] > 0:
+                return pubkey
+            time.sleep(0.2)
+        raise RuntimeError(f"Airdrop to the test wallet on port {self.rpc_port} was not confirmed")
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+        shutil.rmtree(self.ledger_dir, ignore_errors=True)
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+class ValidatorPool:
+    """Long-lived local validators that `anchor test` runs are assigned to
+
+    Validators are started on first use and handed to one test run at a time.
+    A validator is restarted from a fresh ledger after max_runs test runs or
+    after any failed run, so state left behind by earlier contracts cannot
+    build up. Configured through SWARM_VALIDATORS and SWARM_VALIDATOR_MAX_RUNS.
+    """
+    def __init__(self, size=None, max_runs=None, base_port=None, root=None):
+        self.size = max(1, size or env_int("SWARM_VALIDATORS", 1))
+        self.max_runs = max_runs or env_int("SWARM_VALIDATOR_MAX_RUNS", 20)
+        self.base_port = base_port or DEFAULT_BASE_PORT
+        self.root = Path(root) if root else Path(tempfile.mkdtemp(prefix="swarm-validators-"))
+        self._owns_root = root is None
+        self.validators = [
+            LocalValidator(self.base_port + index * PORT_BLOCK, self.root / f"validator-{index}")
+            for index in range(self.size)
+        ]
+        self.starts = 0
+        self.recycled = 0
+        self._idle = list(self.validators)
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Wait for a free validator, starting it if it is not running"""
+        with self._condition:
+            while not self._idle:
+                self._condition.wait()
+            # Prefer a validator that is already warm
+            validator = next((idle for idle in self._idle if idle.running), self._idle[-1])
+            self._idle.remove(validator)
+        try:
+            if not validator.running:
+                validator.start()
+                with self._condition:
+                    self.starts += 1
+        except Exception:
+            self._put_back(validator)
+            raise
+        return validator
+
+    def release(self, validator, failed=False):
+        """Return a validator after a test run, recycling it if it is used up or failed"""
+        validator.runs += 1
+        if failed or validator.runs >= self.max_runs:
+            validator.stop()
+            with self._condition:
+                self.recycled += 1
+        self._put_back(validator)
+
+    def _put_back(self, validator):
+        with self._condition:
+            self._idle.append(validator)
+            self._condition.notify()
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "running": sum(validator.running for validator in self.validators),
+            "starts": self.starts,
+            "recycled": self.recycled
+        }
+
+    def close(self):
+        """Stop every validator"""
+        for validator in self.validators:
+            validator.stop()
+        if self._owns_root:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
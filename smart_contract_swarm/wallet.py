@@ -1,16 +1,77 @@
 from solders.keypair import Keypair
-from solana.rpc.api import Client
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+import asyncio
 import json
-import base58
+import multiprocessing
 import os
-from dotenv import load_dotenv
+import base58
+from .clients import get_rpc, load_environment
+from .keystore import Keystore
+
+# Keypairs generated per process pool task; below this no pool is started
+KEYPAIR_CHUNK_SIZE = 5000
+
+def _generate_keypairs(count):
+    """Return (public_key, seed) pairs for count new keypairs"""
+    keypairs = (Keypair() for _ in range(count))
+    return [(str(keypair.pubkey()), bytes(keypair.secret())) for keypair in keypairs]
 
 class WalletManager:
-    def __init__(self):
-        load_dotenv()
-        self.client = Client(os.getenv("SOLANA_RPC_URL", "https://api.devnet.solana.com"))
+    def __init__(self, keystore=None, rpc=None):
+        load_environment()
+        self._rpc = rpc
         self.wallet_dir = Path("wallet")
+        self._keystore = keystore
+    
+    @property
+    def rpc(self):
+        """Async batching RPC client, defaulting to the shared one on first use"""
+        if self._rpc is None:
+            self._rpc = get_rpc()
+        return self._rpc
+    
+    def _run(self, coroutine):
+        """Run coroutine on a new event loop, closing the RPC connections it opened"""
+        async def run():
+            try:
+                return await coroutine
+            finally:
+                await self.rpc.aclose()
+        return asyncio.run(run())
+    
+    @property
+    def keystore(self):
+        """Bulk wallet store, wallet/keystore.sqlite3 unless one was given"""
+        if self._keystore is None:
+            self._keystore = Keystore(self.wallet_dir / "keystore.sqlite3")
+        return self._keystore
+    
+    def generate_wallets(self, n, workers=None):
+        """Generate n wallets and save them to the keystore in one transaction
+        
+        Keypairs are generated in a process pool of up to `workers` processes
+        (default: the core count) when n is large enough to pay for it.
+        Returns the public keys; use get_keypair to load a wallet.
+        """
+        chunks = [KEYPAIR_CHUNK_SIZE] * (n // KEYPAIR_CHUNK_SIZE)
+        if n % KEYPAIR_CHUNK_SIZE:
+            chunks.append(n % KEYPAIR_CHUNK_SIZE)
+        
+        workers = min(workers or os.cpu_count() or 1, len(chunks))
+        if workers <= 1:
+            wallets = [wallet for chunk in chunks for wallet in _generate_keypairs(chunk)]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                wallets = [wallet for generated in pool.map(_generate_keypairs, chunks) for wallet in generated]
+        
+        self.keystore.add_many(wallets)
+        return [public_key for public_key, _ in wallets]
+    
+    def get_keypair(self, public_key):
+        """Load a wallet from the keystore by public key, or None if it is not stored"""
+        seed = self.keystore.get(public_key)
+        return None if seed is None else Keypair.from_seed(seed)
     
     def generate_wallet(self):
         """Generate a new Solana wallet and save credentials"""
@@ -56,9 +117,29 @@ class WalletManager:
         """Request airdrop for the wallet on devnet"""
         try:
             # Request 2 SOL airdrop (2 billion lamports)
-            result = self.client.request_airdrop(public_key, 2000000000)
-            print(f"Airdrop requested: {result['result']}")
+            signature = self._run(self.rpc.call("requestAirdrop", [str(public_key), 2000000000]))
+            print(f"Airdrop requested: {signature}")
             return True
         except Exception as e:
             print(f"Error requesting airdrop: {e}")
-            return False 
\ No newline at end of file
+            return False 
+    
+    def fund_wallets(self, public_keys, lamports=2000000000, timeout=60.0):
+        """Airdrop to many wallets and wait for the balances, returning the keys left unfunded"""
+        return self._run(self.afund_wallets(public_keys, lamports, timeout))
+    
+    async def afund_wallets(self, public_keys, lamports=2000000000, timeout=60.0):
+        """Async version of fund_wallets
+        
+        Airdrop requests and balance polls are batched into a few JSON-RPC
+        round trips instead of one blocking request per wallet.
+        """
+        public_keys = [str(key) for key in public_keys]
+        signatures = await self.rpc.request_airdrops(public_keys, lamports)
+        requested = [key for key, signature in zip(public_keys, signatures) if not isinstance(signature, Exception)]
+        failed = [key for key, signature in zip(public_keys, signatures) if isinstance(signature, Exception)]
+        if failed:
+            print(f"Airdrop request failed for {len(failed)} of {len(public_keys)} wallets: {signatures[public_keys.index(failed[0])]}")
+        
+        unfunded = await self.rpc.wait_for_balances(requested, lamports, timeout)
+        return failed + unfunded
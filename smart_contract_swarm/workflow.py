@@ -0,0 +1,105 @@
+import asyncio
+
+class Stage:
+    """One step of a workflow
+
+    run(contract_spec, on_event) is awaited once every stage named in inputs
+    has finished, and its return value becomes the stage's result. The stage
+    is skipped when skip_if(contract_spec) is true, and cancelled after
+    timeout seconds. A failing stage cancels the whole run unless it is
+    optional, in which case only the stages that depend on it are skipped.
+    """
+    def __init__(self, name, run, inputs=(), timeout=None, skip_if=None, optional=False):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.timeout = timeout
+        self.skip_if = skip_if
+        self.optional = optional
+
+class Workflow:
+    """A graph of stages run with as much concurrency as their inputs allow"""
+    def __init__(self, stages=()):
+        self.stages = {}
+        for stage in stages:
+            self.add(stage)
+
+    def add(self, stage):
+        """Add a stage; its inputs must already be in the workflow"""
+        if stage.name in self.stages:
+            raise RuntimeError(f"Workflow already has a stage named {stage.name!r}")
+        missing = [name for name in stage.inputs if name not in self.stages]
+        if missing:
+            raise RuntimeError(f"Stage {stage.name!r} depends on unknown stages: {', '.join(missing)}")
+        # Inputs must already exist, so the graph can never contain a cycle
+        self.stages[stage.name] = stage
+        return stage
+
+    def remove(self, name):
+        """Remove a stage that no other stage depends on"""
+        dependents = [stage.name for stage in self.stages.values() if name in stage.inputs]
+        if dependents:
+            raise RuntimeError(f"Cannot remove {name!r}: {', '.join(dependents)} depend on it")
+        return self.stages.pop(name)
+
+    def __getitem__(self, name):
+        return self.stages[name]
+
+    def __contains__(self, name):
+        return name in self.stages
+
+    async def _run_stage(self, stage, contract_spec, on_event):
+        if stage.timeout is None:
+            return await stage.run(contract_spec, on_event)
+        try:
+            return await asyncio.wait_for(stage.run(contract_spec, on_event), stage.timeout)
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"Stage {stage.name!r} timed out after {stage.timeout}s")
+
+    async def run(self, contract_spec, on_event=None):
+        """Run every stage as soon as its inputs are done, returning {name: result}
+
+        Skipped stages and optional stages that failed have no result. The
+        first required stage to fail cancels the stages still running and its
+        exception is raised.
+        """
+        results = {}
+        finished = set()
+        blocked = set()
+        running = {}
+        waiting = dict(self.stages)
+
+        try:
+            while waiting or running:
+                for name, stage in list(waiting.items()):
+                    if any(dependency in blocked for dependency in stage.inputs):
+                        print(f"\nSkipping {name}, an input stage failed")
+                        blocked.add(name)
+                        del waiting[name]
+                    elif all(dependency in finished for dependency in stage.inputs):
+                        del waiting[name]
+                        if stage.skip_if is not None and stage.skip_if(contract_spec):
+                            finished.add(name)
+                            continue
+                        task = asyncio.ensure_future(self._run_stage(stage, contract_spec, on_event))
+                        running[task] = stage
+                if not running:
+                    # Stages left waiting were unblocked by skips above
+                    continue
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    stage = running.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        results[stage.name] = task.result()
+                        finished.add(stage.name)
+                    elif stage.optional:
+                        print(f"\nOptional stage {stage.name} failed: {error}")
+                        blocked.add(stage.name)
+                    else:
+                        raise error
+        finally:
+            for task in running:
+                task.cancel()
+        return results
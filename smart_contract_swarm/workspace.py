@@ -0,0 +1,175 @@
+from contextlib import contextmanager
+from pathlib import Path
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+
+ANCHOR_NOT_FOUND = "Anchor framework not found. Please install it with 'cargo install --git https://github.com/project-serum/anchor anchor-cli'"
+
+def default_cache_dir():
+    return Path(os.getenv("SWARM_TEMPLATE_DIR", "~/.cache/smart-contract-swarm")).expanduser()
+
+def _link_or_copy(src, dst):
+    # Only node_modules is hardlinked: nothing in the pipeline writes to it,
+    # while sources, Anchor.toml and Cargo.lock are rewritten in place and
+    # must not leak back into the template
+    if "node_modules" in Path(src).parts:
+        try:
+            os.link(src, dst)
+            return dst
+        except OSError:
+            pass
+    return shutil.copy2(src, dst)
+
+def set_localnet_program(config, name, value):
+    """Return Anchor.toml text with name = "value" under [programs.localnet], replacing any earlier entry"""
+    entry = f"{name} = \"{value}\""
+    lines = []
+    section = None
+    found = False
+    for line in config.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("["):
+            section = stripped
+            lines.append(line)
+            if section == "[programs.localnet]" and not found:
+                lines.append(entry)
+                found = True
+            continue
+        key = stripped.split("=", 1)[0].strip().strip("\"'")
+        if section == "[programs.localnet]" and "=" in stripped and key == name:
+            # Dropped here and written once right after the section header
+            continue
+        lines.append(line)
+    if not found:
+        lines += ["", "[programs.localnet]", entry]
+    return "\n".join(lines) + "\n"
+
+class AnchorTemplate:
+    """A cached `anchor init` skeleton that new workspaces are cloned from
+
+    The skeleton is created once under the cache directory. Every workspace
+    cloned from it builds into the same CARGO_TARGET_DIR, so the Anchor
+    dependency tree is compiled once and each new workspace only compiles
+    its own crate.
+    """
+    def __init__(self, cache_dir=None):
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.template_dir = self.cache_dir / "template" / "program"
+        self.target_dir = self.cache_dir / "target"
+        self._lock = threading.Lock()
+
+    def ensure(self):
+        """Create the template with `anchor init` if it is not cached yet"""
+        with self._lock:
+            if (self.template_dir / "Anchor.toml").exists():
+                return self.template_dir
+
+            try:
+                subprocess.run(["anchor", "--version"], check=True, capture_output=True)
+            except (subprocess.CalledProcessError, FileNotFoundError):
+                raise RuntimeError(ANCHOR_NOT_FOUND)
+
+            # Initialize in a staging directory and rename it into place, so a
+            # half-initialized template is never picked up by another process
+            self.template_dir.parent.mkdir(parents=True, exist_ok=True)
+            staging = Path(tempfile.mkdtemp(dir=str(self.template_dir.parent)))
+            try:
+                subprocess.run(["anchor", "init", "program"], cwd=staging, check=True)
+                try:
+                    os.replace(staging / "program", self.template_dir)
+                except OSError:
+                    # Another process published the template first
+                    if not (self.template_dir / "Anchor.toml").exists():
+                        raise
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+            return self.template_dir
+
+    def clone(self, workspace, target_dir=None):
+        """Create a workspace from the template, building into target_dir if given
+
+        Files already in workspace are overwritten by the template's.
+        """
+        template = self.ensure()
+        shutil.copytree(
+            template, workspace,
+            symlinks=True,
+            dirs_exist_ok=True,
+            copy_function=_link_or_copy,
+            ignore=shutil.ignore_patterns("target", ".anchor")
+        )
+        self.link_target(workspace, target_dir)
+
+    def link_target(self, workspace, target_dir=None):
+        """Point a workspace's target directory at the shared one, or at target_dir"""
+        target_dir = Path(target_dir or self.target_dir)
+        target_dir.mkdir(parents=True, exist_ok=True)
+        target = Path(workspace) / "target"
+        if not target.exists() and not target.is_symlink():
+            target.symlink_to(target_dir.resolve(), target_is_directory=True)
+
+    def build_env(self, target_dir=None):
+        """Environment for cargo/anchor commands that use the shared target dir, or target_dir"""
+        env = dict(os.environ)
+        env["CARGO_TARGET_DIR"] = str(Path(target_dir or self.target_dir).resolve())
+        return env
+
+    def warm(self):
+        """Build the template once so the shared target dir holds compiled dependencies"""
+        template = self.ensure()
+        self.link_target(template)
+        subprocess.run(["anchor", "build"], cwd=template, check=True, env=self.build_env())
+
+class WorkspacePool:
+    """Long-lived workspaces, each building into its own cargo target dir
+
+    cargo locks a target dir for the whole build, so concurrent checks each
+    need their own. A slot's target dir is seeded from the template's
+    compiled dependencies once, when the slot is created, and kept across
+    uses so later checks in it are incremental. Slots are created as
+    concurrent callers need them and removed by close().
+    """
+    def __init__(self, root=None):
+        self.root = Path(root) if root else None
+        self._owns_root = root is None
+        self._free = []
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, template):
+        """Borrow a (workspace, target_dir) pair cloned from template"""
+        with self._lock:
+            if self.root is None:
+                self.root = Path(tempfile.mkdtemp(prefix="swarm-workspaces-"))
+            reused = bool(self._free)
+            if reused:
+                slot = self._free.pop()
+            else:
+                slot = self.root / f"slot-{self._created}"
+                self._created += 1
+        workspace, target_dir = slot / "program", slot / "target"
+        if not reused:
+            try:
+                if template.target_dir.is_dir():
+                    shutil.copytree(template.target_dir, target_dir, symlinks=True)
+                template.clone(workspace, target_dir)
+            except BaseException:
+                shutil.rmtree(slot, ignore_errors=True)
+                raise
+        try:
+            yield workspace, target_dir
+        finally:
+            with self._lock:
+                self._free.append(slot)
+
+    def close(self):
+        """Remove the workspaces, if the pool created their root"""
+        with self._lock:
+            if self.root is not None and self._owns_root:
+                shutil.rmtree(self.root, ignore_errors=True)
+                self.root = None
+            self._free = []
@@ -0,0 +1,35 @@
+import pytest
+from smart_contract_swarm import AnchorTemplate, BuildCache, CheckpointStore, ContractGenerator, ContractSwarm
+from smart_contract_swarm.artifacts import ArtifactStore
+from smart_contract_swarm.testing import FakeLLM
+
+@pytest.fixture
+def make_swarm(tmp_path):
+    """Factory for swarms on the fake LLM with checkpoints, caches, artifacts and workspace under tmp_path
+
+    Keyword arguments are passed to ContractSwarm and replace the defaults.
+    The response cache is turned off so every call reaches the LLM, and the
+    swarms are closed after the test.
+    """
+    swarms = []
+
+    def make(**options):
+        options.setdefault("llm", FakeLLM())
+        options.setdefault("checkpoints", CheckpointStore(tmp_path / "runs"))
+        options.setdefault("build_cache", BuildCache(tmp_path / "builds"))
+        options.setdefault("artifacts", ArtifactStore(tmp_path / "artifacts"))
+        swarm = ContractSwarm(**options)
+        swarm.contract_generator = ContractGenerator(tmp_path / "program", template=AnchorTemplate(tmp_path / "template"))
+        for agent in swarm.agents.values():
+            agent.cache = None
+        swarms.append(swarm)
+        return swarm
+
+    yield make
+    for swarm in swarms:
+        swarm.close()
+
+@pytest.fixture
+def fake_swarm(make_swarm, request):
+    """A swarm from make_swarm; parametrize indirectly with a dict of ContractSwarm options for variants"""
+    return make_swarm(**getattr(request, "param", {}))
@@ -0,0 +1,115 @@
+import threading
+from smart_contract_swarm import artifacts as artifacts_module
+from smart_contract_swarm.artifacts import ArtifactStore
+from smart_contract_swarm.testing import FakeAnchorToolchain
+
+CODE = """```rust
+use anchor_lang::prelude::*;
+
+declare_id!("Fg6PaFpoGXkYsidMpWTK6W2BeZ7FEfcYkg476zPFsLnS");
+
+#[program]
+pub mod vesting {
+    use super::*;
+    pub fn claim(ctx: Context<Claim>) -> Result<()> {
+        Ok(())
+    }
+}
+```"""
+
+def make_spec(run_id, code=CODE, validated=True):
+    return {
+        "run_id": run_id,
+        "requirements": "Create a token vesting contract",
+        "technical_specs": "specs",
+        "architecture": "architecture",
+        "contract_code": code,
+        "security_audit": "no issues",
+        "test_cases": None,
+        "validated": validated,
+        "metrics": {"run_id": run_id, "total_time": 1.5, "spans": [
+            {"name": "cargo check", "kind": "build", "wall_time": 0.25},
+            {"name": "cargo check", "kind": "build", "wall_time": 0.5}
+        ]}
+    }
+
+def test_runs_are_indexed_and_deduplicated(tmp_path):
+    """Test that identical outputs share blobs and runs can be queried and reloaded"""
+    store = ArtifactStore(tmp_path / "artifacts")
+    store.save_run(make_spec("first"))
+    store.save_run(make_spec("second", validated=False))
+    
+    run = store.get_run("first")
+    assert run["validated"] is True
+    assert run["timings"]["cargo check"] == {"kind": "build", "wall_time": 0.75, "calls": 2}
+    assert "lib.rs" in run["artifacts"] and "test_cases.md" not in run["artifacts"]
+    assert store.read("first", "lib.rs").startswith("use anchor_lang::prelude::*;")
+    assert store.load("second")["contract_code"] == CODE
+    
+    assert [run["run_id"] for run in store.runs(requirements="Create a token vesting contract")] == ["second", "first"]
+    assert [run["run_id"] for run in store.runs(validated=True)] == ["first"]
+    stats = store.stats()
+    # Only spec.json and metrics.json differ between the two runs
+    assert stats["runs"] == 2 and stats["blobs"] == 10
+    assert stats["referenced_bytes"] > stats["bytes"]
+
+def test_diff_between_runs(tmp_path):
+    """Test that only changed artifacts are reported and diffed"""
+    store = ArtifactStore(tmp_path / "artifacts")
+    store.save_run(make_spec("before"))
+    store.save_run(make_spec("after", code=CODE.replace("Ok(())", "require!(true, ErrorCode::Locked);\n        Ok(())")))
+    
+    assert store.changed("before", "after") == ["contract_code.md", "lib.rs", "metrics.json", "spec.json"]
+    diff = store.diff("before", "after")
+    assert "+        require!(true, ErrorCode::Locked);" in diff
+    assert store.diff("before", "after", "architecture.md") == ""
+
+def test_delete_run_keeps_shared_blobs(tmp_path):
+    """Test that deleting a run removes only the blobs no other run uses"""
+    store = ArtifactStore(tmp_path / "artifacts")
+    store.save_run(make_spec("kept"))
+    store.save_run(make_spec("deleted", code=CODE.replace("claim", "withdraw")))
+    store.delete_run("deleted")
+    
+    assert store.get_run("deleted") is None
+    assert store.load("kept")["contract_code"] == CODE
+    assert store.stats()["blobs"] == len(store.get_run("kept")["artifacts"])
+
+def test_swarm_archives_every_run(make_swarm, tmp_path):
+    """Test that finished pipeline runs are saved to the artifact store"""
+    store = ArtifactStore(tmp_path / "artifacts")
+    swarm = make_swarm(artifacts=store)
+    
+    with FakeAnchorToolchain():
+        result = swarm.process_contract_request("Create a token vesting contract")
+    
+    run = store.get_run(result["run_id"])
+    assert run["validated"] is True
+    assert "anchor build" in run["timings"]
+    assert store.load(result["run_id"])["test_cases"] == result["test_cases"]
+
+def test_delete_run_does_not_remove_blobs_being_saved(tmp_path):
+    """Test that a run saved while another run with the same outputs is deleted keeps its blobs"""
+    store = ArtifactStore(tmp_path / "artifacts")
+    def churn():
+        for _ in range(50):
+            store.save_run(make_spec("deleted"))
+            store.delete_run("deleted")
+    churner = threading.Thread(target=churn)
+    churner.start()
+    for index in range(50):
+        store.save_run(make_spec(f"kept-{index}"))
+    churner.join()
+    
+    for index in range(50):
+        for name, digest in store.get_run(f"kept-{index}")["artifacts"].items():
+            assert store.get_blob(digest)
+
+def test_default_store_is_opt_in(monkeypatch):
+    """Test that runs are only archived to the default store when SWARM_ARTIFACTS is set"""
+    monkeypatch.setattr(artifacts_module, "_default_store", None)
+    monkeypatch.setenv("SWARM_ARTIFACT_DIR", "unused")
+    monkeypatch.delenv("SWARM_ARTIFACTS", raising=False)
+    assert artifacts_module.get_default_store() is None
+    monkeypatch.setenv("SWARM_ARTIFACTS", "1")
+    assert str(artifacts_module.get_default_store().root) == "unused"
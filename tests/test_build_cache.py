@@ -0,0 +1,58 @@
+import pytest
+import subprocess
+from smart_contract_swarm import BuildCache, ContractSwarm
+import smart_contract_swarm.build_farm as build_farm_module
+
+@pytest.fixture
+def workspace(tmp_path):
+    workspace = tmp_path / "program"
+    (workspace / "programs" / "program" / "src").mkdir(parents=True)
+    (workspace / "programs" / "program" / "src" / "lib.rs").write_text("use anchor_lang::prelude::*;")
+    (workspace / "Anchor.toml").write_text("[programs.localnet]\n")
+    (workspace / "target" / "deploy").mkdir(parents=True)
+    (workspace / "target" / "deploy" / "program.so").write_bytes(b"\x7fELF")
+    return workspace
+
+def test_key_changes_with_sources_and_toolchain(workspace):
+    """Test that the key covers lib.rs, Anchor.toml and the toolchain"""
+    key = BuildCache.make_key(workspace, "anchor-cli 0.29.0")
+    assert key == BuildCache.make_key(workspace, "anchor-cli 0.29.0")
+    assert key != BuildCache.make_key(workspace, "anchor-cli 0.30.0")
+    
+    (workspace / "programs" / "program" / "src" / "lib.rs").write_text("// changed")
+    assert key != BuildCache.make_key(workspace, "anchor-cli 0.29.0")
+
+def test_store_and_restore_artifacts(workspace, tmp_path):
+    """Test that a stored result and its artifacts can be replayed"""
+    cache = BuildCache(tmp_path / "builds")
+    key = BuildCache.make_key(workspace, "anchor-cli 0.29.0")
+    assert cache.get(key) is None
+    
+    result = {"success": True, "build": {"returncode": 0, "stdout": "ok", "stderr": ""}, "test": None}
+    cache.store(key, result, workspace)
+    (workspace / "target" / "deploy" / "program.so").unlink()
+    
+    assert cache.get(key) == result
+    cache.restore_artifacts(key, workspace)
+    assert (workspace / "target" / "deploy" / "program.so").read_bytes() == b"\x7fELF"
+
+def test_build_and_test_replays_cached_result(workspace, tmp_path, monkeypatch):
+    """Test that identical sources skip anchor entirely"""
+    monkeypatch.setattr(build_farm_module, "toolchain_version", lambda: "anchor-cli 0.29.0")
+    swarm = ContractSwarm(build_cache=BuildCache(tmp_path / "builds"))
+    swarm.contract_generator.program_dir = workspace
+    (workspace / "programs" / "program" / "src" / "lib.rs").write_text(
+        "declare_id!(\"Fg6PaFpoGXkYsidMpWTK6W2BeZ7FEfcYkg476zPFsLnS\");\n#[program]\npub mod program {}\n"
+    )
+    
+    calls = []
+    def fake_run(command, **kwargs):
+        calls.append(command)
+        return subprocess.CompletedProcess(command, 0, stdout="", stderr="")
+    monkeypatch.setattr(build_farm_module.subprocess, "run", fake_run)
+    
+    assert swarm.build_and_test()
+    assert calls == [["cargo", "check", "--message-format=json"], ["anchor", "build"], ["anchor", "test"]]
+    
+    assert swarm.build_and_test()
+    assert len(calls) == 3
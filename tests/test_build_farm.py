@@ -0,0 +1,72 @@
+import pytest
+import os
+from smart_contract_swarm import AnchorTemplate, BuildCache, BuildFarm
+from smart_contract_swarm.testing import FAKE_CONTRACT, FakeAnchorToolchain, FakeLLM
+
+BROKEN_CONTRACT = FAKE_CONTRACT.replace("Ok(())", "compile_error!(\"boom\");\n        Ok(())")
+
+@pytest.fixture
+def farm(tmp_path):
+    farm = BuildFarm(workers=2, root=tmp_path / "farm", template=AnchorTemplate(tmp_path / "template"),
+                     build_cache=BuildCache(tmp_path / "builds"))
+    yield farm
+    farm.close()
+
+def test_workers_capped_at_core_count(tmp_path):
+    """Test that the pool never exceeds the number of cores"""
+    assert BuildFarm(workers=1024, root=tmp_path).workers == (os.cpu_count() or 1)
+    assert BuildFarm(workers=1, root=tmp_path).workers == 1
+
+def test_concurrent_builds_are_isolated(farm):
+    """Test that builds submitted together each see their own lib.rs"""
+    with FakeAnchorToolchain():
+        futures = [farm.submit(FAKE_CONTRACT), farm.submit(BROKEN_CONTRACT), farm.submit("no code at all")]
+        good, broken, empty = [future.result() for future in futures]
+    
+    assert good["success"] and good["test"]["returncode"] == 0
+    assert not broken["success"] and broken["build"] is None
+    assert broken["check"]["diagnostics"][0]["message"] == "compile_error! invoked"
+    assert empty["precheck"] == ["missing #[program] module", "missing declare_id! program id"]
+    assert all(result["worker"] for result in (good, broken, empty))
+
+def test_pipeline_builds_in_farm(farm, make_swarm, tmp_path):
+    """Test that a swarm with a farm builds and repairs without the shared workspace"""
+    swarm = make_swarm(llm=FakeLLM(responses={"code generator": BROKEN_CONTRACT}), build_farm=farm)
+    
+    with FakeAnchorToolchain():
+        first = swarm.process_contract_request("Create a token vesting contract")
+        swarm.agents["generator"].llm = FakeLLM()
+        second = swarm.process_contract_request("Create a token vesting contract")
+    
+    assert first["repairs"] == swarm.max_repairs
+    assert second["repairs"] == 0
+    spans = {span["name"]: span for span in second["metrics"]["spans"]}
+    assert "create_anchor_project" not in spans
+    assert spans["build_and_test"]["worker"]
+    assert not (tmp_path / "program").exists()
+
+def test_workers_test_against_their_validators(tmp_path):
+    """Test that farm workers keep a validator warm for anchor test"""
+    farm = BuildFarm(workers=1, root=tmp_path / "farm", template=AnchorTemplate(tmp_path / "template"),
+                     build_cache=BuildCache(tmp_path / "builds"), validators=1)
+    try:
+        with FakeAnchorToolchain():
+            first = farm.build(FAKE_CONTRACT)
+            second = farm.build(FAKE_CONTRACT.replace("cliff_months: u8)", "cliff_months: u8, )"))
+    finally:
+        farm.close()
+    
+    assert "(deployment 1)" in first["test"]["stdout"]
+    assert "(deployment 2)" in second["test"]["stdout"]
+
+def test_close_drops_queued_builds(tmp_path):
+    """Test that closing the farm cancels builds that have not started"""
+    farm = BuildFarm(workers=1, root=tmp_path / "farm", template=AnchorTemplate(tmp_path / "template"),
+                     build_cache=BuildCache(tmp_path / "builds"))
+    with FakeAnchorToolchain(build_seconds=0.5):
+        futures = [farm.submit(FAKE_CONTRACT) for _ in range(4)]
+        farm.close()
+    
+    assert futures[0].done() and not futures[0].cancelled()
+    assert any(future.cancelled() for future in futures[1:])
+    assert not farm._pending
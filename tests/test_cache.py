@@ -0,0 +1,74 @@
+import pytest
+from types import SimpleNamespace
+from smart_contract_swarm import SmartContractAgent, ResponseCache
+
+class CountingLLM:
+    """Synchronous LLM double that counts generate calls"""
+    model_name = "gpt-4"
+    temperature = 0.7
+    
+    def __init__(self):
+        self.calls = 0
+    
+    def generate(self, message_batches):
+        self.calls += 1
+        text = f"response {self.calls}"
+        return SimpleNamespace(generations=[[SimpleNamespace(text=text)]])
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite3")
+    yield cache
+    cache.close()
+
+def test_cache_hit_and_miss_counters(cache):
+    """Test that lookups are counted as hits or misses"""
+    key = ResponseCache.make_key("gpt-4", 0.7, "system", "input")
+    assert cache.get(key) is None
+    cache.set(key, "cached response")
+    assert cache.get(key) == "cached response"
+    
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+
+def test_cache_key_covers_model_parameters():
+    """Test that every parameter of the request changes the key"""
+    base = ResponseCache.make_key("gpt-4", 0.7, "system", "input")
+    assert base != ResponseCache.make_key("gpt-3.5-turbo", 0.7, "system", "input")
+    assert base != ResponseCache.make_key("gpt-4", 0.0, "system", "input")
+    assert base != ResponseCache.make_key("gpt-4", 0.7, "other system", "input")
+    assert base != ResponseCache.make_key("gpt-4", 0.7, "system", "other input")
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Test that the cache stays under its size bound by dropping old entries"""
+    cache = ResponseCache(tmp_path / "responses.sqlite3", max_bytes=20)
+    cache.set("a", "x" * 8)
+    cache.set("b", "x" * 8)
+    cache.get("a")
+    cache.set("c", "x" * 8)
+    
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    assert cache.stats()["bytes"] <= 20
+    cache.close()
+
+def test_agent_serves_repeated_prompts_from_cache(cache):
+    """Test that an agent only calls the LLM once for identical input"""
+    agent = SmartContractAgent(name="Analyzer", system_prompt="Analyze", cache=cache)
+    agent.llm = CountingLLM()
+    
+    assert agent.execute("requirements") == "response 1"
+    assert agent.execute("requirements") == "response 1"
+    assert agent.llm.calls == 1
+
+def test_agent_cache_opt_out(cache):
+    """Test that use_cache=False always calls the LLM"""
+    agent = SmartContractAgent(name="Generator", system_prompt="Generate", cache=cache, use_cache=False)
+    agent.llm = CountingLLM()
+    
+    agent.execute("architecture")
+    agent.execute("architecture")
+    assert agent.llm.calls == 2
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from smart_contract_swarm.testing import FAKE_CONTRACT, FakeAnchorToolchain, FakeLLM, FakeResult
+
+class HedgeLLM(FakeLLM):
+    """Code generator calls answer with the given (delay, text) pairs in call order"""
+    def __init__(self, candidates):
+        super().__init__()
+        self.candidates = list(candidates)
+        self.cancelled = 0
+    
+    async def agenerate(self, message_batches):
+        messages = message_batches[0]
+        if "code generator" not in messages[0].content.lower():
+            return await super().agenerate(message_batches)
+        delay, text = self.candidates.pop(0)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return FakeResult(text, 1, 1)
+
+def test_first_passing_candidate_wins(make_swarm):
+    """Test that the fastest valid candidate is used and slower calls are cancelled"""
+    llm = HedgeLLM([(5, FAKE_CONTRACT), (0.05, FAKE_CONTRACT), (0, "not rust")])
+    swarm = make_swarm(llm=llm, max_repairs=0, candidates=3)
+    with FakeAnchorToolchain():
+        result = swarm.process_contract_request("Create a token vesting contract")
+    
+    assert result["candidate_winner"] == 1
+    assert result["contract_code"] == FAKE_CONTRACT
+    assert llm.cancelled == 1
+    assert swarm.candidate_stats() == {"runs": 1, "wins": {1: 1}, "no_winner": 0}
+    spans = {span["name"]: span for span in result["metrics"]["spans"]}
+    assert spans["candidate 0"]["status"] == "cancelled"
+    assert spans["candidate 2"]["passed"] is False
+    assert spans["contract_code"]["winner"] == 1
+
+def test_candidates_configurable_per_request(make_swarm):
+    """Test that a request can ask for a different number of candidates"""
+    llm = HedgeLLM([(0, "not rust"), (0.05, "still not rust")])
+    swarm = make_swarm(llm=llm, max_repairs=0, candidates=1)
+    with FakeAnchorToolchain():
+        result = swarm.process_contract_request("Create a token vesting contract", candidates=2)
+    
+    assert result["candidates"] == 2
+    assert result["candidate_winner"] is None
+    assert result["contract_code"] == "not rust"
+    assert swarm.candidate_stats()["no_winner"] == 1
+
+def test_candidates_check_in_their_own_target_dirs(make_swarm, monkeypatch):
+    """Test that concurrent candidate type-checks get their own target dirs, kept warm across requests"""
+    from smart_contract_swarm import swarm as swarm_module
+    checks = []
+    both_running = threading.Barrier(2, timeout=5)
+    def fake_cargo_check(workspace, env):
+        target_dir = env["CARGO_TARGET_DIR"]
+        checks.append((target_dir, os.path.exists(os.path.join(target_dir, "deps.rlib")),
+                       os.path.exists(os.path.join(target_dir, "incremental"))))
+        both_running.wait()
+        with open(os.path.join(target_dir, "incremental"), "w") as marker:
+            marker.write("compiled")
+        return {"returncode": 0, "diagnostics": [], "stderr": ""}
+    monkeypatch.setattr(swarm_module, "cargo_check", fake_cargo_check)
+    
+    swarm = make_swarm(max_repairs=0, candidates=2)
+    template = swarm.contract_generator.template
+    with FakeAnchorToolchain(), ThreadPoolExecutor(2) as executor:
+        template.ensure()
+        template.target_dir.mkdir(parents=True)
+        (template.target_dir / "deps.rlib").write_text("compiled")
+        for _ in range(2):
+            passed = list(executor.map(swarm._validate_candidate, [FAKE_CONTRACT] * 2))
+            assert passed == [True, True]
+    
+    first, second = checks[:2], checks[2:]
+    assert len({target_dir for target_dir, _, _ in first}) == 2
+    assert {target_dir for target_dir, _, _ in second} == {target_dir for target_dir, _, _ in first}
+    assert all(seeded and not warm for _, seeded, warm in first)
+    assert all(warm for _, _, warm in second)
+    assert str(template.target_dir.resolve()) not in {target_dir for target_dir, _, _ in checks}
+    
+    root = swarm.candidate_workspaces.root
+    swarm.close()
+    assert not root.exists()
@@ -0,0 +1,25 @@
+import pytest
+from smart_contract_swarm import CheckpointStore
+
+def test_checkpoint_round_trip(tmp_path):
+    """Test that a saved checkpoint loads back unchanged"""
+    store = CheckpointStore(tmp_path)
+    spec = {"run_id": "abc", "requirements": "vesting", "technical_specs": "specs", "architecture": None}
+    store.save("abc", spec)
+    
+    assert store.exists("abc")
+    assert store.load("abc") == spec
+
+def test_checkpoint_save_replaces_atomically(tmp_path):
+    """Test that saving overwrites the checkpoint without leaving temporary files"""
+    store = CheckpointStore(tmp_path)
+    store.save("abc", {"technical_specs": None})
+    store.save("abc", {"technical_specs": "specs"})
+    
+    assert store.load("abc") == {"technical_specs": "specs"}
+    assert [p.name for p in tmp_path.iterdir()] == ["abc.json"]
+
+def test_missing_checkpoint(tmp_path):
+    """Test that loading an unknown run fails clearly"""
+    with pytest.raises(RuntimeError):
+        CheckpointStore(tmp_path).load("missing")
@@ -0,0 +1,56 @@
+from smart_contract_swarm.compaction import compact, count_tokens, extract_code_blocks, truncate_to_tokens
+
+GENERATOR_REPLY = """Here is the vesting program you asked for.
+
+```rust
+use anchor_lang::prelude::*;
+
+#[program]
+pub mod vesting {}
+```
+
+It stores the admin so that later instructions can check the signer.
+"""
+
+ANALYSIS = """The contract should release tokens gradually and it is important that the
+admin can pause it in an emergency, which many vesting designs forget.
+
+## Requirements
+- Linear vesting over 12 months
+- Cliff of 3 months
+1. Emergency pause
+"""
+
+def test_extract_code_blocks():
+    """Test that fenced blocks are extracted without the fences"""
+    blocks = extract_code_blocks(GENERATOR_REPLY)
+    assert blocks == ["use anchor_lang::prelude::*;\n\n#[program]\npub mod vesting {}"]
+    assert extract_code_blocks(GENERATOR_REPLY, languages={"typescript"}) == []
+
+def test_code_mode_drops_prose():
+    """Test that the auditor and tester only receive the code"""
+    compacted = compact(GENERATOR_REPLY, mode="code")
+    assert "#[program]" in compacted
+    assert "Here is" not in compacted
+    assert "signer" not in compacted
+
+def test_structured_mode_keeps_headings_and_lists():
+    """Test that structured mode keeps the outline of a document"""
+    compacted = compact(ANALYSIS, mode="structured")
+    assert "## Requirements" in compacted
+    assert "- Cliff of 3 months" in compacted
+    assert "1. Emergency pause" in compacted
+    assert "many vesting designs forget" not in compacted
+
+def test_falls_back_to_full_text():
+    """Test that output without code or structure is passed through"""
+    assert compact("Plain prose only.", mode="code") == "Plain prose only."
+    assert compact("Plain prose only.", mode="structured") == "Plain prose only."
+
+def test_truncate_to_budget():
+    """Test that compacted input never exceeds its token budget"""
+    text = "word " * 2000
+    truncated = truncate_to_tokens(text, 100)
+    assert count_tokens(truncated) <= 100
+    assert truncated.endswith("[truncated]")
+    assert truncate_to_tokens("short", 100) == "short"
@@ -0,0 +1,140 @@
+import asyncio
+import os
+import threading
+import time
+from smart_contract_swarm.jobs import JobQueue, JobWorker, open_queue
+from smart_contract_swarm.testing import FakeAnchorToolchain, FakeLLM
+
+def test_claims_follow_priority_and_deadlines(tmp_path):
+    """Test that jobs are claimed by priority and expired ones are never started"""
+    queue = JobQueue(tmp_path / "queue.sqlite3")
+    low = queue.enqueue("low", priority=0)
+    high = queue.enqueue("high", priority=5)
+    stale = queue.enqueue("stale", priority=9, deadline=time.time() - 1)
+    
+    assert queue.claim("w1")["id"] == high
+    assert queue.claim("w1")["id"] == low
+    assert queue.claim("w1") is None
+    assert queue.get(stale)["status"] == "failed"
+    assert queue.depth() == {"queued": 0, "running": 2, "done": 0, "failed": 1}
+
+def test_expired_leases_are_reclaimed(tmp_path):
+    """Test that a job whose worker stopped renewing its lease moves to another worker"""
+    queue = JobQueue(tmp_path / "queue.sqlite3", lease_seconds=0.05, max_attempts=2)
+    job_id = queue.enqueue("build a vault")
+    assert queue.claim("crashed")["attempts"] == 1
+    time.sleep(0.1)
+    
+    job = queue.claim("w2")
+    assert (job["id"], job["worker"], job["attempts"]) == (job_id, "w2", 2)
+    assert not queue.heartbeat(job_id, "crashed")
+    assert not queue.complete(job_id, "crashed", {})
+    
+    time.sleep(0.1)
+    assert queue.claim("w3") is None
+    assert queue.get(job_id)["status"] == "failed"
+
+def test_failures_retry_with_backoff(tmp_path):
+    """Test that failed attempts are requeued after a delay until max_attempts"""
+    queue = JobQueue(tmp_path / "queue.sqlite3", max_attempts=2, retry_delay=0.05)
+    job_id = queue.enqueue("build a vault")
+    queue.fail(queue.claim("w1")["id"], "w1", "rate limited")
+    assert queue.claim("w1") is None
+    time.sleep(0.1)
+    
+    queue.fail(queue.claim("w1")["id"], "w1", "rate limited again")
+    job = queue.get(job_id)
+    assert (job["status"], job["attempts"], job["error"]) == ("failed", 2, "rate limited again")
+
+def test_concurrent_claims_never_share_a_job(tmp_path):
+    """Test that workers with their own connections each get different jobs"""
+    path = tmp_path / "queue.sqlite3"
+    open_queue(str(path)).enqueue_many([{"requirements": f"job {index}"} for index in range(40)])
+    claimed = []
+    
+    def work(worker):
+        queue = JobQueue(path)
+        while True:
+            job = queue.claim(worker)
+            if job is None:
+                break
+            claimed.append(job["id"])
+            queue.complete(job["id"], worker, {})
+        queue.close()
+    
+    threads = [threading.Thread(target=work, args=(f"w{index}",)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert sorted(claimed) == list(range(1, 41))
+
+def test_worker_drains_the_queue(fake_swarm, tmp_path):
+    """Test that the worker runs queued requests through the swarm and records results"""
+    queue = JobQueue(tmp_path / "queue.sqlite3")
+    ids = queue.enqueue_many([{"request_id": f"r{index}", "body": "Create a token vesting contract"}
+                              for index in range(3)])
+    worker = JobWorker(queue, fake_swarm, concurrency=2, poll_interval=0.05)
+    
+    with FakeAnchorToolchain():
+        asyncio.run(worker.run(drain=True))
+    
+    assert worker.completed == 3
+    for job_id in ids:
+        job = queue.get(job_id)
+        assert job["status"] == "done"
+        assert job["result"]["run_id"] == f"job-{job_id}"
+        assert "#[program]" in job["result"]["contract_code"]
+    stats = queue.stats()
+    assert stats["depth"]["done"] == 3
+    assert stats["latency"]["p95"] >= stats["run_time"]["p50"] > 0
+
+def test_worker_fails_jobs_past_their_deadline(fake_swarm, tmp_path):
+    """Test that a job still running at its deadline is failed without a retry"""
+    for agent in fake_swarm.agents.values():
+        agent.llm = FakeLLM(latency=1.0)
+    queue = JobQueue(tmp_path / "queue.sqlite3")
+    worker = JobWorker(queue, fake_swarm, concurrency=1, poll_interval=0.05)
+    
+    with FakeAnchorToolchain():
+        # Warm up first so the deadline is not spent creating the workspace
+        fake_swarm.warm()
+        job_id = queue.enqueue("Create a token vesting contract", deadline=time.time() + 0.5)
+        asyncio.run(worker.run(drain=True))
+    
+    job = queue.get(job_id)
+    assert (job["status"], job["attempts"], job["error"]) == ("failed", 1, "deadline exceeded")
+
+class FailingLLM(FakeLLM):
+    async def agenerate(self, message_batches):
+        raise ValueError("auditor unavailable")
+
+def test_worker_retries_jobs_with_a_failed_stage(fake_swarm, tmp_path):
+    """Test that a job whose audit failed is retried and then failed, not recorded as done"""
+    fake_swarm.agents["auditor"].llm = FailingLLM()
+    queue = JobQueue(tmp_path / "queue.sqlite3", max_attempts=2, retry_delay=0.05)
+    job_id = queue.enqueue("Create a token vesting contract")
+    worker = JobWorker(queue, fake_swarm, concurrency=1, poll_interval=0.05)
+    
+    with FakeAnchorToolchain():
+        asyncio.run(worker.run(drain=True))
+    
+    job = queue.get(job_id)
+    assert (job["status"], job["attempts"], job["error"]) == ("failed", 2, "auditor unavailable")
+    assert (worker.completed, worker.failed) == (0, 2)
+
+def test_worker_builds_in_a_farm_of_its_own(tmp_path, monkeypatch):
+    """Test that a worker's own swarm does not build in the workspace shared by every process"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("SWARM_BUILD_WORKERS", "")
+    worker = JobWorker(JobQueue(tmp_path / "queue.sqlite3"), concurrency=2, poll_interval=0.05)
+    farm = worker.swarm.build_farm
+    closed = []
+    monkeypatch.setattr(farm, "close", lambda: closed.append(farm))
+    
+    with FakeAnchorToolchain():
+        asyncio.run(worker.run(drain=True))
+    
+    assert farm.workers == min(2, os.cpu_count() or 1)
+    assert closed == [farm]
@@ -0,0 +1,49 @@
+import pytest
+from smart_contract_swarm.metrics import (
+    PipelineMetrics, activate, record_retry, record_usage, stage_percentile, to_prometheus, to_spans, track
+)
+
+@pytest.fixture
+def run_metrics():
+    metrics = PipelineMetrics("run-1")
+    with activate(metrics):
+        with track("technical_specs", kind="agent"):
+            record_usage(prompt_tokens=100, completion_tokens=40)
+            record_retry()
+        with track("anchor build", kind="build"):
+            pass
+    return metrics.to_dict()
+
+def test_spans_record_usage_and_retries(run_metrics):
+    """Test that usage and retries land on the span that was active"""
+    spans = {span["name"]: span for span in run_metrics["spans"]}
+    assert spans["technical_specs"]["prompt_tokens"] == 100
+    assert spans["technical_specs"]["completion_tokens"] == 40
+    assert spans["technical_specs"]["retries"] == 1
+    assert spans["anchor build"]["prompt_tokens"] == 0
+    assert all(span["wall_time"] is not None for span in run_metrics["spans"])
+
+def test_track_outside_a_run_is_a_no_op():
+    """Test that instrumentation does nothing when no run is active"""
+    with track("technical_specs") as span:
+        record_usage(prompt_tokens=1)
+    assert span is None
+
+def test_prometheus_export(run_metrics):
+    """Test the Prometheus text exposition output"""
+    text = to_prometheus(run_metrics)
+    assert "# TYPE swarm_stage_wall_seconds gauge" in text
+    assert 'swarm_stage_prompt_tokens{run_id="run-1",stage="technical_specs",kind="agent"} 100' in text
+
+def test_span_export(run_metrics):
+    """Test the OpenTelemetry-style span output"""
+    spans = to_spans(run_metrics)
+    assert [span["name"] for span in spans] == ["technical_specs", "anchor build"]
+    assert spans[0]["attributes"]["swarm.prompt_tokens"] == 100
+    assert spans[0]["end_time_unix_nano"] >= spans[0]["start_time_unix_nano"]
+    assert spans[0]["status"]["code"] == "OK"
+
+def test_stage_percentile():
+    """Test the per-stage latency percentile across runs"""
+    runs = [{"spans": [{"name": "contract_code", "wall_time": float(seconds)}]} for seconds in range(1, 21)]
+    assert stage_percentile(runs, 0.95)["contract_code"] == 19.0
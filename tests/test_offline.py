@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+import asyncio
+from smart_contract_swarm.testing import FakeAnchorToolchain, FakeLLM, RecordingLLM, ReplayLLM
+
+def test_full_pipeline_offline(fake_swarm):
+    """Test the complete pipeline against the fake LLM and Anchor toolchain"""
+    with FakeAnchorToolchain():
+        result = fake_swarm.process_contract_request("Create a token vesting contract")
+    
+    assert "#[program]" in result["contract_code"]
+    assert result["test_cases"] is not None
+    spans = {span["name"]: span for span in result["metrics"]["spans"]}
+    assert spans["anchor build"]["status"] == "ok"
+    assert spans["anchor test"]["status"] == "ok"
+    assert (fake_swarm.contract_generator.program_dir / "target" / "deploy" / "program.so").exists()
+
+def test_fake_llm_latency_and_usage():
+    """Test that the fake LLM honours its latency and reports token usage"""
+    llm = FakeLLM(latency=0.05, tokens_per_second=1000)
+    agent_messages = [SimpleNamespace(content="You are a code generator", type="system"),
+                      SimpleNamespace(content="architecture", type="human")]
+    
+    loop = asyncio.new_event_loop()
+    started = loop.time()
+    result = loop.run_until_complete(llm.agenerate([agent_messages]))
+    elapsed = loop.time() - started
+    loop.close()
+    
+    assert elapsed >= 0.05
+    assert "#[program]" in result.generations[0][0].text
+    assert result.llm_output["token_usage"]["completion_tokens"] > 0
+
+def test_cassette_record_and_replay(fake_swarm, tmp_path):
+    """Test that a recorded session replays the same responses offline"""
+    cassette = tmp_path / "session.jsonl"
+    for agent in fake_swarm.agents.values():
+        agent.llm = RecordingLLM(FakeLLM(), cassette)
+    with FakeAnchorToolchain():
+        recorded = fake_swarm.process_contract_request("Create a token vesting contract")
+        
+        replay = ReplayLLM(cassette, speed=0)
+        for agent in fake_swarm.agents.values():
+            agent.llm = replay
+        replayed = fake_swarm.process_contract_request("Create a token vesting contract")
+    
+    for stage in ("technical_specs", "architecture", "contract_code", "security_audit", "test_cases"):
+        assert replayed[stage] == recorded[stage]
+
+class ActiveCountingLLM(FakeLLM):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.active = 0
+        self.max_active = 0
+    
+    async def agenerate(self, message_batches):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            return await super().agenerate(message_batches)
+        finally:
+            self.active -= 1
+
+def test_overlapping_batches_keep_their_limits(fake_swarm):
+    """Test that a batch finishing does not lift the LLM limit of another one still running"""
+    llm = ActiveCountingLLM(latency=0.02)
+    for agent in fake_swarm.agents.values():
+        agent.llm = llm
+    
+    async def run_batch(requirements):
+        return [spec async for spec in fake_swarm.aprocess_batch(requirements, max_concurrency=1)]
+    
+    async def main():
+        return await asyncio.gather(run_batch(["Contract A"]), run_batch([f"Contract B{i}" for i in range(6)]))
+    
+    with FakeAnchorToolchain():
+        short, long = asyncio.run(main())
+    
+    assert (len(short), len(long)) == (1, 6)
+    assert llm.max_active <= 2
+
+def test_identical_requests_hit_the_build_cache(fake_swarm):
+    """Test that sending the same request twice replays the first build"""
+    with FakeAnchorToolchain():
+        first = fake_swarm.process_contract_request("Create a token vesting contract")
+        second = fake_swarm.process_contract_request("Create a token vesting contract")
+    
+    first_spans = {span["name"]: span for span in first["metrics"]["spans"]}
+    second_spans = {span["name"]: span for span in second["metrics"]["spans"]}
+    assert "anchor build" in first_spans
+    assert "anchor build" not in second_spans
+    assert second_spans["build_and_test"].get("build_cache_hit")
+    assert second["validated"]
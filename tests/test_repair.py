@@ -0,0 +1,112 @@
+import pytest
+import asyncio
+from smart_contract_swarm.repair import apply_repair, failing_regions, repair_prompt
+from smart_contract_swarm.testing import FAKE_CONTRACT, FakeAnchorToolchain, FakeLLM
+from smart_contract_swarm.validation import extract_rust_source
+
+BROKEN_CONTRACT = FAKE_CONTRACT.replace("Ok(())", "compile_error!(\"boom\");\n        Ok(())")
+
+def check_result(*lines):
+    spans = [{"file_name": "programs/program/src/lib.rs", "line_start": line, "line_end": line,
+              "column_start": 1, "column_end": 1} for line in lines]
+    diagnostic = {"level": "error", "message": "boom", "rendered": "error: boom", "spans": spans}
+    return {"success": False, "precheck": [], "check": {"returncode": 101, "diagnostics": [diagnostic], "stderr": ""}}
+
+def test_prompt_contains_only_failing_regions():
+    """Test that the repair prompt sends the errors and nearby lines, not the whole file"""
+    source = "\n".join(f"line{number}" for number in range(1, 41)) + "\n"
+    result = check_result(10, 12, 30)
+    assert failing_regions(source, result) == [(7, 15), (27, 33)]
+    
+    prompt = repair_prompt(source, result)
+    assert "error: boom" in prompt
+    assert "```rust lines 7-15\nline7\n" in prompt
+    assert "line20\n" not in prompt
+
+def test_unlocated_problems_send_whole_file():
+    """Test that a missing #[program] module asks for the full source"""
+    result = {"precheck": ["missing #[program] module"], "check": None}
+    assert failing_regions("a\nb\nc\n", result) == [(1, 3)]
+
+def test_apply_repair_patches_line_ranges():
+    """Test that line-range blocks replace only their lines"""
+    source = "one\ntwo\nthree\nfour\n"
+    reply = "Fixed:\n```rust lines 2-3\nTWO\n```\n```rust lines 4-4\nFOUR\nFIVE\n```"
+    assert apply_repair(source, reply) == "one\nTWO\nFOUR\nFIVE\n"
+    assert apply_repair(source, "```rust lines 3-9\nx\n```") is None
+    assert apply_repair(source, "no code here") is None
+    assert apply_repair(source, FAKE_CONTRACT) == extract_rust_source(FAKE_CONTRACT)
+
+@pytest.mark.parametrize("fake_swarm", [{"max_repairs": 2}], indirect=True)
+def test_build_repairs_compile_error(fake_swarm):
+    """Test that a compile error is fixed with one generator call and no pipeline rerun"""
+    contract_spec = {"contract_code": BROKEN_CONTRACT}
+    llm = fake_swarm.agents["generator"].llm
+    with FakeAnchorToolchain():
+        fake_swarm.contract_generator.create_anchor_project("program")
+        assert asyncio.run(fake_swarm._build_contract(contract_spec))
+    
+    assert llm.calls == 1
+    assert contract_spec["repairs"] == 1
+    assert "compile_error!" not in contract_spec["contract_code"]
+
+@pytest.mark.parametrize("fake_swarm", [{"max_repairs": 2}], indirect=True)
+def test_repair_gives_up_after_max_repairs(fake_swarm):
+    """Test that the loop stops after max_repairs rounds"""
+    contract_spec = {"contract_code": BROKEN_CONTRACT}
+    llm = FakeLLM(responses={"code generator": BROKEN_CONTRACT})
+    fake_swarm.agents["generator"].llm = llm
+    with FakeAnchorToolchain():
+        fake_swarm.contract_generator.create_anchor_project("program")
+        assert not asyncio.run(fake_swarm._build_contract(contract_spec))
+    
+    assert llm.calls == 2
+    assert contract_spec["repairs"] == 2
+
+@pytest.mark.parametrize("fake_swarm", [{"max_repairs": 2}], indirect=True)
+def test_build_lock_is_free_during_repair(fake_swarm):
+    """Test that other builds are not held up while the generator writes a repair"""
+    swarm = fake_swarm
+    
+    class LockCheckingLLM(FakeLLM):
+        async def agenerate(self, message_batches):
+            self.lock_held = swarm._build_lock.locked()
+            return await super().agenerate(message_batches)
+    
+    llm = LockCheckingLLM()
+    swarm.agents["generator"].llm = llm
+    with FakeAnchorToolchain():
+        swarm.contract_generator.create_anchor_project("program")
+        assert asyncio.run(swarm._build_contract({"contract_code": BROKEN_CONTRACT}))
+    
+    assert llm.calls == 1
+    assert not llm.lock_held
+
+def test_repaired_code_is_reviewed_again(make_swarm):
+    """Test that the audit and tests are rerun on the code the build repaired"""
+    class RepairedLLM(FakeLLM):
+        def __init__(self):
+            super().__init__()
+            self.generated = 0
+            self.reviewed = []
+        
+        def _respond(self, messages):
+            system_prompt = messages[0].content.lower()
+            if "code generator" in system_prompt:
+                self.generated += 1
+                if self.generated == 1:
+                    return BROKEN_CONTRACT
+            if "security auditor" in system_prompt or "test generator" in system_prompt:
+                self.reviewed.append(messages[-1].content)
+            return super()._respond(messages)
+    
+    llm = RepairedLLM()
+    swarm = make_swarm(llm=llm, max_repairs=2)
+    with FakeAnchorToolchain():
+        result = swarm.process_contract_request("Create a token vesting contract")
+    
+    assert result["repairs"] == 1
+    assert "reviews_stale" not in result
+    assert len(llm.reviewed) == 4
+    assert all("compile_error!" in text for text in llm.reviewed[:2])
+    assert not any("compile_error!" in text for text in llm.reviewed[2:])
@@ -0,0 +1,79 @@
+import pytest
+import asyncio
+import time
+from smart_contract_swarm import SmartContractAgent
+from smart_contract_swarm import swarm as swarm_module
+from smart_contract_swarm.routing import ModelRoute, ModelRouter, PROBE_EVERY, default_routes
+from smart_contract_swarm.scheduler import LLMScheduler
+from smart_contract_swarm.testing import FakeAnchorToolchain, FakeLLM
+
+def test_default_routes_follow_tiers_and_environment(monkeypatch):
+    """Test that agents get fast or strong models and can be overridden per agent"""
+    monkeypatch.setenv("SWARM_FAST_MODEL", "fast")
+    monkeypatch.setenv("SWARM_STRONG_MODEL", "strong")
+    monkeypatch.setenv("SWARM_MODEL_AUDITOR", "auditor-model")
+    monkeypatch.setenv("SWARM_LATENCY_BUDGET_GENERATOR", "0")
+    routes = default_routes()
+    
+    assert (routes["analyzer"].model, routes["analyzer"].fallback) == ("fast", None)
+    assert (routes["generator"].model, routes["generator"].fallback) == ("strong", "fast")
+    assert routes["generator"].latency_budget is None
+    assert routes["auditor"].model == "auditor-model"
+    assert routes["tester"].model == "fast"
+
+def test_slow_models_are_routed_around():
+    """Test that a model whose recent latency is over budget gives way to its fallback"""
+    router = ModelRouter({"generator": ModelRoute("strong", fallback="fast", latency_budget=10.0)})
+    assert router.choose("generator") == ("strong", 10.0)
+    for _ in range(3):
+        router.record_call("generator", "strong", 30.0)
+    
+    choices = [router.choose("generator")[0] for _ in range(PROBE_EVERY)]
+    # The primary is still probed now and then
+    assert choices.count("fast") == PROBE_EVERY - 1
+    assert router.stats()["fast"]["fallbacks"] == PROBE_EVERY - 1
+    assert router.stats()["strong"]["latency"]["generator"]["p50"] == 30.0
+
+async def _collect(chunks):
+    return "".join([chunk async for chunk in chunks])
+
+CALL_PATHS = {
+    "execute": lambda agent, prompt: agent.execute(prompt),
+    "aexecute": lambda agent, prompt: asyncio.run(agent.aexecute(prompt)),
+    "execute_stream": lambda agent, prompt: "".join(agent.execute_stream(prompt)),
+    "aexecute_stream": lambda agent, prompt: asyncio.run(_collect(agent.aexecute_stream(prompt)))
+}
+
+# With one slot the fallback can only start once the abandoned call gave its slot back
+@pytest.mark.parametrize("max_concurrency", [16, 1])
+@pytest.mark.parametrize("path", CALL_PATHS)
+def test_calls_over_budget_fall_back(monkeypatch, path, max_concurrency):
+    """Test that a call running past its budget is answered by the fallback model on every call path"""
+    models = {"strong": FakeLLM(latency=2.0, model_name="strong"), "fast": FakeLLM(model_name="fast")}
+    monkeypatch.setattr(swarm_module, "get_llm", lambda model=None: models[model])
+    router = ModelRouter({"generator": ModelRoute("strong", fallback="fast", latency_budget=0.1)})
+    agent = SmartContractAgent("Code Generator", "You are a Solana smart contract code generator.",
+                               use_cache=False, router=router, route_key="generator",
+                               scheduler=LLMScheduler(max_concurrency=max_concurrency))
+    
+    started = time.perf_counter()
+    code = CALL_PATHS[path](agent, "architecture")
+    
+    assert time.perf_counter() - started < 1.0
+    assert "#[program]" in code
+    stats = router.stats()
+    # The abandoned call counts against the budget, not as an error
+    assert (stats["strong"]["budget_exceeded"], stats["strong"]["errors"], stats["strong"]["calls"]) == (1, 0, 0)
+    assert (stats["fast"]["calls"], stats["fast"]["fallbacks"]) == (1, 1)
+
+def test_swarm_records_model_quality(fake_swarm):
+    """Test that a finished run credits its outcome to the models it used"""
+    with FakeAnchorToolchain():
+        result = fake_swarm.process_contract_request("Create a token vesting contract")
+    
+    stats = fake_swarm.router.stats()["fake-gpt-4"]
+    assert stats["calls"] == 5
+    assert (stats["runs"], stats["validated_rate"], stats["repairs_per_run"]) == (1, 1.0, 0.0)
+    assert set(stats["latency"]) == {"analyzer", "architect", "generator", "auditor", "tester"}
+    spans = {span["name"]: span for span in result["metrics"]["spans"]}
+    assert spans["contract_code"]["model"] == "fake-gpt-4"
@@ -0,0 +1,80 @@
+import pytest
+import asyncio
+import socket
+from solders.keypair import Keypair
+from smart_contract_swarm.rpc import AsyncRpcClient
+from smart_contract_swarm.testing import FakeAnchorToolchain
+from smart_contract_swarm.validators import LocalValidator, rpc_request
+from smart_contract_swarm.wallet import WalletManager
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def validator(tmp_path):
+    with FakeAnchorToolchain():
+        validator = LocalValidator(free_port(), tmp_path / "ledger")
+        validator.start()
+        yield validator
+        validator.stop()
+
+def test_calls_are_batched(validator):
+    """Test that concurrent calls share one HTTP request and errors stay per call"""
+    rpc = AsyncRpcClient(validator.url)
+    
+    async def run():
+        results = await asyncio.gather(
+            rpc.call("getHealth"),
+            rpc.call("getBalance", ["11111111111111111111111111111111"]),
+            rpc.call("noSuchMethod"),
+            return_exceptions=True
+        )
+        await rpc.aclose()
+        return results
+    
+    health, balance, missing = asyncio.run(run())
+    assert health == "ok"
+    assert balance["value"] == 0
+    assert isinstance(missing, RuntimeError)
+    assert rpc.stats() == {"calls": 3, "http_requests": 1}
+
+def test_fund_hundreds_of_wallets(validator):
+    """Test that funding and verifying 300 wallets takes a handful of round trips"""
+    rpc = AsyncRpcClient(validator.url, max_batch_size=100)
+    manager = WalletManager(rpc=rpc)
+    public_keys = [str(Keypair().pubkey()) for _ in range(300)]
+    
+    assert manager.fund_wallets(public_keys, lamports=10 ** 9, timeout=10) == []
+    assert asyncio.run(rpc.get_balances(public_keys[:5] + ["11111111111111111111111111111111"])) == [10 ** 9] * 5 + [0]
+    # Three airdrop batches, one batch of getMultipleAccounts polls and the check above
+    assert rpc.stats()["http_requests"] <= 6
+    assert rpc_request(validator.url, "fakeStats")["http_requests"] <= 10
+
+def test_client_opened_on_an_earlier_loop_is_closed(validator):
+    """Test that moving to a new event loop closes the HTTP client of the previous one"""
+    rpc = AsyncRpcClient(validator.url)
+    assert asyncio.run(rpc.call("getHealth")) == "ok"
+    first = rpc._http
+    
+    async def second_loop():
+        health = await rpc.call("getHealth")
+        # Let the close of the abandoned client run
+        await asyncio.sleep(0)
+        await rpc.aclose()
+        return health
+    
+    assert asyncio.run(second_loop()) == "ok"
+    assert first.is_closed
+
+def test_devnet_funding_uses_the_async_client(validator):
+    """Test that a single airdrop goes through the batching client and closes its connections"""
+    rpc = AsyncRpcClient(validator.url)
+    manager = WalletManager(rpc=rpc)
+    public_key = str(Keypair().pubkey())
+    
+    assert manager.fund_wallet_devnet(public_key)
+    assert rpc.stats()["calls"] == 1
+    assert rpc._http is None
+    assert rpc_request(validator.url, "getBalance", [public_key])["value"] == 2000000000
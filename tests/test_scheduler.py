@@ -0,0 +1,94 @@
+import pytest
+import asyncio
+import threading
+import time
+from smart_contract_swarm.scheduler import BudgetExceeded, LLMScheduler, TokenBucket
+
+class RateLimitError(Exception):
+    """Stands in for openai.RateLimitError, which is matched by name"""
+    status_code = 429
+
+def test_token_bucket_reports_wait_time():
+    """Test that reservations beyond the budget return the time to wait"""
+    bucket = TokenBucket(rate_per_minute=60, capacity=2)
+    assert bucket.reserve(1) == 0.0
+    assert bucket.reserve(1) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+
+def test_retries_rate_limits_and_reduces_concurrency():
+    """Test that 429s are retried and halve the concurrency limit"""
+    scheduler = LLMScheduler(base_delay=0.001, max_concurrency=8)
+    attempts = []
+    
+    async def call():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RateLimitError("rate limited")
+        return "ok"
+    
+    assert asyncio.run(scheduler.run(call)) == "ok"
+    assert len(attempts) == 3
+    assert scheduler.throttled == 2
+    assert scheduler.limit == 2
+
+def test_non_retryable_errors_are_raised():
+    """Test that errors which are not transient fail immediately"""
+    scheduler = LLMScheduler(base_delay=0.001)
+    calls = []
+    
+    def call():
+        calls.append(1)
+        raise ValueError("bad request")
+    
+    with pytest.raises(ValueError):
+        scheduler.run_sync(call)
+    assert len(calls) == 1
+
+def test_gives_up_after_max_retries():
+    """Test that retries stop after max_retries"""
+    scheduler = LLMScheduler(base_delay=0.001, max_retries=2)
+    
+    def call():
+        raise RateLimitError("rate limited")
+    
+    with pytest.raises(RateLimitError):
+        scheduler.run_sync(call)
+    assert scheduler.retries == 2
+
+def test_concurrency_limit_is_enforced():
+    """Test that no more than the current limit of calls run at once"""
+    scheduler = LLMScheduler(max_concurrency=2)
+    active = []
+    peak = []
+    
+    async def call():
+        active.append(1)
+        peak.append(len(active))
+        await asyncio.sleep(0.01)
+        active.pop()
+        return "ok"
+    
+    async def run_all():
+        return await asyncio.gather(*(scheduler.run(call) for _ in range(6)))
+    
+    assert asyncio.run(run_all()) == ["ok"] * 6
+    assert max(peak) == 2
+
+def test_timeout_gives_back_the_slot():
+    """Test that a blocking stream over its timeout frees its slot and is closed once its read returns"""
+    scheduler = LLMScheduler(max_concurrency=1)
+    closed = threading.Event()
+    
+    def slow_stream():
+        try:
+            time.sleep(0.5)
+            yield "late"
+        finally:
+            closed.set()
+    
+    with pytest.raises(BudgetExceeded):
+        list(scheduler.stream(slow_stream, timeout=0.05))
+    
+    assert scheduler.stats()["active"] == 0
+    assert scheduler.run_sync(lambda: "next", timeout=1.0) == "next"
+    assert closed.wait(2.0)
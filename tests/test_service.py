@@ -0,0 +1,110 @@
+import asyncio
+import json
+import httpx
+from smart_contract_swarm.service import SwarmService
+from smart_contract_swarm.testing import FakeAnchorToolchain
+
+def serve(fake_swarm, tmp_path, scenario):
+    """Run scenario(client, service) against a service on a Unix socket"""
+    async def main():
+        service = await SwarmService(fake_swarm, path=tmp_path / "swarm.sock").start()
+        transport = httpx.AsyncHTTPTransport(uds=str(tmp_path / "swarm.sock"))
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://swarm", timeout=30) as client:
+                return await scenario(client, service)
+        finally:
+            await service.close()
+    
+    with FakeAnchorToolchain():
+        return asyncio.run(main())
+
+def test_service_warms_up_and_returns_results(fake_swarm, tmp_path):
+    """Test that the workspace is ready before the first request and results come back"""
+    async def scenario(client, service):
+        health = (await client.get("/health")).json()
+        assert health == {"status": "ok", "warm_problems": []}
+        assert (fake_swarm.contract_generator.program_dir / "Anchor.toml").exists()
+        
+        response = await client.post("/requests", json={"requirements": "Create a token vesting contract",
+                                                        "run_id": "vesting"})
+        status = (await client.get("/requests/vesting")).json()
+        stats = (await client.get("/stats")).json()
+        return response, status, stats
+    
+    response, status, stats = serve(fake_swarm, tmp_path, scenario)
+    
+    assert response.status_code == 200
+    assert response.json()["status"] == "done"
+    assert "#[program]" in response.json()["contract_spec"]["contract_code"]
+    assert status["contract_spec"]["run_id"] == "vesting"
+    assert stats["requests"] == {"done": 1}
+    assert stats["models"]["fake-gpt-4"]["runs"] == 1
+
+def test_service_streams_progress(fake_swarm, tmp_path):
+    """Test that progress events are streamed as JSON lines and can be replayed"""
+    async def scenario(client, service):
+        events = []
+        async with client.stream("POST", "/requests", json={"requirements": "Create a token vesting contract",
+                                                            "run_id": "streamed", "stream": True}) as response:
+            async for line in response.aiter_lines():
+                if line:
+                    events.append(json.loads(line))
+        replay = (await client.get("/requests/streamed/events")).text.splitlines()
+        return events, replay
+    
+    events, replay = serve(fake_swarm, tmp_path, scenario)
+    
+    kinds = [event["event"] for event in events]
+    assert kinds[-1] == "completed"
+    assert {"stage_started", "chunk", "stage_finished"} <= set(kinds)
+    assert {event["stage"] for event in events if event["event"] == "stage_finished"} >= {"contract_code", "build"}
+    assert events[-1]["contract_spec"]["run_id"] == "streamed"
+    assert len(replay) == len(events)
+
+def test_service_background_submissions_and_errors(fake_swarm, tmp_path):
+    """Test fire-and-forget submissions, polling and error responses"""
+    async def scenario(client, service):
+        accepted = await client.post("/requests", json={"requirements": "Create a token vesting contract",
+                                                        "wait": False})
+        run_id = accepted.json()["run_id"]
+        await service.runs[run_id]["task"]
+        return (
+            accepted,
+            (await client.get(f"/requests/{run_id}")).json(),
+            await client.post("/requests", json={}),
+            await client.get("/requests/missing"),
+            await client.delete("/requests")
+        )
+    
+    accepted, status, missing_requirements, missing_run, wrong_method = serve(fake_swarm, tmp_path, scenario)
+    
+    assert accepted.status_code == 202
+    assert status["status"] == "done"
+    assert missing_requirements.status_code == 400
+    assert missing_run.status_code == 404
+    assert wrong_method.status_code == 405
+
+def test_service_rejects_unsafe_run_ids_and_oversized_requests(fake_swarm, tmp_path):
+    """Test that run ids are limited to safe characters and large bodies and headers are refused"""
+    async def raw(head):
+        reader, writer = await asyncio.open_unix_connection(str(tmp_path / "swarm.sock"))
+        writer.write(head.encode("latin-1"))
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        writer.close()
+        return status
+    
+    async def scenario(client, service):
+        run_ids = [(await client.post("/requests", json={"requirements": "Create a token vesting contract",
+                                                          "run_id": run_id})).status_code
+                   for run_id in ("../escape", "a/b", "x" * 65, "", 42)]
+        too_long = await raw("POST /requests HTTP/1.1\r\nContent-Length: 100000000\r\n\r\n")
+        too_many_headers = await raw("GET /health HTTP/1.1\r\n" + "X-Padding: " + "a" * 20000 + "\r\n\r\n")
+        return run_ids, too_long, too_many_headers, dict(service.runs)
+    
+    run_ids, too_long, too_many_headers, runs = serve(fake_swarm, tmp_path, scenario)
+    
+    assert run_ids == [400, 400, 400, 400, 400]
+    assert too_long == 413
+    assert too_many_headers == 431
+    assert runs == {}
@@ -0,0 +1,64 @@
+import pytest
+from smart_contract_swarm.similarity import SimilarityIndex, numbers
+from smart_contract_swarm.testing import FakeAnchorToolchain, FakeLLM
+
+VESTING = """Create a token vesting contract for our team. Tokens are locked for a 12 month cliff and then
+released monthly over 36 months. The admin can add beneficiaries and revoke unvested tokens.
+Beneficiaries can claim whatever has vested so far."""
+
+class PromptRecordingLLM(FakeLLM):
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    def _respond(self, messages):
+        self.prompts.append(messages[-1].content)
+        return super()._respond(messages)
+
+@pytest.fixture
+def similar_swarm(make_swarm, tmp_path):
+    llm = PromptRecordingLLM()
+    swarm = make_swarm(llm=llm, similarity=SimilarityIndex(tmp_path / "similarity.sqlite3"))
+    return swarm, llm
+
+def test_nearest_finds_variants_only(tmp_path):
+    """Test that a variant of an indexed request is found and an unrelated one is not"""
+    index = SimilarityIndex(tmp_path / "similarity.sqlite3")
+    entry_id = index.add(VESTING, "specs", "architecture")
+    index.add("Build an NFT marketplace where creators list art and buyers pay royalties in SOL.", "a", "b")
+    
+    match = index.nearest(VESTING.replace("12 month cliff", "6 month cliff"))
+    assert match["id"] == entry_id
+    assert 0.7 < match["similarity"] < 1.0
+    assert match["architecture"] == "architecture"
+    assert index.nearest("Write a DAO governance program with proposals and quorum voting", 0.3) is None
+    assert numbers(VESTING) == ["12", "36"]
+
+def test_identical_requests_reuse_outputs(similar_swarm):
+    """Test that analysis and architecture are reused for a repeated request"""
+    swarm, llm = similar_swarm
+    with FakeAnchorToolchain():
+        first = swarm.process_contract_request(VESTING)
+        calls = llm.calls
+        second = swarm.process_contract_request(VESTING)
+    
+    assert len(swarm.similarity) == 1
+    assert second["similar"]["reused"]
+    assert second["technical_specs"] == first["technical_specs"]
+    assert second["architecture"] == first["architecture"]
+    # Only the generator, auditor and tester ran the second time
+    assert llm.calls - calls == 3
+
+def test_variants_start_from_the_closest_request(similar_swarm):
+    """Test that a request differing in its numbers gets the earlier output as a hint"""
+    swarm, llm = similar_swarm
+    with FakeAnchorToolchain():
+        swarm.process_contract_request(VESTING)
+        llm.prompts.clear()
+        variant = swarm.process_contract_request(VESTING.replace("12 month cliff", "6 month cliff"))
+    
+    assert variant["similar"]["similarity"] > 0.7
+    assert not variant["similar"]["reused"]
+    hinted = [prompt for prompt in llm.prompts if "An earlier request with" in prompt]
+    assert len(hinted) == 2
+    assert len(swarm.similarity) == 2
@@ -1,9 +1,13 @@
 import pytest
 from pathlib import Path
+from types import SimpleNamespace
+import asyncio
 import json
 import os
 import subprocess
-from smart_contract_swarm import ContractSwarm, SmartContractAgent, ContractGenerator
+import sys
+from smart_contract_swarm import ContractSwarm, SmartContractAgent, ContractGenerator, CheckpointStore
+from smart_contract_swarm.artifacts import ArtifactStore
 
 @pytest.fixture
 def swarm():
@@ -19,6 +23,44 @@ def sample_requirements():
     - Admin controls for vesting schedule modification
     """
 
+class StubLLM:
+    """Async LLM double that echoes its input and tracks overlapping calls"""
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.inputs = []
+    
+    async def agenerate(self, message_batches):
+        self.inputs.append(message_batches[0][1].content)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        text = f"{message_batches[0][1].content} ok"
+        usage = {"prompt_tokens": 10, "completion_tokens": 5}
+        return SimpleNamespace(generations=[[SimpleNamespace(text=text)]], llm_output={"token_usage": usage})
+    
+    async def astream(self, messages):
+        self.inputs.append(messages[1].content)
+        for word in f"{messages[1].content} ok".split(" "):
+            await asyncio.sleep(0)
+            yield SimpleNamespace(content=word + " ")
+
+@pytest.fixture
+def offline_swarm(swarm, monkeypatch, tmp_path):
+    swarm.checkpoints = CheckpointStore(tmp_path / "runs")
+    swarm.artifacts = ArtifactStore(tmp_path / "artifacts")
+    stub = StubLLM()
+    for agent in swarm.agents.values():
+        agent.llm = stub
+        agent.cache = None
+    monkeypatch.setattr(swarm.contract_generator, "create_anchor_project", lambda name: None)
+    monkeypatch.setattr(swarm.contract_generator, "generate_contract_code", lambda specs: None)
+    monkeypatch.setattr(swarm, "run_build_and_test",
+                        lambda: {"success": True, "precheck": [], "check": None, "build": None, "test": None})
+    return swarm
+
 def is_anchor_installed():
     try:
         subprocess.run(["anchor", "--version"], check=True, capture_output=True)
@@ -115,6 +157,91 @@ def test_test_generator(swarm):
     assert "test" in test_cases.lower()
     assert "#[test]" in test_cases
 
+def test_import_is_lazy():
+    """Test that importing the package does not load LLM or Solana clients"""
+    check = (
+        "import sys, smart_contract_swarm; "
+        "smart_contract_swarm.ContractSwarm(); "
+        "print(','.join(m for m in ('langchain', 'langchain_community', 'openai', 'solana', 'anchorpy') "
+        "if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True, check=True,
+                            cwd=Path(__file__).parent.parent)
+    assert result.stdout.strip() == ""
+
+def test_independent_stages_run_concurrently(offline_swarm, sample_requirements):
+    """Test that the audit and test stages overlap"""
+    result = asyncio.run(offline_swarm.aprocess_contract_request(sample_requirements))
+    
+    assert result["contract_code"] is not None
+    assert result["security_audit"] == f"{result['contract_code']} ok"
+    assert result["test_cases"] == f"{result['contract_code']} ok"
+    assert offline_swarm.agents["auditor"].llm.max_active == 2
+
+def test_process_batch(offline_swarm):
+    """Test batch processing keeps input order and respects the concurrency cap"""
+    requirements = [f"Contract {i}" for i in range(6)]
+    results = offline_swarm.process_batch(requirements, max_concurrency=3)
+    
+    assert [result["requirements"] for result in results] == requirements
+    assert all(result["test_cases"] is not None for result in results)
+    assert offline_swarm.agents["analyzer"].llm.max_active == 3
+
+def test_pipeline_metrics(offline_swarm, sample_requirements):
+    """Test that per-stage timings and token usage are attached to the spec"""
+    result = offline_swarm.process_contract_request(sample_requirements)
+    
+    spans = {span["name"]: span for span in result["metrics"]["spans"]}
+    for stage in ("technical_specs", "architecture", "contract_code", "security_audit", "test_cases"):
+        assert spans[stage]["kind"] == "agent"
+        assert spans[stage]["wall_time"] >= 0.05
+        assert spans[stage]["prompt_tokens"] == 10
+        assert spans[stage]["completion_tokens"] == 5
+    assert "create_anchor_project" in spans
+    assert "build_and_test" in spans
+
+def test_stages_are_checkpointed(offline_swarm, sample_requirements):
+    """Test that every completed stage is written to the run's checkpoint"""
+    result = offline_swarm.process_contract_request(sample_requirements, run_id="run-1")
+    
+    assert result["run_id"] == "run-1"
+    assert offline_swarm.checkpoints.load("run-1") == result
+
+def test_resume_skips_completed_stages(offline_swarm, sample_requirements):
+    """Test that resuming a run only executes the missing stages"""
+    offline_swarm.checkpoints.save("run-2", {
+        "run_id": "run-2",
+        "requirements": sample_requirements,
+        "technical_specs": "specs",
+        "architecture": "architecture",
+        "contract_code": None,
+        "security_audit": None,
+        "test_cases": None
+    })
+    
+    result = offline_swarm.resume("run-2")
+    
+    stub = offline_swarm.agents["generator"].llm
+    assert sample_requirements not in stub.inputs
+    assert stub.inputs[0] == "architecture"
+    assert result["contract_code"] == "architecture ok"
+    assert result["test_cases"] == "architecture ok ok"
+
+def test_stream_contract_request(offline_swarm, sample_requirements):
+    """Test that streaming yields stage events and chunks before the final spec"""
+    events = list(offline_swarm.stream_contract_request(sample_requirements))
+    
+    analysis = [e for e in events if e.get("stage") == "technical_specs"]
+    assert analysis[0]["event"] == "stage_started"
+    assert any(e["event"] == "chunk" for e in analysis)
+    assert analysis[-1]["event"] == "stage_finished"
+    assert "".join(e["text"] for e in analysis if e["event"] == "chunk") == analysis[-1]["output"]
+    
+    assert events[-1]["event"] == "completed"
+    spec = events[-1]["contract_spec"]
+    assert spec["technical_specs"] == analysis[-1]["output"]
+    assert {"stage": "build", "event": "stage_finished", "output": True} in events
+
 @pytest.mark.skipif(not is_anchor_installed(), reason="Anchor framework not installed")
 def test_contract_generator():
     """Test contract generator functionality"""
@@ -0,0 +1,61 @@
+import pytest
+import time
+from smart_contract_swarm.testing import FAKE_CONTRACT, FakeAnchorToolchain
+from smart_contract_swarm.validation import check_brackets, check_source, extract_rust_source
+
+@pytest.fixture
+def swarm(fake_swarm):
+    return fake_swarm
+
+def test_extract_rust_source_drops_prose():
+    """Test that only the fenced program is kept from a markdown reply"""
+    source = extract_rust_source(FAKE_CONTRACT)
+    assert source.startswith("use anchor_lang::prelude::*;")
+    assert "Here is the Anchor program" not in source
+    assert "```" not in source
+    assert extract_rust_source("pub fn main() {}") == "pub fn main() {}\n"
+
+def test_check_brackets_ignores_strings_comments_and_lifetimes():
+    """Test that brackets inside literals and comments are not counted"""
+    source = (
+        "pub struct Init<'info> { pub a: Account<'info, A> }\n"
+        "// stray {\n"
+        "/* nested /* } */ comment */\n"
+        "fn f() -> char { let s = \"}\"; let r = r#\"{\"#; '{' }\n"
+    )
+    assert check_brackets(source) == []
+    assert check_brackets("fn f() {\n  (]\n}") == ["line 2: unexpected ']'", "line 2: '(' is never closed"]
+
+def test_check_source_requires_program_and_id():
+    """Test that a missing #[program] module and declare_id! are reported"""
+    assert check_source(extract_rust_source(FAKE_CONTRACT)) == []
+    assert check_source("pub mod program {}") == ["missing #[program] module", "missing declare_id! program id"]
+
+def test_broken_code_is_rejected_before_compiling(swarm):
+    """Test that unbalanced output never reaches cargo or anchor"""
+    with FakeAnchorToolchain(build_seconds=5):
+        swarm.contract_generator.create_anchor_project("program")
+        swarm.contract_generator.generate_contract_code({"contract_code": FAKE_CONTRACT.replace("Ok(())\n    }", "Ok(())")})
+        started = time.perf_counter()
+        result = swarm.run_build_and_test()
+    
+    assert time.perf_counter() - started < 1
+    assert not result["success"]
+    assert result["precheck"] == ["line 6: '{' is never closed"]
+    assert result["check"] is None and result["build"] is None
+
+def test_cargo_check_errors_skip_anchor_build(swarm):
+    """Test that type errors are reported from cargo check without an anchor build"""
+    code = FAKE_CONTRACT.replace("Ok(())", "compile_error!(\"boom\");\n        Ok(())")
+    with FakeAnchorToolchain(build_seconds=5):
+        swarm.contract_generator.create_anchor_project("program")
+        swarm.contract_generator.generate_contract_code({"contract_code": code})
+        started = time.perf_counter()
+        result = swarm.run_build_and_test()
+    
+    assert time.perf_counter() - started < 5
+    assert not result["success"]
+    assert result["build"] is None
+    diagnostic = result["check"]["diagnostics"][0]
+    assert diagnostic["level"] == "error"
+    assert diagnostic["spans"][0]["line_start"] == 14
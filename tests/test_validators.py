@@ -0,0 +1,108 @@
+import pytest
+import re
+import socket
+from smart_contract_swarm import BuildFarm, ValidatorPool
+from smart_contract_swarm import AnchorTemplate, BuildCache
+from smart_contract_swarm.build_farm import run_build, run_pooled_test
+from smart_contract_swarm.testing import FAKE_CONTRACT, FakeAnchorToolchain
+from smart_contract_swarm.validation import extract_rust_source
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def workspace(tmp_path):
+    workspace = tmp_path / "program"
+    (workspace / "target" / "deploy").mkdir(parents=True)
+    (workspace / "target" / "deploy" / "program.so").write_bytes(b"\x7fELF")
+    return workspace
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ValidatorPool(size=1, max_runs=3, base_port=free_port(), root=tmp_path / "validators")
+    yield pool
+    pool.close()
+
+def test_validator_is_reused_and_recycled(pool, workspace):
+    """Test that test runs share a warm validator until it reaches max_runs"""
+    with FakeAnchorToolchain():
+        outputs = [run_pooled_test(workspace, None, pool)["stdout"] for _ in range(4)]
+    
+    assert [int(re.search(r"deployment (\d+)", output).group(1)) for output in outputs] == [1, 2, 3, 1]
+    assert pool.stats() == {"size": 1, "running": 1, "starts": 2, "recycled": 1}
+
+def test_failure_on_reused_validator_is_retried_fresh(pool, workspace):
+    """Test that a failure after other runs is confirmed on a fresh validator"""
+    with FakeAnchorToolchain():
+        assert run_pooled_test(workspace, None, pool)["returncode"] == 0
+        (workspace / "target" / "deploy" / "program.so").unlink()
+        result = run_pooled_test(workspace, None, pool)
+    
+    assert result["returncode"] != 0
+    assert pool.stats()["starts"] == 2
+    assert pool.stats()["recycled"] == 2
+
+def test_each_run_deploys_a_new_program_with_a_new_wallet(pool, tmp_path):
+    """Test that pooled runs do not upgrade each other's program and leave the workspace as it was"""
+    template = AnchorTemplate(tmp_path / "template")
+    workspace = tmp_path / "program"
+    source_path = workspace / "programs" / "program" / "src" / "lib.rs"
+    outputs = []
+    with FakeAnchorToolchain():
+        template.clone(workspace)
+        for source in (FAKE_CONTRACT, FAKE_CONTRACT.replace("cliff_months: u8)", "cliff_months: u8, )")):
+            source = extract_rust_source(source)
+            source_path.write_text(source)
+            config = (workspace / "Anchor.toml").read_text()
+            result = run_build(workspace, template.build_env(), BuildCache(tmp_path / "builds"), pool)
+            
+            assert result["success"], result["test"]["stderr"]
+            assert source_path.read_text() == source
+            assert (workspace / "Anchor.toml").read_text() == config
+            outputs.append(result["test"]["stdout"])
+    
+    deployed = [re.search(r"Deployed (\S+) to \S+ by (\S+)", output).groups() for output in outputs]
+    assert deployed[0][0] != deployed[1][0]
+    assert deployed[0][1] != deployed[1][1]
+    assert re.search(r'declare_id!\("([^"]*)"\)', source).group(1) not in {program_id for program_id, _ in deployed}
+
+def test_pipeline_tests_against_pool(pool, make_swarm):
+    """Test that a swarm with a validator pool skips the per-run validator"""
+    swarm = make_swarm(validators=pool)
+    
+    with FakeAnchorToolchain(validator_startup_seconds=1):
+        result = swarm.process_contract_request("Create a token vesting contract")
+    
+    spans = {span["name"]: span for span in result["metrics"]["spans"]}
+    assert spans["anchor test"]["status"] == "ok"
+    assert spans["anchor test"]["validator"] == pool.validators[0].url
+    assert pool.stats()["starts"] == 1
+
+def test_swarm_closes_the_pool_it_created(pool, make_swarm, monkeypatch):
+    """Test that close() stops a pool the swarm created from the environment, but not one passed in"""
+    monkeypatch.setenv("SWARM_VALIDATORS", "1")
+    with FakeAnchorToolchain():
+        with make_swarm() as swarm:
+            validator = swarm.validators.acquire()
+            swarm.validators.release(validator)
+            assert validator.running
+    assert not validator.running
+    assert not swarm.validators.root.exists()
+    
+    closed = []
+    monkeypatch.setattr(pool, "close", lambda: closed.append(pool))
+    make_swarm(validators=pool).close()
+    assert closed == []
+
+def test_empty_settings_use_defaults(make_swarm, monkeypatch, tmp_path):
+    """Test that the blank SWARM_VALIDATORS and SWARM_BUILD_WORKERS from .env.template mean unset"""
+    for name in ("SWARM_VALIDATORS", "SWARM_BUILD_WORKERS", "SWARM_VALIDATOR_MAX_RUNS"):
+        monkeypatch.setenv(name, "")
+    swarm = make_swarm()
+    
+    assert swarm.validators is None and swarm.build_farm is None
+    assert BuildFarm(root=tmp_path / "farm").validators == 0
+    pool = ValidatorPool(root=tmp_path / "validators")
+    assert (pool.size, pool.max_runs) == (1, 20)
@@ -0,0 +1,31 @@
+import pytest
+from smart_contract_swarm.keystore import Keystore
+from smart_contract_swarm.wallet import WalletManager
+import smart_contract_swarm.wallet as wallet_module
+
+@pytest.fixture
+def manager(tmp_path):
+    return WalletManager(keystore=Keystore(tmp_path / "keystore.sqlite3"))
+
+def test_generate_wallets_stores_all_keys(manager, tmp_path):
+    """Test that bulk-generated wallets can be looked up by public key"""
+    public_keys = manager.generate_wallets(25)
+    
+    assert len(set(public_keys)) == 25
+    assert len(manager.keystore) == 25
+    keypair = manager.get_keypair(public_keys[7])
+    assert str(keypair.pubkey()) == public_keys[7]
+    assert manager.get_keypair("11111111111111111111111111111111") is None
+    
+    reopened = Keystore(tmp_path / "keystore.sqlite3")
+    assert public_keys[0] in reopened
+    assert sorted(reopened.public_keys()) == sorted(public_keys)
+
+def test_generate_wallets_in_process_pool(manager, monkeypatch):
+    """Test that large requests are split across worker processes"""
+    monkeypatch.setattr(wallet_module, "KEYPAIR_CHUNK_SIZE", 10)
+    public_keys = manager.generate_wallets(35, workers=2)
+    
+    assert len(set(public_keys)) == 35
+    assert len(manager.keystore) == 35
+    assert str(manager.get_keypair(public_keys[-1]).pubkey()) == public_keys[-1]
@@ -0,0 +1,95 @@
+import pytest
+import asyncio
+from smart_contract_swarm.testing import FakeAnchorToolchain
+from smart_contract_swarm.workflow import Stage, Workflow
+
+def recorder(log, name, delay=0.0, result=None, error=None):
+    async def run(contract_spec, on_event):
+        log.append(f"start {name}")
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        log.append(f"end {name}")
+        return result
+    return run
+
+def test_ready_stages_run_concurrently():
+    """Test that stages start as soon as all of their inputs are done"""
+    log = []
+    workflow = Workflow([
+        Stage("a", recorder(log, "a", result=1)),
+        Stage("b", recorder(log, "b", 0.02, result=2), inputs=["a"]),
+        Stage("c", recorder(log, "c", 0.01, result=3), inputs=["a"]),
+        Stage("d", recorder(log, "d", result=4), inputs=["b", "c"])
+    ])
+    results = asyncio.run(workflow.run({}))
+    
+    assert results == {"a": 1, "b": 2, "c": 3, "d": 4}
+    assert log == ["start a", "end a", "start b", "start c", "end c", "end b", "start d", "end d"]
+
+def test_timeout_cancels_running_stages():
+    """Test that a stage past its timeout fails the run and cancels the others"""
+    log = []
+    workflow = Workflow([
+        Stage("slow", recorder(log, "slow", 5), timeout=0.05),
+        Stage("other", recorder(log, "other", 5))
+    ])
+    with pytest.raises(RuntimeError, match="'slow' timed out"):
+        asyncio.run(workflow.run({}))
+    assert "end other" not in log
+
+def test_skip_conditions_and_optional_failures():
+    """Test that skipped stages satisfy dependents and failed optional ones block them"""
+    log = []
+    workflow = Workflow([
+        Stage("skipped", recorder(log, "skipped"), skip_if=lambda contract_spec: contract_spec["skip"]),
+        Stage("after_skip", recorder(log, "after_skip", result="ran"), inputs=["skipped"]),
+        Stage("flaky", recorder(log, "flaky", error=ValueError("boom")), optional=True),
+        Stage("after_flaky", recorder(log, "after_flaky"), inputs=["flaky"])
+    ])
+    results = asyncio.run(workflow.run({"skip": True}))
+    
+    assert results == {"after_skip": "ran"}
+    assert "start skipped" not in log
+    assert "start after_flaky" not in log
+
+def test_graph_validation():
+    """Test that unknown inputs, duplicate names and removing depended-on stages are rejected"""
+    workflow = Workflow([Stage("a", recorder([], "a")), Stage("b", recorder([], "b"), inputs=["a"])])
+    with pytest.raises(RuntimeError):
+        workflow.add(Stage("c", recorder([], "c"), inputs=["missing"]))
+    with pytest.raises(RuntimeError):
+        workflow.add(Stage("a", recorder([], "a")))
+    with pytest.raises(RuntimeError):
+        workflow.remove("a")
+    workflow.remove("b")
+    assert "b" not in workflow
+
+def test_swarm_workflow_can_be_extended(fake_swarm):
+    """Test adding and removing stages on the default pipeline"""
+    swarm = fake_swarm
+    
+    async def line_count(contract_spec, on_event):
+        contract_spec["line_count"] = len(contract_spec["contract_code"].splitlines())
+    swarm.workflow.remove("test_cases")
+    swarm.workflow.add(Stage("line_count", line_count, inputs=["contract_code"]))
+    
+    with FakeAnchorToolchain():
+        result = swarm.process_contract_request("Create a token vesting contract")
+    
+    assert result["test_cases"] is None
+    assert result["line_count"] > 10
+    assert (swarm.contract_generator.program_dir / "target" / "deploy" / "program.so").exists()
+
+def test_project_failure_keeps_agent_output(fake_swarm, monkeypatch):
+    """Test that a failed project setup only skips the build, not the LLM stages"""
+    swarm = fake_swarm
+    def no_anchor(contract_name):
+        raise RuntimeError("Anchor framework not found")
+    monkeypatch.setattr(swarm.contract_generator, "create_anchor_project", no_anchor)
+    
+    result = swarm.process_contract_request("Create a token vesting contract")
+    
+    for stage in ("technical_specs", "architecture", "contract_code", "security_audit", "test_cases"):
+        assert result[stage] is not None
+    assert result["validated"] is False
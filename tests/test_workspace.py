@@ -0,0 +1,70 @@
+import pytest
+import os
+from smart_contract_swarm import AnchorTemplate, ContractGenerator
+
+@pytest.fixture
+def template(tmp_path):
+    """Template cache with a pre-built skeleton, so no anchor init is needed"""
+    template = AnchorTemplate(tmp_path / "cache")
+    skeleton = template.template_dir
+    (skeleton / "programs" / "program" / "src").mkdir(parents=True)
+    (skeleton / "programs" / "program" / "src" / "lib.rs").write_text("// template")
+    (skeleton / "node_modules" / "pkg").mkdir(parents=True)
+    (skeleton / "node_modules" / "pkg" / "index.js").write_text("module.exports = {}")
+    (skeleton / "target").mkdir()
+    (skeleton / "Anchor.toml").write_text("[programs.localnet]\n")
+    return template
+
+def test_clone_creates_workspace(template, tmp_path):
+    """Test that cloning copies sources and hardlinks dependencies"""
+    workspace = tmp_path / "workspace"
+    template.clone(workspace)
+    
+    lib_rs = workspace / "programs" / "program" / "src" / "lib.rs"
+    assert lib_rs.read_text() == "// template"
+    assert not os.path.samefile(lib_rs, template.template_dir / "programs" / "program" / "src" / "lib.rs")
+    assert os.path.samefile(
+        workspace / "node_modules" / "pkg" / "index.js",
+        template.template_dir / "node_modules" / "pkg" / "index.js"
+    )
+
+def test_clones_share_target_dir(template, tmp_path):
+    """Test that every workspace builds into the shared target dir"""
+    template.clone(tmp_path / "first")
+    template.clone(tmp_path / "second")
+    
+    assert (tmp_path / "first" / "target").resolve() == template.target_dir.resolve()
+    assert (tmp_path / "second" / "target").resolve() == template.target_dir.resolve()
+    assert template.build_env()["CARGO_TARGET_DIR"] == str(template.target_dir.resolve())
+
+def test_generated_code_does_not_touch_template(template, tmp_path):
+    """Test that writing lib.rs into a workspace leaves the template unchanged"""
+    generator = ContractGenerator(tmp_path / "workspace", template=template)
+    generator.create_anchor_project("vesting")
+    generator.generate_contract_code({"contract_code": "// generated"})
+    
+    assert (template.template_dir / "programs" / "program" / "src" / "lib.rs").read_text() == "// template"
+    assert "vesting" not in (template.template_dir / "Anchor.toml").read_text()
+
+def test_anchor_config_is_updated_once(template, tmp_path):
+    """Test that setting up the project again leaves Anchor.toml unchanged"""
+    generator = ContractGenerator(tmp_path / "workspace", template=template)
+    generator.create_anchor_project("vesting")
+    config = (tmp_path / "workspace" / "Anchor.toml").read_text()
+    generator.create_anchor_project("vesting")
+    generator.create_anchor_project("vesting")
+    
+    assert (tmp_path / "workspace" / "Anchor.toml").read_text() == config
+    assert config.count("vesting = ") == 1
+
+def test_existing_directory_without_anchor_toml_is_cloned_into(template, tmp_path):
+    """Test that a program dir holding only sources still gets the Anchor skeleton"""
+    workspace = tmp_path / "workspace"
+    (workspace / "programs" / "program" / "src").mkdir(parents=True)
+    (workspace / "programs" / "program" / "src" / "lib.rs").write_text("// shipped")
+    generator = ContractGenerator(workspace, template=template)
+    generator.create_anchor_project("vesting")
+    
+    assert "vesting = " in (workspace / "Anchor.toml").read_text()
+    assert (workspace / "node_modules" / "pkg" / "index.js").exists()
+    assert (workspace / "target").resolve() == template.target_dir.resolve()